@@ -22,9 +22,10 @@
             bash
             coreutils
             
-            # Python with Pillow for image generation
+            # Python with Pillow and NumPy for image generation and color math
             (python3.withPackages (ps: with ps; [
               pillow
+              numpy
             ]))
             
             # Optional screenshot tools
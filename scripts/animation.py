@@ -0,0 +1,198 @@
+"""Streaming animated GIF, APNG and WebP writers
+
+Pillow's save_all() collects every frame before it encodes anything,
+which does not scale to long recordings. These writers take one frame
+at a time, as a changed region of a fixed canvas placed at an offset,
+and write it out at once: GIF frames through Pillow's frame-level
+getheader()/getdata(), APNG and WebP frames by encoding the region as a
+still PNG or WebP with Pillow and splicing its image data into the
+animation container. Memory stays at one frame however long the
+animation is.
+
+The first frame must cover the whole canvas; later frames are drawn
+over what is already shown. APNG and WebP headers record the frame
+count and file size, which close() patches in, so those two need a
+seekable file.
+"""
+
+import io
+import os
+import struct
+import zlib
+
+from PIL import GifImagePlugin, Image
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+class GifWriter:
+    """Animated GIF, each frame quantized to its own 256-color table"""
+
+    def __init__(self, fp, size, loop=0):
+        self.fp = fp
+        self.size = size
+        self.loop = loop
+        self.frames = 0
+        self.elapsed = 0
+
+    def add(self, region, offset, duration):
+        """Append a frame shown for duration milliseconds"""
+        # Delays are in hundredths of a second: round the running total, not
+        # each frame, so long animations do not drift
+        start = round(self.elapsed / 10)
+        self.elapsed += duration
+        delay = round(self.elapsed / 10) - start
+        # Fast octree: several times quicker than median cut on terminal
+        # frames, whose few hundred antialiased colors it matches as closely
+        frame = region.quantize(256, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+        if not self.frames:
+            header, _ = GifImagePlugin.getheader(frame, info={'loop': self.loop})
+            self.fp.write(b''.join(header))
+            data = GifImagePlugin.getdata(frame, offset, duration=delay * 10)
+        else:
+            data = GifImagePlugin.getdata(frame, offset, duration=delay * 10,
+                                          include_color_table=True)
+        self.fp.write(b''.join(data))
+        self.frames += 1
+
+    def close(self):
+        self.fp.write(b';')
+
+def png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+def png_image_data(region):
+    """The zlib stream of an RGB image, as Pillow's PNG encoder compresses it"""
+    buffer = io.BytesIO()
+    region.save(buffer, format='PNG')
+    data = buffer.getvalue()
+    chunks = []
+    pos = len(PNG_SIGNATURE)
+    while pos < len(data):
+        length, kind = struct.unpack('>I4s', data[pos:pos + 8])
+        if kind == b'IDAT':
+            chunks.append(data[pos + 8:pos + 8 + length])
+        pos += 12 + length
+    return b''.join(chunks)
+
+class ApngWriter:
+    """Animated PNG (truecolor, lossless)"""
+
+    def __init__(self, fp, size, loop=0):
+        self.fp = fp
+        self.size = size
+        self.loop = loop
+        self.frames = 0
+        self.sequence = 0
+        width, height = size
+        fp.write(PNG_SIGNATURE + png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height,
+                                                                 8, 2, 0, 0, 0)))
+        self.actl = fp.tell()
+        fp.write(png_chunk(b'acTL', struct.pack('>II', 0, loop)))
+
+    def add(self, region, offset, duration):
+        """Append a frame shown for duration milliseconds"""
+        if duration <= 0xffff:
+            delay = (duration, 1000)
+        else:
+            delay = (min(round(duration / 10), 0xffff), 100)
+        width, height = region.size
+        # Keep the pixels outside the region and overwrite the ones inside
+        self.fp.write(png_chunk(b'fcTL', struct.pack('>IIIIIHHBB', self.sequence, width, height,
+                                                      offset[0], offset[1], *delay, 0, 0)))
+        self.sequence += 1
+        data = png_image_data(region.convert('RGB'))
+        if not self.frames:
+            self.fp.write(png_chunk(b'IDAT', data))
+        else:
+            self.fp.write(png_chunk(b'fdAT', struct.pack('>I', self.sequence) + data))
+            self.sequence += 1
+        self.frames += 1
+
+    def close(self):
+        self.fp.write(png_chunk(b'IEND', b''))
+        self.fp.seek(self.actl)
+        self.fp.write(png_chunk(b'acTL', struct.pack('>II', self.frames, self.loop)))
+        self.fp.seek(0, os.SEEK_END)
+
+def riff_chunk(kind, data):
+    return kind + struct.pack('<I', len(data)) + data + b'\0' * (len(data) & 1)
+
+def uint24(value):
+    return struct.pack('<I', value)[:3]
+
+# Lossless effort: about four times faster than Pillow's default on terminal
+# frames and within a fifth of its size
+WEBP_LOSSLESS = {'lossless': True, 'quality': 25, 'method': 1}
+
+def webp_image_chunks(region, quality=None):
+    """The bitstream chunks (ALPH, VP8, VP8L) of a still WebP encoded by Pillow"""
+    buffer = io.BytesIO()
+    if quality is None:
+        region.save(buffer, format='WEBP', **WEBP_LOSSLESS)
+    else:
+        region.save(buffer, format='WEBP', quality=quality)
+    data = buffer.getvalue()
+    chunks = []
+    pos = 12
+    while pos < len(data):
+        kind = data[pos:pos + 4]
+        end = pos + 8 + struct.unpack('<I', data[pos + 4:pos + 8])[0]
+        end += end & 1
+        if kind in (b'ALPH', b'VP8 ', b'VP8L'):
+            chunks.append(data[pos:end])
+        pos = end
+    return b''.join(chunks)
+
+class WebpWriter:
+    """Animated WebP, lossless unless a quality is given
+
+    Frame offsets are stored halved, so regions must start at even
+    coordinates.
+    """
+
+    def __init__(self, fp, size, loop=0, quality=None):
+        self.fp = fp
+        self.size = size
+        self.quality = quality
+        self.frames = 0
+        width, height = size
+        fp.write(b'RIFF' + struct.pack('<I', 0) + b'WEBP')
+        # Animation flag, canvas size
+        fp.write(riff_chunk(b'VP8X', b'\x02\0\0\0' + uint24(width - 1) + uint24(height - 1)))
+        fp.write(riff_chunk(b'ANIM', struct.pack('<IH', 0, loop)))
+
+    def add(self, region, offset, duration):
+        """Append a frame shown for duration milliseconds"""
+        x, y = offset
+        if x % 2 or y % 2:
+            raise ValueError(f"WebP frame offsets must be even, got {offset}")
+        width, height = region.size
+        image = webp_image_chunks(region.convert('RGB'), self.quality)
+        # Flags: no blending (the region is opaque), no disposal
+        header = (uint24(x // 2) + uint24(y // 2) + uint24(width - 1) + uint24(height - 1)
+                  + uint24(min(duration, 0xffffff)) + b'\x02')
+        self.fp.write(riff_chunk(b'ANMF', header + image))
+        self.frames += 1
+
+    def close(self):
+        size = self.fp.tell()
+        self.fp.seek(4)
+        self.fp.write(struct.pack('<I', size - 8))
+        self.fp.seek(0, os.SEEK_END)
+
+# Output file suffix -> writer class
+WRITERS = {
+    '.gif': GifWriter,
+    '.png': ApngWriter,
+    '.apng': ApngWriter,
+    '.webp': WebpWriter,
+}
+
+def writer_for(path):
+    """The writer class for an output file name"""
+    suffix = os.path.splitext(path)[1].lower()
+    try:
+        return WRITERS[suffix]
+    except KeyError:
+        raise ValueError(f"Unknown animation format {suffix!r} "
+                         f"(expected one of {', '.join(sorted(WRITERS))})") from None
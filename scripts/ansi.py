@@ -0,0 +1,233 @@
+"""Single-pass ANSI escape tokenizer and table-driven SGR state machine"""
+
+import re
+
+from instrument import timed
+
+# Every token of interest in one pass: OSC strings, CSI sequences and newlines.
+# Anything between two matches is printable text.
+TOKEN_RE = re.compile(r'\x1b(?:\][^\x1b]*(?:\x1b\\|\x07)|\[([0-?]*)([ -/]*)([@-~]))|\n')
+
+# An escape sequence cut off by the end of a chunk
+PARTIAL_RE = re.compile(r'\x1b(?:\][^\x1b\x07]*\x1b?|\[[0-?]*[ -/]*)?\Z')
+
+# Longest incomplete escape held back between chunks
+MAX_PENDING = 4096
+
+ANSI_ESCAPE_RE = re.compile(r'\x1B(?:\][^\x1B]*(?:\x1B\\|\x07)|\[[0-?]*[ -/]*[@-~])')
+
+# Default ANSI color palette - overridden by the theme when available
+DEFAULT_ANSI_COLORS = [
+    '#000000',  # black
+    '#ff0000',  # red
+    '#00ff00',  # green
+    '#ffff00',  # yellow
+    '#0000ff',  # blue
+    '#ff00ff',  # magenta
+    '#00ffff',  # cyan
+    '#ffffff',  # white
+    '#808080',  # bright black
+    '#ff8080',  # bright red
+    '#80ff80',  # bright green
+    '#ffff80',  # bright yellow
+    '#8080ff',  # bright blue
+    '#ff80ff',  # bright magenta
+    '#80ffff',  # bright cyan
+    '#ffffff',  # bright white
+]
+
+# SGR opcodes
+RESET, BOLD, REVERSE, FG, FG_BASE, BG = range(6)
+
+# Simple SGR parameters: code -> (opcode, argument)
+SGR_TABLE = {
+    0: (RESET, None),
+    1: (BOLD, True),
+    22: (BOLD, False),
+    7: (REVERSE, True),
+    27: (REVERSE, False),
+    39: (FG, None),
+    49: (BG, None),
+}
+for _i in range(8):
+    SGR_TABLE[30 + _i] = (FG_BASE, _i)  # brightened when bold is set
+    SGR_TABLE[40 + _i] = (BG, _i)
+    SGR_TABLE[90 + _i] = (FG, _i + 8)
+    SGR_TABLE[100 + _i] = (BG, _i + 8)
+
+def strip_ansi_codes(text):
+    """Remove ANSI escape codes from text"""
+    return ANSI_ESCAPE_RE.sub('', text)
+
+def sgr_int(param):
+    """Parse one SGR parameter, treating empty or malformed values as 0"""
+    return int(param) if param.isdigit() else 0
+
+def theme_ansi_colors(theme_colors=None):
+    """Return the 16 ANSI colors of an xrdb palette, filling gaps with defaults"""
+    ansi_colors = list(DEFAULT_ANSI_COLORS)
+    if theme_colors:
+        for i in range(16):
+            color_key = f'Ansi_{i}_Color'
+            if color_key in theme_colors:
+                ansi_colors[i] = theme_colors[color_key]
+    return ansi_colors
+
+# xterm 6x6x6 color cube channel levels
+CUBE_LEVELS = (0x00, 0x5f, 0x87, 0xaf, 0xd7, 0xff)
+
+def xterm_palette(ansi_colors):
+    """Extend 16 ANSI colors to the xterm 256-color palette"""
+    palette = list(ansi_colors[:16])
+    # 6x6x6 color cube (216 colors)
+    for i in range(216):
+        r = CUBE_LEVELS[i // 36]
+        g = CUBE_LEVELS[(i % 36) // 6]
+        b = CUBE_LEVELS[i % 6]
+        palette.append(f'#{r:02x}{g:02x}{b:02x}')
+    # Grayscale (24 colors)
+    for i in range(24):
+        gray = min(255, 8 + i * 10)
+        palette.append(f'#{gray:02x}{gray:02x}{gray:02x}')
+    return palette
+
+class AnsiParser:
+    """Turn an ANSI capture into lines of (text, fg, bg, bold) runs
+
+    With a color_index (see nearest.theme_index), truecolor SGR colors are
+    snapped to the closest palette entry, as a 16/256-color terminal would.
+    """
+
+    def __init__(self, fg_color='#ffffff', bg_color='#000000', ansi_colors=None,
+                 color_index=None):
+        self.fg_color = fg_color
+        self.bg_color = bg_color
+        self.palette = xterm_palette(ansi_colors or DEFAULT_ANSI_COLORS)
+        self.color_index = color_index
+        self.reset()
+
+    def reset(self):
+        """Reset all graphic attributes"""
+        self.fg = None  # palette index, '#rrggbb' or None for default
+        self.bg = None
+        self.bold = False
+        self.reverse = False
+        self.style = None
+
+    def resolve(self, color, default):
+        """Resolve a stored color (index, hex or None) to hex"""
+        if color is None:
+            return default
+        if isinstance(color, int):
+            return self.palette[color]
+        return color
+
+    def current_style(self):
+        """Return the (fg, bg, bold) triple for the current attributes"""
+        if self.style is None:
+            fg = self.resolve(self.fg, self.fg_color)
+            bg = self.resolve(self.bg, self.bg_color)
+            if self.reverse:
+                fg, bg = bg, fg
+            self.style = (fg, bg, self.bold)
+        return self.style
+
+    def extended_color(self, args):
+        """Parse ['5', n] or ['2', (colorspace,) r, g, b] into a stored color, or None"""
+        if len(args) >= 2 and args[0] == '5':
+            return sgr_int(args[1]) & 0xff
+        if len(args) >= 4 and args[0] == '2':
+            r, g, b = (sgr_int(c) & 0xff for c in args[-3:])
+            color = f'#{r:02x}{g:02x}{b:02x}'
+            if self.color_index is not None:
+                color = self.color_index.nearest_hex(color)
+            return color
+        return None
+
+    def apply_sgr(self, params):
+        """Apply an SGR parameter string such as '1;38;5;196' or '38:2::255:0:0'"""
+        codes = params.split(';') if params else ['0']
+        self.style = None
+        i = 0
+        n = len(codes)
+        while i < n:
+            # Colon sub-parameters (4:3, 38:5:n) belong to their field
+            code, colon, rest = codes[i].partition(':')
+            code = sgr_int(code)
+            if code == 38 or code == 48:
+                if colon:
+                    args = rest.split(':')
+                else:
+                    mode = codes[i + 1] if i + 1 < n else ''
+                    args = codes[i + 1:i + 1 + {'5': 2, '2': 4}.get(mode, 0)]
+                    i += len(args)
+                color = self.extended_color(args)
+                if color is None:
+                    if not colon:
+                        break
+                elif code == 38:
+                    self.fg = color
+                else:
+                    self.bg = color
+            else:
+                op = SGR_TABLE.get(code)
+                if op is not None:
+                    opcode, arg = op
+                    if opcode == RESET:
+                        self.reset()
+                    elif opcode == BOLD:
+                        self.bold = arg
+                    elif opcode == REVERSE:
+                        self.reverse = arg
+                    elif opcode == FG:
+                        self.fg = arg
+                    elif opcode == FG_BASE:
+                        # Use bright version when bold is already set
+                        self.fg = arg + 8 if self.bold else arg
+                    else:
+                        self.bg = arg
+            i += 1
+
+    def iter_runs(self, text):
+        """Yield (text, fg, bg, bold) runs, and None at each newline"""
+        pos = 0
+        for match in TOKEN_RE.finditer(text):
+            start = match.start()
+            if start > pos:
+                yield (text[pos:start],) + self.current_style()
+            pos = match.end()
+            token = match.group(0)
+            if token == '\n':
+                yield None
+            elif match.group(3) == 'm' and not match.group(2):
+                self.apply_sgr(match.group(1))
+            # Ignore other escape sequences (OSC, cursor movement, etc.)
+        if pos < len(text):
+            yield (text[pos:],) + self.current_style()
+
+    def iter_stream(self, chunks):
+        """Like iter_runs, over an iterable of text chunks
+
+        Escape sequences split across chunk boundaries are held back until
+        they complete, so memory stays bounded by the chunk size.
+        """
+        pending = ''
+        for chunk in chunks:
+            text = pending + chunk
+            match = PARTIAL_RE.search(text, max(0, len(text) - MAX_PENDING))
+            cut = match.start() if match else len(text)
+            pending = text[cut:]
+            yield from self.iter_runs(text[:cut])
+        if pending:
+            yield from self.iter_runs(pending)
+
+    @timed
+    def parse_lines(self, text):
+        """Parse a whole capture into a list of lines of runs"""
+        lines = [[]]
+        for run in self.iter_runs(text):
+            if run is None:
+                lines.append([])
+            else:
+                lines[-1].append(run)
+        return lines
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""Stream an ANSI capture to HTML or SVG
+
+The capture is read chunk by chunk and written out as it is parsed, so
+multi-megabyte session recordings render in constant memory. Adjacent
+runs with the same style are coalesced into one span, and colors refer
+to a CSS class table shared by every document rendered with a theme
+instead of repeating inline styles on each fragment.
+"""
+
+import argparse
+import html
+import os
+import sys
+
+from ansi import AnsiParser, theme_ansi_colors, xterm_palette
+from palette import load_palette
+
+# Characters read per chunk
+CHUNK_SIZE = 1 << 16
+
+FONT_FAMILY = "'Fira Code', 'DejaVu Sans Mono', 'Monaco', monospace"
+
+# SVG cell geometry for a 14px monospace font
+FONT_SIZE = 14
+CELL_WIDTH = 8.4
+LINE_HEIGHT = 17
+PADDING = 20
+
+# Room reserved in the SVG root element for the final width and height
+SVG_SIZE_FIELD = 48
+
+# Lines buffered in one span before it is written out
+FLUSH_LINES = 256
+
+# C0 controls have no place in HTML or SVG text; tabs and newlines are kept
+CONTROL_CHARS = dict.fromkeys(c for c in range(32) if c not in (9, 10))
+
+def escape(text):
+    """Escape text for HTML/XML, dropping control characters"""
+    return html.escape(text.translate(CONTROL_CHARS), quote=False)
+
+class ClassTable:
+    """CSS classes for a theme's 256-color palette
+
+    Foreground colors map to .fN and background colors to .bN, where N is
+    the palette index, or 'fg'/'bg' for the theme defaults used in
+    reverse video. Colors outside the palette (truecolor) fall back to
+    inline styles.
+    """
+
+    def __init__(self, theme_colors=None, svg=False):
+        theme_colors = theme_colors or {}
+        self.fg_color = theme_colors.get('Foreground_Color', '#ffffff')
+        self.bg_color = theme_colors.get('Background_Color', '#000000')
+        self.ansi_colors = theme_ansi_colors(theme_colors)
+        self.svg = svg
+        self.names = {self.fg_color: 'fg', self.bg_color: 'bg'}
+        for i, color in enumerate(xterm_palette(self.ansi_colors)):
+            self.names.setdefault(color, str(i))
+        self.attrs = {}
+
+    def css(self):
+        """Return the stylesheet with one rule per palette color"""
+        fg_prop = 'fill' if self.svg else 'color'
+        bg_prop = 'fill' if self.svg else 'background-color'
+        rules = ['.B{font-weight:bold}']
+        for color, name in self.names.items():
+            rules.append(f'.f{name}{{{fg_prop}:{color}}}')
+        for color, name in self.names.items():
+            rules.append(f'.b{name}{{{bg_prop}:{color}}}')
+        return '\n'.join(rules) + '\n'
+
+    def color_attr(self, prefix, color, prop, classes, inline):
+        """Add the class name, or else an inline declaration, for one color"""
+        name = self.names.get(color)
+        if name is not None:
+            classes.append(f'{prefix}{name}')
+        else:
+            inline.append(f'{prop}:{color}')
+
+    def text_attrs(self, style):
+        """Memoized ' class=".." style=".."' attributes for a text run"""
+        attrs = self.attrs.get(style)
+        if attrs is None:
+            fg, bg, bold = style
+            classes, inline = [], []
+            if fg != self.fg_color:
+                self.color_attr('f', fg, 'fill' if self.svg else 'color', classes, inline)
+            if bg != self.bg_color and not self.svg:
+                # SVG draws backgrounds as separate rects
+                self.color_attr('b', bg, 'background-color', classes, inline)
+            if bold:
+                classes.append('B')
+            attrs = ''
+            if classes:
+                attrs += f' class="{" ".join(classes)}"'
+            if inline:
+                attrs += f' style="{";".join(inline)}"'
+            self.attrs[style] = attrs
+        return attrs
+
+    def rect_attrs(self, bg):
+        """Class or fill attribute for an SVG background rect"""
+        name = self.names.get(bg)
+        return f' class="b{name}"' if name is not None else f' fill="{bg}"'
+
+class HtmlWriter:
+    """Write coalesced runs as <span>s inside a <pre>"""
+
+    def __init__(self, out, table, title, css_href=None):
+        self.out = out
+        self.table = table
+        self.title = title
+        self.css_href = css_href
+        self.text = []
+        self.style = None
+        self.lines = 0
+
+    def begin(self):
+        table = self.table
+        if self.css_href:
+            stylesheet = f'<link rel="stylesheet" href="{html.escape(self.css_href)}">\n'
+        else:
+            stylesheet = f'<style>\n{table.css()}</style>\n'
+        self.out.write(
+            '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n'
+            f'<title>{escape(self.title)}</title>\n'
+            '<style>\n'
+            f'body{{background:{table.bg_color};color:{table.fg_color};margin:0;padding:{PADDING}px}}\n'
+            f'pre{{font-family:{FONT_FAMILY};font-size:{FONT_SIZE}px;margin:0}}\n'
+            '</style>\n'
+            f'{stylesheet}</head>\n<body>\n<pre>')
+
+    def flush(self):
+        if self.text:
+            text = escape(''.join(self.text))
+            attrs = self.table.text_attrs(self.style)
+            self.out.write(f'<span{attrs}>{text}</span>' if attrs else text)
+            self.text = []
+        self.lines = 0
+
+    def run(self, text, style):
+        if style != self.style:
+            self.flush()
+            self.style = style
+        self.text.append(text)
+
+    def newline(self):
+        # A span may continue across lines: only a style change closes it
+        self.text.append('\n')
+        self.lines += 1
+        if self.lines >= FLUSH_LINES:
+            self.flush()
+
+    def end(self):
+        self.flush()
+        self.out.write('</pre>\n</body>\n</html>\n')
+
+class SvgWriter:
+    """Write coalesced runs as positioned <tspan>s over background <rect>s"""
+
+    def __init__(self, out, table, title, css_href=None):
+        self.out = out
+        self.table = table
+        self.title = title
+        self.css_href = css_href
+        self.row = 0
+        self.column = 0
+        self.columns = 0
+        self.spans = []  # tspans of the current line
+        self.text = []
+        self.style = None
+        self.start = 0
+        self.size_offset = None
+
+    def size_attrs(self):
+        width = round(self.columns * CELL_WIDTH + 2 * PADDING)
+        height = (self.row + 1) * LINE_HEIGHT + 2 * PADDING
+        return f' width="{width}" height="{height}"'.ljust(SVG_SIZE_FIELD)
+
+    def begin(self):
+        table = self.table
+        self.out.write('<svg xmlns="http://www.w3.org/2000/svg"')
+        try:
+            self.size_offset = self.out.tell()
+        except (OSError, ValueError):
+            # Pipes cannot be patched: leave the size to the viewer
+            self.size_offset = None
+        else:
+            # Placeholder size, patched in end() once the extent is known
+            self.out.write(self.size_attrs())
+        if self.css_href:
+            css = f'@import url("{self.css_href}");\n'
+        else:
+            css = table.css()
+        self.out.write(
+            f' font-family="{html.escape(FONT_FAMILY, quote=False)}" font-size="{FONT_SIZE}">\n'
+            f'<title>{escape(self.title)}</title>\n'
+            f'<style>\ntext{{fill:{table.fg_color};white-space:pre}}\n{css}</style>\n'
+            f'<rect width="100%" height="100%" fill="{table.bg_color}"/>\n')
+
+    def flush(self):
+        if not self.text:
+            return
+        text = ''.join(self.text)
+        width = len(text)
+        fg, bg, bold = self.style
+        x = PADDING + self.start * CELL_WIDTH
+        if bg != self.table.bg_color:
+            y = PADDING + self.row * LINE_HEIGHT
+            self.out.write(f'<rect x="{x:g}" y="{y}" width="{width * CELL_WIDTH:g}" '
+                           f'height="{LINE_HEIGHT}"{self.table.rect_attrs(bg)}/>\n')
+        if text.strip():
+            self.spans.append(f'<tspan x="{x:g}"{self.table.text_attrs(self.style)}>'
+                              f'{escape(text)}</tspan>')
+        self.text = []
+        self.start = self.column
+
+    def run(self, text, style):
+        if style != self.style:
+            self.flush()
+            self.style = style
+        self.text.append(text)
+        self.column += len(text)
+
+    def newline(self):
+        self.flush()
+        if self.spans:
+            y = PADDING + self.row * LINE_HEIGHT + FONT_SIZE
+            self.out.write(f'<text y="{y}" xml:space="preserve">{"".join(self.spans)}</text>\n')
+            self.spans = []
+        self.columns = max(self.columns, self.column)
+        self.row += 1
+        self.column = self.start = 0
+
+    def end(self):
+        self.newline()
+        self.row -= 1
+        self.out.write('</svg>\n')
+        if self.size_offset is not None:
+            self.out.seek(self.size_offset)
+            self.out.write(self.size_attrs())
+            self.out.seek(0, os.SEEK_END)
+
+def render_stream(chunks, out, theme_colors=None, svg=False, title='', css_href=None):
+    """Render an iterable of ANSI text chunks to HTML or SVG on out"""
+    table = ClassTable(theme_colors, svg=svg)
+    parser = AnsiParser(table.fg_color, table.bg_color, table.ansi_colors)
+    writer = (SvgWriter if svg else HtmlWriter)(out, table, title, css_href)
+    writer.begin()
+    for run in parser.iter_stream(chunks):
+        if run is None:
+            writer.newline()
+        else:
+            writer.run(run[0], run[1:])
+    writer.end()
+
+def read_chunks(f, size=CHUNK_SIZE):
+    """Yield successive chunks of a text stream"""
+    return iter(lambda: f.read(size), '')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('input', nargs='?', default='-', help="ANSI capture (default: stdin)")
+    parser.add_argument('-o', '--output', default='-', help="output file (default: stdout)")
+    parser.add_argument('-t', '--theme', help=".xrdb or .itermcolors scheme for the palette")
+    parser.add_argument('--svg', action='store_true', help="write SVG instead of HTML")
+    parser.add_argument('--title', help="document title (default: input name)")
+    parser.add_argument('--css', metavar='FILE',
+                        help="write the theme's class table to FILE and link to it")
+    args = parser.parse_args()
+
+    theme_colors = load_palette(args.theme) if args.theme else None
+    title = args.title or (os.path.basename(args.input) if args.input != '-' else 'stdin')
+
+    css_href = None
+    if args.css:
+        table = ClassTable(theme_colors, svg=args.svg)
+        with open(args.css, 'w') as f:
+            f.write(table.css())
+        css_href = args.css
+        if args.output != '-':
+            css_href = os.path.relpath(args.css, os.path.dirname(os.path.abspath(args.output)))
+
+    src = (open(args.input, encoding='utf-8', errors='replace') if args.input != '-'
+           else open(sys.stdin.fileno(), encoding='utf-8', errors='replace', closefd=False))
+    dst = (open(args.output, 'w', encoding='utf-8') if args.output != '-'
+           else open(sys.stdout.fileno(), 'w', encoding='utf-8', closefd=False))
+    with src, dst:
+        render_stream(read_chunks(src), dst, theme_colors, args.svg, title, css_href)
+
+if __name__ == '__main__':
+    main()
@@ -9,12 +9,72 @@ THEME_DIR="$(dirname "$SCRIPT_DIR")"
 
 # Default to dark theme
 THEME="${1:-dark}"
+shift || true
 
-# Load the appropriate xrdb file
+# Optional targets: tty paths, or --tmux for every tmux pane
+TARGETS=()
+for arg in "$@"; do
+    if [ "$arg" == "--tmux" ]; then
+        while IFS= read -r pane_tty; do
+            TARGETS+=("$pane_tty")
+        done < <(tmux list-panes -a -F '#{pane_tty}' 2>/dev/null | sort -u)
+    else
+        TARGETS+=("$arg")
+    fi
+done
+
+# Load the appropriate theme files
 if [ "$THEME" == "light" ]; then
-    XRDB_FILE="$THEME_DIR/ManfredTouron-Light.xrdb"
+    THEME_BASE="$THEME_DIR/ManfredTouron-Light"
+    OTHER_BASE="$THEME_DIR/ManfredTouron"
 else
-    XRDB_FILE="$THEME_DIR/ManfredTouron.xrdb"
+    THEME_BASE="$THEME_DIR/ManfredTouron"
+    OTHER_BASE="$THEME_DIR/ManfredTouron-Light"
+fi
+XRDB_FILE="$THEME_BASE.xrdb"
+OSC_FILE="$THEME_BASE.osc"
+
+# Common tail of every path: optional redraw, then export for other scripts
+finish() {
+    # For some terminals, we might need to clear and redraw
+    if [ "${FORCE_REDRAW:-0}" == "1" ]; then
+        clear
+        echo "Theme applied: $THEME"
+    fi
+    
+    export COLORSCHEME_MODE="$THEME"
+}
+
+# FADE=<frames> cross-fades from the other theme with diffed OSC frames
+if [ "${FADE:-0}" -gt 0 ] && [ -f "$XRDB_FILE" ] && [ -f "$OTHER_BASE.xrdb" ] \
+        && command -v python3 >/dev/null 2>&1; then
+    echo "Fading to $THEME theme..."
+    python3 "$SCRIPT_DIR/transition.py" --frames "$FADE" \
+        "$OTHER_BASE.xrdb" "$XRDB_FILE" ${TARGETS[@]+"${TARGETS[@]}"}
+    finish
+    exit 0
+fi
+
+# Write a payload to stdout or each target with one builtin write apiece
+write_payload() {
+    local payload="$1"
+    if [ ${#TARGETS[@]} -eq 0 ]; then
+        printf '%s' "$payload"
+        return
+    fi
+    for tty in "${TARGETS[@]}"; do
+        printf '%s' "$payload" > "$tty" 2>/dev/null || echo "Skipping $tty" >&2
+    done
+}
+
+# Fast path: the build precompiles the full OSC 4/10/11/12 payload, unless
+# the .xrdb was edited since the last make
+if [ -f "$OSC_FILE" ] && ! [ "$XRDB_FILE" -nt "$OSC_FILE" ]; then
+    IFS= read -r -d '' payload < "$OSC_FILE" || true
+    echo "Applying $THEME theme..."
+    write_payload "$payload"
+    finish
+    exit 0
 fi
 
 if [ ! -f "$XRDB_FILE" ]; then
@@ -30,11 +90,13 @@ while IFS= read -r line; do
     fi
 done < "$XRDB_FILE"
 
-# Function to send OSC escape sequences
+# Function to build OSC escape sequences
 send_osc() {
     local sequence="$1"
     local value="$2"
-    printf "\033]%s;%s\007" "$sequence" "$value"
+    local osc
+    printf -v osc "\033]%s;%s\007" "$sequence" "$value"
+    payload+="$osc"
 }
 
 # Apply colors using OSC sequences
@@ -65,13 +127,7 @@ apply_colors() {
 
 # Apply the colors
 echo "Applying $THEME theme..."
+payload=""
 apply_colors
-
-# For some terminals, we might need to clear and redraw
-if [ "${FORCE_REDRAW:-0}" == "1" ]; then
-    clear
-    echo "Theme applied: $THEME"
-fi
-
-# Export for other scripts
-export COLORSCHEME_MODE="$THEME"
\ No newline at end of file
+write_payload "$payload"
+finish
\ No newline at end of file
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""Render asciicast v2 recordings to animated GIF, APNG or WebP in a scheme
+
+The recording is replayed through a vt.Screen and sampled at a fixed
+frame rate. Only rows the terminal reports as damaged are redrawn, and
+of those only the pixels that really differ from the frame on display
+are encoded, as a region placed over the previous frame; samples where
+nothing visibly changed just extend the previous frame.
+
+Events are read line by line and every frame is handed to a streaming
+writer (see animation.py) as soon as its duration is known, so memory
+stays at two canvases however long the recording is. Resize events are
+ignored: the animation keeps the size from the header.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from PIL import ImageChops
+
+from animation import writer_for
+from palette import load_palette
+from preview import ScreenImage
+from vt import Screen
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_THEME = os.path.join(os.path.dirname(SCRIPT_DIR), 'ManfredTouron.xrdb')
+
+DEFAULT_FPS = 15
+# GIF delays are in hundredths of a second and viewers slow down
+# anything under two of them
+MAX_FPS = 50
+
+# Seconds the last frame stays up before the animation loops
+DEFAULT_HOLD = 2.0
+
+def read_cast(stream):
+    """Parse an asciicast v2 stream into its header and an iterator of events
+
+    Events are (time, type, data) tuples, read lazily from the stream.
+    """
+    header = json.loads(stream.readline())
+    if not isinstance(header, dict) or header.get('version') != 2:
+        raise ValueError("not an asciicast v2 recording")
+
+    def events():
+        for line in stream:
+            if line.strip():
+                time, kind, data = json.loads(line)
+                yield time, kind, data
+    return header, events()
+
+def output_events(events, idle_limit=None):
+    """Yield (time, data) of output events, shortening pauses to idle_limit seconds"""
+    skipped = 0.0
+    last = 0.0
+    for time, kind, data in events:
+        if kind != 'o':
+            continue
+        if idle_limit is not None and time - last > idle_limit:
+            skipped += time - last - idle_limit
+        last = time
+        yield time - skipped, data
+
+def changed_region(image, shown):
+    """Redraw damaged rows and return the (region, offset) that differs from shown
+
+    shown is updated to match. Returns None when no pixel changed.
+    """
+    box = image.update()
+    if box is None:
+        return None
+    diff = ImageChops.difference(image.image.crop(box), shown.crop(box)).getbbox()
+    if diff is None:
+        return None
+    x0, y0 = box[0] + diff[0], box[1] + diff[1]
+    # WebP stores frame offsets halved
+    x0 -= x0 % 2
+    y0 -= y0 % 2
+    region = image.image.crop((x0, y0, box[0] + diff[2], box[1] + diff[3]))
+    shown.paste(region, (x0, y0))
+    return region, (x0, y0)
+
+def replay(screen, image, outputs, fps=DEFAULT_FPS):
+    """Yield (time, region, offset) for every sampled frame that looks different
+
+    The first frame is the whole canvas at time 0. The output of each
+    1/fps slot is executed before the slot's frame is taken, which is
+    shown from the end of the slot.
+    """
+    image.update()
+    shown = image.image.copy()
+    yield 0.0, shown.copy(), (0, 0)
+    slot = 0
+    for time, data in outputs:
+        current = int(time * fps)
+        if current > slot:
+            frame = changed_region(image, shown)
+            if frame:
+                yield (slot + 1) / fps, *frame
+            slot = current
+        screen.feed(data)
+    frame = changed_region(image, shown)
+    if frame:
+        yield (slot + 1) / fps, *frame
+
+def render_cast(stream, output_file, theme_colors=None, fps=DEFAULT_FPS, idle_limit=None,
+                hold=DEFAULT_HOLD, loop=0):
+    """Render an asciicast v2 stream to an animation, returning the number of frames
+
+    The format follows the output file suffix (.gif, .png/.apng, .webp).
+    idle_limit defaults to the recording's idle_time_limit.
+    """
+    writer_class = writer_for(output_file)
+    header, events = read_cast(stream)
+    if idle_limit is None:
+        idle_limit = header.get('idle_time_limit')
+    screen = Screen(header['width'], header['height'], theme_colors, onlcr=False)
+    image = ScreenImage(screen)
+
+    with open(output_file, 'wb') as f:
+        writer = writer_class(f, image.image.size, loop)
+        pending = None
+        for time, region, offset in replay(screen, image, output_events(events, idle_limit), fps):
+            if pending:
+                # Durations from rounded timestamps, so errors do not accumulate
+                writer.add(pending[1], pending[2], round(time * 1000) - round(pending[0] * 1000))
+            pending = (time, region, offset)
+        writer.add(pending[1], pending[2], max(round(hold * 1000), 10))
+        writer.close()
+    return writer.frames
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('input', help="asciicast v2 recording (.cast), or - for stdin")
+    parser.add_argument('output', help="animation to write (.gif, .png/.apng or .webp)")
+    parser.add_argument('-t', '--theme', default=DEFAULT_THEME,
+                        help=".xrdb/.itermcolors/.pal scheme (default: ManfredTouron.xrdb)")
+    parser.add_argument('--fps', type=int, default=DEFAULT_FPS,
+                        help=f"frames sampled per second (default: {DEFAULT_FPS}, "
+                             f"max: {MAX_FPS})")
+    parser.add_argument('-i', '--idle-limit', type=float,
+                        help="shorten pauses to this many seconds "
+                             "(default: the recording's idle_time_limit)")
+    parser.add_argument('--hold', type=float, default=DEFAULT_HOLD,
+                        help=f"seconds to show the last frame (default: {DEFAULT_HOLD})")
+    args = parser.parse_args()
+    if not 1 <= args.fps <= MAX_FPS:
+        parser.error(f"--fps must be between 1 and {MAX_FPS}")
+    try:
+        writer_for(args.output)
+    except ValueError as e:
+        parser.error(str(e))
+
+    theme_colors = load_palette(args.theme)
+    stream = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    try:
+        with stream:
+            frames = render_cast(stream, args.output, theme_colors, args.fps,
+                                 args.idle_limit, args.hold)
+    except ValueError as e:
+        print(f"Error: {args.input}: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"Wrote {frames} frames to {args.output}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""Benchmark the converters, parsers and renderers on synthetic corpora
+
+Every benchmark runs against generated data: a corpus of random schemes
+written as .itermcolors and .xrdb files (their hterm scripts are only
+rendered in memory), and ANSI captures of a given size. Each benchmark is timed over several repeats, then run once
+more under tracemalloc for its peak Python heap usage (Pillow's pixel
+buffers live outside it), and the results are written as JSON. Passing
+a previous result file with --compare turns the run into a regression
+check.
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import platform
+import plistlib
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from palette import COLOR_NAMES, to_hterm, to_xrdb
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPT_DIR)
+DEFAULT_OUTPUT = os.path.join(ROOT_DIR, '.cache', 'benchmarks.json')
+
+# Default corpus sizes, overridable from the command line
+DEFAULT_SCHEMES = 1000
+DEFAULT_CAPTURE_MB = 2.0
+DEFAULT_IMAGE_MB = 0.25
+DEFAULT_PREVIEWS = 20
+
+def load_script(name):
+    """Import a hyphenated script such as generate-preview.py as a module"""
+    path = os.path.join(SCRIPT_DIR, f"{name}.py")
+    spec = importlib.util.spec_from_file_location(name.replace('-', '_'), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def random_scheme(rng):
+    """A random palette defining every named color"""
+    return {name: f'#{rng.randrange(1 << 24):06x}' for name in COLOR_NAMES}
+
+def iterm_plist(colors):
+    """Render a palette as an iTerm2 plist dictionary"""
+    plist = {}
+    for name, value in colors.items():
+        r, g, b = bytes.fromhex(value[1:])
+        plist[name.replace('_', ' ')] = {
+            'Color Space': 'sRGB',
+            'Red Component': r / 255,
+            'Green Component': g / 255,
+            'Blue Component': b / 255,
+        }
+    return plist
+
+def synthetic_capture(size, rng):
+    """An ANSI capture of about size bytes mixing 16, 256 and truecolor SGR"""
+    words = ['error', 'warning', 'ok', 'build', 'scheme', 'color', 'render', '│', '██']
+    parts = []
+    total = 0
+    while total < size:
+        line = []
+        for _ in range(rng.randrange(4, 16)):
+            kind = rng.random()
+            if kind < 0.5:
+                sgr = f'{rng.choice((0, 1))};{30 + rng.randrange(8)}'
+            elif kind < 0.8:
+                sgr = f'38;5;{rng.randrange(256)}'
+            else:
+                sgr = f'48;2;{rng.randrange(256)};{rng.randrange(256)};{rng.randrange(256)}'
+            line.append(f'\033[{sgr}m{rng.choice(words)}\033[0m ')
+        text = ''.join(line) + '\n'
+        parts.append(text)
+        total += len(text)
+    return ''.join(parts)
+
+class Corpus:
+    """Synthetic schemes and captures written to a temporary directory"""
+
+    def __init__(self, directory, schemes, capture_mb, image_mb, seed=0):
+        rng = random.Random(seed)
+        self.directory = directory
+        self.palettes = [random_scheme(rng) for _ in range(schemes)]
+        self.names = [f'scheme-{i:06d}' for i in range(schemes)]
+        self.iterm_files = []
+        for name, colors in zip(self.names, self.palettes):
+            iterm_file = os.path.join(directory, f'{name}.itermcolors')
+            with open(iterm_file, 'wb') as f:
+                plistlib.dump(iterm_plist(colors), f)
+            self.iterm_files.append(iterm_file)
+            with open(os.path.join(directory, f'{name}.xrdb'), 'w') as f:
+                f.write(to_xrdb(colors))
+        self.hterm = [to_hterm(colors) for colors in self.palettes]
+        self.capture = synthetic_capture(int(capture_mb * 2 ** 20), rng)
+        self.image_capture = self.capture[:int(image_mb * 2 ** 20)]
+        self.image_capture = self.image_capture[:self.image_capture.rfind('\n') + 1]
+
+def benchmarks(corpus, previews):
+    """Return [(name, items, callable)] for every benchmark"""
+    iterm2xrdb = load_script('iterm2xrdb')
+    xrdb2xresources = load_script('xrdb2Xresources')
+    xrdb2kitty = load_script('xrdb2kitty')
+    xrdb2vscode = load_script('xrdb2vscode')
+    dynamic_hterm = load_script('generate-dynamic-hterm')
+    import preview
+    from ansi import AnsiParser, theme_ansi_colors
+
+    directory = corpus.directory
+    png = os.path.join(directory, 'out.png')
+    theme = corpus.palettes[0]
+
+    def quiet(func, *args):
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            func(*args)
+
+    def each(func, items):
+        return lambda: [func(item) for item in items]
+
+    def parse_capture():
+        parser = AnsiParser(theme['Foreground_Color'], theme['Background_Color'],
+                            theme_ansi_colors(theme))
+        parser.parse_lines(corpus.capture)
+
+    return [
+        ('convert_iterm_to_xrdb', len(corpus.iterm_files),
+         each(lambda path: quiet(iterm2xrdb.convert_iterm_to_xrdb, path), corpus.iterm_files)),
+        ('xrdb2Xresources', len(corpus.names),
+         each(lambda name: quiet(xrdb2xresources.convert_xrdb_to_xresources, directory, name),
+              corpus.names)),
+        ('xrdb2kitty', len(corpus.names),
+         each(lambda name: quiet(xrdb2kitty.convert_xrdb_to_kitty, directory, name),
+              corpus.names)),
+        ('xrdb2vscode', len(corpus.names),
+         each(lambda name: quiet(xrdb2vscode.convert_xrdb_to_vscode, directory, name),
+              corpus.names)),
+        ('extract_colors', len(corpus.hterm),
+         each(dynamic_hterm.extract_colors, corpus.hterm)),
+        ('AnsiParser.parse_lines', len(corpus.capture), parse_capture),
+        ('ansi_to_image', len(corpus.image_capture),
+         lambda: preview.ansi_to_image(corpus.image_capture, png, 'benchmark', theme)),
+        ('generate_preview', min(previews, len(corpus.palettes)),
+         each(lambda colors: preview.generate_preview(colors, png),
+              corpus.palettes[:previews])),
+    ]
+
+def measure(func, repeat):
+    """Time func over repeat runs, then measure its peak traced memory once"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return times, peak
+
+def run(corpus, previews, repeat, selected=None):
+    """Run the benchmarks and return their results keyed by name"""
+    results = {}
+    for name, items, func in benchmarks(corpus, previews):
+        if selected and name not in selected:
+            continue
+        if not items:
+            # An empty corpus (e.g. --previews 0) has nothing to measure
+            print(f"{name:>24}  skipped: no items", file=sys.stderr)
+            continue
+        times, peak = measure(func, repeat)
+        best = min(times)
+        results[name] = {
+            'items': items,
+            'min_s': round(best, 6),
+            'median_s': round(statistics.median(times), 6),
+            'per_item_us': round(best / items * 1e6, 3),
+            'peak_bytes': peak,
+        }
+        print(f"{name:>24}  {best * 1000:10.1f} ms  {results[name]['per_item_us']:10.3f} us/item"
+              f"  {peak / 2 ** 20:8.1f} MiB peak", file=sys.stderr)
+    return results
+
+def compare(results, baseline, tolerance):
+    """Return regressions of results against a baseline result file"""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get('results', {}).get(name)
+        if not before or before.get('items') != result['items']:
+            continue
+        for metric in ('min_s', 'peak_bytes'):
+            old, new = before[metric], result[metric]
+            if old and new > old * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--schemes', type=int, default=DEFAULT_SCHEMES,
+                        help=f"schemes in the synthetic corpus (default: {DEFAULT_SCHEMES})")
+    parser.add_argument('--capture-mb', type=float, default=DEFAULT_CAPTURE_MB,
+                        help=f"ANSI capture size for parsing (default: {DEFAULT_CAPTURE_MB})")
+    parser.add_argument('--image-mb', type=float, default=DEFAULT_IMAGE_MB,
+                        help=f"ANSI capture size for ansi_to_image (default: {DEFAULT_IMAGE_MB})")
+    parser.add_argument('--previews', type=int, default=DEFAULT_PREVIEWS,
+                        help=f"schemes rendered by generate_preview (default: {DEFAULT_PREVIEWS})")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per benchmark")
+    parser.add_argument('--only', action='append', metavar='NAME', help="run only these benchmarks")
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT,
+                        help="result file (default: .cache/benchmarks.json)")
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help="fail if slower or larger than this result file")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="allowed regression as a fraction (default: 0.2)")
+    args = parser.parse_args()
+
+    # Read the baseline first: it may be the file this run is about to overwrite
+    baseline = None
+    if args.compare:
+        try:
+            with open(args.compare) as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            print(f"No baseline at {args.compare} yet, not comparing", file=sys.stderr)
+
+    with tempfile.TemporaryDirectory(prefix='colorscheme-bench-') as directory:
+        print(f"Generating corpus: {args.schemes} schemes, {args.capture_mb} MB capture",
+              file=sys.stderr)
+        corpus = Corpus(directory, args.schemes, args.capture_mb, args.image_mb)
+        results = run(corpus, args.previews, args.repeat, args.only)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': {
+            'schemes': args.schemes,
+            'capture_mb': args.capture_mb,
+            'image_mb': args.image_mb,
+            'previews': args.previews,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=4)
+        f.write('\n')
+    print(f"Wrote {args.output}", file=sys.stderr)
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"! {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Content-hash build cache so unchanged schemes skip regeneration"""
+
+import hashlib
+import json
+import os
+
+# Bump to invalidate every cached artifact regardless of content
+CACHE_VERSION = 1
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_FILE = os.path.join(ROOT_DIR, '.cache', 'build-cache.json')
+
+def content_key(sources, generators=()):
+    """Hash source files plus the generator scripts that process them"""
+    digest = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+    for path in list(sources) + list(generators):
+        digest.update(os.path.basename(path).encode() + b'\0')
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+class BuildCache:
+    """Map each build target to the content key it was last built from"""
+
+    def __init__(self, path=None):
+        self.path = path or os.environ.get('COLORSCHEME_BUILD_CACHE', DEFAULT_CACHE_FILE)
+        self.dirty = False
+        try:
+            with open(self.path, 'r') as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+
+    def fresh(self, target, key, outputs=()):
+        """True when target was built from key and all its outputs still exist"""
+        if os.environ.get('COLORSCHEME_FORCE') == '1':
+            return False
+        if self.entries.get(target) != key:
+            return False
+        return all(os.path.exists(output) for output in outputs)
+
+    def record(self, target, key):
+        """Remember that target is now up to date with key"""
+        if self.entries.get(target) != key:
+            self.entries[target] = key
+            self.dirty = True
+
+    def save(self):
+        """Persist the cache if anything changed"""
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
@@ -0,0 +1,101 @@
+"""In-process API over the converters, analyzers and renderers
+
+    import colorscheme
+    colors = colorscheme.load_palette('ManfredTouron.itermcolors')
+    kitty = colorscheme.convert(colors, 'kitty')
+    png = colorscheme.render_preview(colors)
+
+Every function returns a string, bytes or plain data instead of printing.
+Importing this module only loads the standard-library parsers and text
+renderers; Pillow and NumPy are imported the first time an image
+renderer or an analysis function is used.
+"""
+
+import io
+
+from palette import (COLOR_NAMES, WRITERS, Scheme, convert_schemes, load_palette, load_scheme,
+                     parse_xrdb, parse_xrdb_text, register_reader, register_writer, scheme_name,
+                     to_dynamic_hterm, to_hterm, to_kitty, to_osc, to_vscode, to_xrdb,
+                     to_xresources, writer)
+
+# Attributes resolved on first use: name -> (module, attribute)
+LAZY = {
+    'iterm_colors': ('iterm2xrdb', 'iterm_colors'),
+    'iterm_to_xrdb': ('iterm2xrdb', 'iterm_to_xrdb'),
+    'AnsiParser': ('ansi', 'AnsiParser'),
+    'strip_ansi_codes': ('ansi', 'strip_ansi_codes'),
+    'render_stream': ('ansi2html', 'render_stream'),
+    'SchemeLibrary': ('schemelib', 'SchemeLibrary'),
+    'pack_palette': ('schemelib', 'pack_palette'),
+    'unpack_palette': ('schemelib', 'unpack_palette'),
+    # NumPy
+    'scheme_array': ('colorspace', 'scheme_array'),
+    'stack_schemes': ('colorspace', 'stack_schemes'),
+    'audit': ('contrast', 'audit'),
+    'derive': ('variants', 'derive'),
+    'SchemeIndex': ('similar', 'SchemeIndex'),
+    'theme_index': ('nearest', 'theme_index'),
+    'CaptureLayout': ('compare', 'CaptureLayout'),
+    'symbolic_lines': ('compare', 'symbolic_lines'),
+}
+
+__all__ = ['COLOR_NAMES', 'FORMATS', 'Scheme', 'convert', 'convert_all', 'convert_iterm',
+           'convert_schemes', 'load_palette', 'load_scheme', 'parse_xrdb', 'parse_xrdb_text',
+           'register_reader', 'register_writer', 'render_ansi', 'render_html',
+           'render_preview', 'scheme_name', 'to_dynamic_hterm', 'to_hterm', 'to_kitty',
+           'to_osc', 'to_vscode', 'to_xrdb', 'to_xresources'] + sorted(LAZY)
+
+# Output formats by name: name -> (file suffix, write(Scheme)); see palette.register_writer
+FORMATS = WRITERS
+
+def __getattr__(name):
+    try:
+        module_name, attribute = LAZY[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    import importlib
+    value = getattr(importlib.import_module(module_name), attribute)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(LAZY))
+
+def convert(colors, fmt):
+    """Render a palette or Scheme in one output format ('kitty', 'alacritty', ...)"""
+    if not isinstance(colors, Scheme):
+        colors = Scheme.from_palette(colors)
+    return writer(fmt)[1](colors)
+
+def convert_all(colors, formats=None):
+    """Render a palette or Scheme in several formats, returning {format: text}"""
+    if not isinstance(colors, Scheme):
+        colors = Scheme.from_palette(colors)
+    return {fmt: text for _, fmt, text in convert_schemes([colors], formats or list(FORMATS))}
+
+def convert_iterm(data):
+    """Convert the bytes of an .itermcolors plist to an xrdb palette"""
+    import plistlib
+    from iterm2xrdb import iterm_colors
+    return iterm_colors(plistlib.loads(data))
+
+def render_preview(colors, title="ManfredTouron Color Scheme"):
+    """Render the swatch preview of a palette as PNG bytes"""
+    from preview import generate_preview
+    buffer = io.BytesIO()
+    generate_preview(colors, buffer, title)
+    return buffer.getvalue()
+
+def render_ansi(ansi_text, colors=None, title=""):
+    """Render ANSI text with a palette as PNG bytes"""
+    from preview import ansi_to_image
+    buffer = io.BytesIO()
+    ansi_to_image(ansi_text, buffer, title, colors)
+    return buffer.getvalue()
+
+def render_html(ansi_text, colors=None, title="", svg=False):
+    """Render ANSI text with a palette as an HTML (or SVG) document"""
+    from ansi2html import render_stream
+    buffer = io.StringIO()
+    render_stream([ansi_text], buffer, colors, svg=svg, title=title)
+    return buffer.getvalue()
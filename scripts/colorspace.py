@@ -0,0 +1,144 @@
+"""Vectorized color math over NumPy palette arrays
+
+A scheme is a (23, 3) uint8 array ordered like palette.COLOR_NAMES, and a
+corpus of schemes is a (S, 23, 3) stack, so conversions run as batched
+array operations instead of per-string Python loops.
+"""
+
+import numpy as np
+
+from palette import COLOR_NAMES
+
+# Row indices into a scheme array
+ANSI = slice(0, 16)
+BACKGROUND = COLOR_NAMES.index('Background_Color')
+FOREGROUND = COLOR_NAMES.index('Foreground_Color')
+CURSOR = COLOR_NAMES.index('Cursor_Color')
+CURSOR_TEXT = COLOR_NAMES.index('Cursor_Text_Color')
+BOLD = COLOR_NAMES.index('Bold_Color')
+SELECTION = COLOR_NAMES.index('Selection_Color')
+SELECTED_TEXT = COLOR_NAMES.index('Selected_Text_Color')
+
+# Colors missing from a scheme fall back to another entry of the same scheme
+FALLBACKS = {
+    'Cursor_Color': 'Foreground_Color',
+    'Cursor_Text_Color': 'Background_Color',
+    'Bold_Color': 'Foreground_Color',
+    'Selection_Color': 'Foreground_Color',
+    'Selected_Text_Color': 'Background_Color',
+}
+
+# Linear sRGB <-> OKLab (Björn Ottosson, 2020)
+_RGB_TO_LMS = np.array([
+    [0.4122214708, 0.5363325363, 0.0514459929],
+    [0.2119034982, 0.6806995451, 0.1073969566],
+    [0.0883024619, 0.2817188376, 0.6299787005],
+])
+_LMS_TO_OKLAB = np.array([
+    [0.2104542553, 0.7936177850, -0.0040720468],
+    [1.9779984951, -2.4285922050, 0.4505937099],
+    [0.0259040371, 0.7827717662, -0.8086757660],
+])
+_OKLAB_TO_LMS = np.linalg.inv(_LMS_TO_OKLAB)
+_LMS_TO_RGB = np.linalg.inv(_RGB_TO_LMS)
+
+# Rec. 709 luminance weights for linear sRGB
+_LUMINANCE = np.array([0.2126, 0.7152, 0.0722])
+
+# sRGB transfer function as a 256-entry table for uint8 input
+_SRGB_TO_LINEAR_LUT = None
+
+def hex_to_rgb(hex_colors):
+    """Convert '#rrggbb' strings to an (N, 3) uint8 array"""
+    if isinstance(hex_colors, str):
+        return hex_to_rgb([hex_colors])[0]
+    digits = ''.join(h.lstrip('#') for h in hex_colors)
+    if len(digits) != 6 * len(hex_colors):
+        raise ValueError(f"expected #rrggbb colors, got {list(hex_colors)!r}")
+    return np.frombuffer(bytes.fromhex(digits), dtype=np.uint8).reshape(-1, 3)
+
+def rgb_to_hex(rgb):
+    """Convert an (..., 3) uint8 array to '#rrggbb' strings"""
+    rgb = np.asarray(rgb)
+    if rgb.ndim == 1:
+        return '#' + rgb.astype(np.uint8).tobytes().hex()
+    digits = np.ascontiguousarray(rgb.reshape(-1, 3), dtype=np.uint8).tobytes().hex()
+    return ['#' + digits[i:i + 6] for i in range(0, len(digits), 6)]
+
+def to_float(rgb):
+    """Convert uint8 RGB to floats in [0, 1]"""
+    return np.asarray(rgb, dtype=np.float64) / 255.0
+
+def to_uint8(rgb):
+    """Convert floats in [0, 1] to rounded, clipped uint8 RGB"""
+    return np.clip(np.rint(np.asarray(rgb) * 255.0), 0, 255).astype(np.uint8)
+
+def srgb_to_linear(rgb):
+    """Decode sRGB (uint8 or float in [0, 1]) to linear light"""
+    global _SRGB_TO_LINEAR_LUT
+    rgb = np.asarray(rgb)
+    if rgb.dtype == np.uint8:
+        if _SRGB_TO_LINEAR_LUT is None:
+            _SRGB_TO_LINEAR_LUT = srgb_to_linear(np.arange(256) / 255.0)
+        return _SRGB_TO_LINEAR_LUT[rgb]
+    return np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+
+def linear_to_srgb(linear):
+    """Encode linear light to sRGB floats in [0, 1]"""
+    linear = np.clip(np.asarray(linear, dtype=np.float64), 0.0, 1.0)
+    return np.where(linear <= 0.0031308, linear * 12.92,
+                    1.055 * linear ** (1 / 2.4) - 0.055)
+
+def linear_to_oklab(linear):
+    """Convert linear sRGB (..., 3) to OKLab (..., 3)"""
+    lms = np.cbrt(np.asarray(linear) @ _RGB_TO_LMS.T)
+    return lms @ _LMS_TO_OKLAB.T
+
+def oklab_to_linear(lab):
+    """Convert OKLab (..., 3) to linear sRGB (..., 3), unclipped"""
+    lms = np.asarray(lab) @ _OKLAB_TO_LMS.T
+    return (lms ** 3) @ _LMS_TO_RGB.T
+
+def rgb_to_oklab(rgb):
+    """Convert uint8 sRGB (..., 3) to OKLab"""
+    return linear_to_oklab(srgb_to_linear(np.asarray(rgb, dtype=np.uint8)))
+
+def oklab_to_rgb(lab):
+    """Convert OKLab (..., 3) to uint8 sRGB, clipping out-of-gamut colors"""
+    return to_uint8(linear_to_srgb(oklab_to_linear(lab)))
+
+def oklab_to_oklch(lab):
+    """Convert OKLab to polar (L, C, h) with h in radians"""
+    lab = np.asarray(lab)
+    return np.stack([lab[..., 0],
+                     np.hypot(lab[..., 1], lab[..., 2]),
+                     np.arctan2(lab[..., 2], lab[..., 1])], axis=-1)
+
+def oklch_to_oklab(lch):
+    """Convert polar (L, C, h) back to OKLab"""
+    lch = np.asarray(lch)
+    return np.stack([lch[..., 0],
+                     lch[..., 1] * np.cos(lch[..., 2]),
+                     lch[..., 1] * np.sin(lch[..., 2])], axis=-1)
+
+def relative_luminance(rgb):
+    """WCAG relative luminance of uint8 sRGB (..., 3)"""
+    return srgb_to_linear(np.asarray(rgb, dtype=np.uint8)) @ _LUMINANCE
+
+def scheme_array(colors):
+    """Pack an xrdb {name: '#rrggbb'} palette into a (23, 3) uint8 array"""
+    values = []
+    for name in COLOR_NAMES:
+        value = colors.get(name) or colors.get(FALLBACKS.get(name, ''))
+        values.append(value or '#000000')
+    return hex_to_rgb(values)
+
+def scheme_colors(array):
+    """Unpack a (23, 3) scheme array into an xrdb {name: '#rrggbb'} palette"""
+    return dict(zip(COLOR_NAMES, rgb_to_hex(array)))
+
+def stack_schemes(palettes):
+    """Pack many xrdb palettes into an (S, 23, 3) uint8 array"""
+    if not palettes:
+        return np.zeros((0, len(COLOR_NAMES), 3), dtype=np.uint8)
+    return np.stack([scheme_array(colors) for colors in palettes])
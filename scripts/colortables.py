@@ -0,0 +1,141 @@
+"""Native generators for the contrib color tables as styled cell runs
+
+Each generator reproduces the screen produced by the matching
+contrib/*.sh script, but directly as lines of (text, fg, bg, bold) runs,
+the same structure AnsiParser.parse_lines returns, so the renderer can
+consume it without a bash subprocess or an ANSI round trip.
+"""
+
+from ansi import theme_ansi_colors, xterm_palette
+
+class RunGrid:
+    """Accumulate lines of styled runs, merging adjacent runs of equal style"""
+
+    def __init__(self, fg_color, bg_color, palette):
+        self.fg_color = fg_color
+        self.bg_color = bg_color
+        self.palette = palette
+        self.lines = [[]]
+
+    def style(self, fg=None, bg=None, bold=False):
+        """Resolve palette indices or hex colors to a (fg, bg, bold) style"""
+        if isinstance(fg, int):
+            fg = self.palette[fg]
+        if isinstance(bg, int):
+            bg = self.palette[bg]
+        return (fg or self.fg_color, bg or self.bg_color, bold)
+
+    def add(self, text, style):
+        """Append text in style to the current line"""
+        if not text:
+            return
+        line = self.lines[-1]
+        if line and line[-1][1:] == style:
+            line[-1] = (line[-1][0] + text,) + style
+        else:
+            line.append((text,) + style)
+
+    def newline(self, count=1):
+        """Start count new lines"""
+        for _ in range(count):
+            self.lines.append([])
+
+def color_table_16(grid):
+    """contrib/16-color-table.sh: 17 foregrounds on 9 backgrounds"""
+    test_text = 'gYw'
+    default = grid.style()
+    grid.newline()
+    grid.add("                 40m     41m     42m     43m     44m     45m     46m     47m", default)
+    grid.newline()
+
+    rows = [('    m', None, False), ('   1m', None, True)]
+    for i in range(8):
+        rows.append((f'  3{i}m', i, False))
+        rows.append((f'1;3{i}m', i + 8, True))  # bold selects the bright color
+
+    for label, fg, bold in rows:
+        fg_style = grid.style(fg, None, bold)
+        grid.add(f" {label} ", default)
+        grid.add(f"  {test_text}  ", fg_style)
+        for bg in range(8):
+            # The separator still uses the previous cell's attributes
+            grid.add(" ", fg_style if bg == 0 else default)
+            grid.add(f"  {test_text} ", grid.style(fg, bg, bold))
+            grid.add(" ", grid.style(None, bg))
+        grid.newline()
+    grid.newline()
+    return grid.lines
+
+def color_table_256(grid):
+    """contrib/256-color-table.sh: the 256-color background palette"""
+    default = grid.style()
+    grid.newline()
+    grid.add("   +  " + "".join(f"{i:>2} " for i in range(36)), default)
+
+    grid.newline(2)
+    grid.add(f" {0:>3}  ", default)
+    for i in range(16):
+        grid.add("  ", grid.style(None, i))
+        grid.add(" ", default)
+
+    for row in range(7):
+        start = row * 36 + 16
+        grid.newline(2)
+        grid.add(f" {start:>3}  ", default)
+        for value in range(start, start + 36):
+            # The last row runs past 255, which wraps like the SGR parser does
+            grid.add("  ", grid.style(None, value & 0xff))
+            grid.add(" ", default)
+    grid.newline(2)
+    return grid.lines
+
+def rainbow_color(i):
+    """RGB of position i/255 along the HSV hue circle, as in 24-bit-color.sh"""
+    h = i // 43
+    f = i - 43 * h
+    t = f * 255 // 43
+    q = 255 - t
+    return [
+        (255, t, 0),
+        (q, 255, 0),
+        (0, 255, t),
+        (0, q, 255),
+        (t, 0, 255),
+        (255, 0, q),
+    ][h] if h < 6 else (0, 0, 0)
+
+def color_test_24bit(grid):
+    """contrib/24-bit-color.sh: red, green, blue and rainbow gradients"""
+    ramps = [
+        lambda i: (i, 0, 0),
+        lambda i: (0, i, 0),
+        lambda i: (0, 0, i),
+        rainbow_color,
+    ]
+    for ramp in ramps:
+        for values in (range(128), range(255, 127, -1)):
+            for i in values:
+                r, g, b = ramp(i)
+                grid.add(" ", grid.style(None, f'#{r:02x}{g:02x}{b:02x}'))
+            grid.newline()
+    return grid.lines
+
+# contrib script name -> native generator
+GENERATORS = {
+    '16-color-table.sh': color_table_16,
+    '256-color-table.sh': color_table_256,
+    '24-bit-color.sh': color_test_24bit,
+}
+
+def generate_table(script_name, theme_colors=None):
+    """Produce the lines of runs of a contrib script, or None if not native"""
+    generator = GENERATORS.get(script_name)
+    if generator is None:
+        return None
+    fg_color = '#ffffff'
+    bg_color = '#000000'
+    if theme_colors:
+        bg_color = theme_colors.get('Background_Color', '#000000')
+        fg_color = theme_colors.get('Foreground_Color', '#ffffff')
+    palette = xterm_palette(theme_ansi_colors(theme_colors))
+    return generator(RunGrid(fg_color, bg_color, palette))
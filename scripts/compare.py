@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""Render one ANSI capture in many color schemes from a single layout pass
+
+The capture is parsed and laid out once with symbolic colors: every run
+names its color slot (Ansi_1_Color, Foreground_Color, ...) instead of a
+hex value, and only 256-color cube and truecolor entries are literal.
+Rasterizing that layout with the glyph atlas gives, per pixel, the slot
+underneath, the slot of the glyph ink over it and the ink coverage. A
+capture has only a few thousand distinct such mixes, so a scheme is
+rendered by blending those mixes (the way Pillow blends a pasted glyph)
+and gathering them into the image in one NumPy indexing step: no
+parsing, font or glyph work is repeated per scheme.
+
+Where glyphs overlap (an overhanging glyph touching its neighbour), the
+later ink takes the pixel with the combined coverage; elsewhere the
+output is identical to ansi_to_image.
+"""
+
+import argparse
+import math
+import os
+import sys
+
+import numpy as np
+from PIL import Image
+
+from ansi import AnsiParser, theme_ansi_colors
+from palette import find_schemes, load_palette, scheme_name, unique_schemes
+from preview import SCREEN_HISTORY, capture_layout, draw_title, theme_fg_bg
+from raster import rgb
+from vt import Screen, parse_size
+
+# Theme-dependent color slots, named as in xrdb palettes
+SLOT_NAMES = [f'Ansi_{i}_Color' for i in range(16)] + ['Foreground_Color', 'Background_Color']
+
+# A "theme" whose colors are their own slot names
+SYMBOLIC_THEME = {name: name for name in SLOT_NAMES}
+
+def symbolic_lines(ansi_text, screen_size=None):
+    """Parse a capture into lines of runs whose colors are slot names
+
+    With screen_size=(cols, rows) the capture is executed on a vt.Screen,
+    as with ansi_to_image.
+    """
+    if screen_size:
+        cols, rows = screen_size
+        screen = Screen(cols, rows, SYMBOLIC_THEME, history=SCREEN_HISTORY)
+        screen.feed(ansi_text)
+        return screen.lines()
+    fg_color, bg_color = theme_fg_bg(SYMBOLIC_THEME)
+    parser = AnsiParser(fg_color, bg_color, theme_ansi_colors(SYMBOLIC_THEME))
+    return parser.parse_lines(ansi_text)
+
+def theme_slots(theme_colors):
+    """Map slot names to a theme's colors, with the renderer's defaults"""
+    fg_color, bg_color = theme_fg_bg(theme_colors)
+    return dict(zip(SLOT_NAMES, theme_ansi_colors(theme_colors) + [fg_color, bg_color]))
+
+class CaptureLayout:
+    """The theme-independent pixels of a capture, recolored per scheme
+
+    Pixels are stored as indices into a table of distinct mixes: the
+    color under the glyph, the glyph's ink color, both as indices into
+    self.colors (slot names or literal '#rrggbb'), and the coverage.
+    """
+
+    def __init__(self, lines):
+        atlas, self.size, origin = capture_layout(lines)
+        self.colors = []
+        color_ids = {}
+
+        def color_id(color):
+            if color not in color_ids:
+                color_ids[color] = len(self.colors)
+                self.colors.append(color)
+            return color_ids[color]
+
+        default_bg = color_id('Background_Color')
+        base = Image.new('I', self.size, default_bg)
+        ink = Image.new('I', self.size, color_id('Foreground_Color'))
+        coverage = Image.new('L', self.size, 0)
+        binary = {}
+
+        # Same walk as GlyphAtlas.draw_lines, painting color ids and coverage
+        x0, y0 = origin
+        cw, ch = atlas.cell_width, atlas.cell_height
+        width, height = self.size
+        for row, line in enumerate(lines):
+            y = y0 + row * ch
+            if y >= height:
+                break
+            x = x0
+            for text, fg, bg, bold in line:
+                run_width = len(text) * cw
+                if bg != 'Background_Color' and x < width:
+                    base.paste(color_id(bg), (x, y, min(x + run_width, width), y + ch))
+                x += run_width
+            x = x0
+            for text, fg, bg, bold in line:
+                for char in text:
+                    if x >= width:
+                        break
+                    if not char.isspace():
+                        mask = atlas.mask(char, bold)
+                        key = (char, bold)
+                        if key not in binary:
+                            binary[key] = mask.point(lambda v: 255 if v else 0)
+                        coverage.paste(255, (x, y), mask)
+                        ink.paste(color_id(fg), (x, y), binary[key])
+                    x += cw
+
+        # Pack (base, ink, coverage) per pixel and keep the distinct mixes
+        packed = ((np.asarray(base, dtype=np.int64) << 40)
+                  | (np.asarray(ink, dtype=np.int64) << 8)
+                  | np.asarray(coverage, dtype=np.int64))
+        mixes, pixels = np.unique(packed, return_inverse=True)
+        self.pixels = pixels.reshape(packed.shape).astype(np.uint32)
+        self.mix_base = mixes >> 40
+        self.mix_ink = (mixes >> 8) & 0xffffffff
+        self.mix_coverage = (mixes & 0xff)[:, None]
+
+    def render(self, theme_colors, title=""):
+        """Render the layout in a theme, returning a PIL image"""
+        slots = theme_slots(theme_colors)
+        table = np.array([rgb(slots.get(color, color)) for color in self.colors], dtype=np.int64)
+        # Pillow's blend: (under * (255 - a) + ink * a) / 255, rounded
+        a = self.mix_coverage
+        mixed = table[self.mix_base] * (255 - a) + table[self.mix_ink] * a + 128
+        mixed = ((mixed >> 8) + mixed) >> 8
+        img = Image.fromarray(np.take(mixed.astype(np.uint8), self.pixels, axis=0), 'RGB')
+        if title:
+            draw_title(img, title, slots['Foreground_Color'])
+        return img
+
+def grid_size(count, columns=None):
+    """Return the (columns, rows) of a square-ish grid of count tiles"""
+    columns = columns or math.ceil(math.sqrt(count))
+    return columns, math.ceil(count / columns)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('capture', help="ANSI capture to render, or - for stdin")
+    parser.add_argument('schemes', nargs='+', help=".xrdb/.itermcolors/.pal files or directories")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument('-o', '--output-dir', help="write one <scheme>.png per scheme here")
+    output.add_argument('-g', '--grid', help="write all schemes tiled into this PNG")
+    parser.add_argument('-c', '--columns', type=int,
+                        help="grid columns (default: a square-ish grid)")
+    parser.add_argument('-s', '--size', type=parse_size, metavar='COLSxROWS',
+                        help="execute the capture on a virtual terminal of this size")
+    args = parser.parse_args()
+
+    if args.capture == '-':
+        ansi_text = sys.stdin.read()
+    else:
+        with open(args.capture, encoding='utf-8', errors='replace') as f:
+            ansi_text = f.read()
+    layout = CaptureLayout(symbolic_lines(ansi_text, args.size))
+
+    # One tile or file per name, though schemes ship as both .xrdb and .itermcolors
+    paths = unique_schemes(find_schemes(args.schemes))
+    if not paths:
+        print("No schemes found", file=sys.stderr)
+        sys.exit(1)
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    else:
+        # Tiles are pasted in as they are rendered, in scheme order
+        columns, rows = grid_size(len(paths), args.columns)
+        width, height = layout.size
+        grid = Image.new('RGB', (columns * width, rows * height))
+
+    rendered = 0
+    for i, path in enumerate(paths):
+        name = scheme_name(path)
+        try:
+            img = layout.render(load_palette(path), name)
+        except Exception as e:
+            print(f"! {path}: {e}", file=sys.stderr)
+            continue
+        if args.output_dir:
+            img.save(os.path.join(args.output_dir, f"{name}.png"), format='PNG')
+        else:
+            grid.paste(img, ((i % columns) * width, (i // columns) * height))
+        rendered += 1
+    if args.grid:
+        grid.save(args.grid, format='PNG')
+    print(f"Rendered {rendered} of {len(paths)} schemes", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Compile xrdb color schemes to every target format in a single pass"""
+
+import os
+import sys
+from pathlib import Path
+
+import palette
+from buildcache import BuildCache, content_key
+from instrument import timed
+from palette import TARGETS, Scheme, hterm_colors, parse_xrdb, to_dynamic_hterm, writer
+
+# Changes to these files invalidate every cached theme
+GENERATORS = [os.path.abspath(__file__), os.path.abspath(palette.__file__)]
+
+def write_if_changed(path, content):
+    """Write content to path, leaving the file untouched when identical"""
+    try:
+        with open(path, 'r') as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+    with open(path, 'w') as f:
+        f.write(content)
+    return True
+
+@timed
+def compile_theme(directory, theme_name, colors):
+    """Write all single-scheme targets for one parsed palette"""
+    scheme = Scheme.from_palette(colors, theme_name)
+    for fmt in TARGETS:
+        suffix, write = writer(fmt)
+        output_file = Path(directory) / f"{theme_name}{suffix}"
+        if write_if_changed(output_file, write(scheme)):
+            print(f"Generated {output_file}")
+
+def compile_themes(directory, theme_names, cache=None):
+    """Parse each changed scheme once, then emit every target format"""
+    cache = cache or BuildCache()
+    xrdb_files = {}
+    palettes = {}
+
+    def load(theme_name):
+        if theme_name not in palettes:
+            palettes[theme_name] = parse_xrdb(xrdb_files[theme_name])
+        return palettes[theme_name]
+
+    for theme_name in theme_names:
+        xrdb_file = Path(directory) / f"{theme_name}.xrdb"
+        if not xrdb_file.exists():
+            print(f"! {xrdb_file} not found", file=sys.stderr)
+            continue
+        xrdb_files[theme_name] = xrdb_file
+
+        key = content_key([xrdb_file], GENERATORS)
+        outputs = [Path(directory) / f"{theme_name}{writer(fmt)[0]}" for fmt in TARGETS]
+        target = str(xrdb_file.resolve())
+        if cache.fresh(target, key, outputs):
+            continue
+        compile_theme(directory, theme_name, load(theme_name))
+        cache.record(target, key)
+
+    # Pair every dark scheme with its -Light variant for the dynamic hterm
+    for theme_name, xrdb_file in xrdb_files.items():
+        light_file = xrdb_files.get(f"{theme_name}-Light")
+        if light_file is None:
+            continue
+        output_file = Path(directory) / f"{theme_name}-Dynamic.hterm.js"
+        key = content_key([xrdb_file, light_file], GENERATORS)
+        target = str(output_file.resolve())
+        if cache.fresh(target, key, [output_file]):
+            continue
+        content = to_dynamic_hterm(hterm_colors(load(theme_name)),
+                                   hterm_colors(load(f"{theme_name}-Light")))
+        if write_if_changed(output_file, content):
+            print(f"Generated {output_file}")
+        cache.record(target, key)
+
+    cache.save()
+    return palettes
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: compile-themes.py <directory> [theme_name ...]", file=sys.stderr)
+        sys.exit(1)
+
+    directory = sys.argv[1]
+    theme_names = sys.argv[2:] or ["ManfredTouron", "ManfredTouron-Light"]
+    compile_themes(directory, theme_names)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Audit WCAG contrast and APCA readability of color schemes"""
+
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from colorspace import (BACKGROUND, CURSOR, FOREGROUND, SELECTION, relative_luminance,
+                        stack_schemes)
+from palette import find_schemes, load_palette, scheme_name, unique_schemes
+
+# Colors audited against each other: the 16 ANSI colors plus the specials
+AUDIT_ROWS = list(range(16)) + [FOREGROUND, BACKGROUND, CURSOR, SELECTION]
+AUDIT_LABELS = [str(i) for i in range(16)] + ['fg', 'bg', 'cursor', 'selection']
+
+# APCA 0.0.98G-4g constants
+APCA_COEFFS = np.array([0.2126729, 0.7151522, 0.0721750])
+APCA_BLACK_THRESHOLD = 0.022
+APCA_BLACK_CLAMP = 1.414
+APCA_DELTA_Y_MIN = 0.0005
+APCA_SCALE = 1.14
+APCA_OFFSET = 0.027
+APCA_LO_CLIP = 0.1
+
+def contrast_ratios(rgb):
+    """WCAG contrast ratio for every pair of colors along the second-to-last axis
+
+    rgb has shape (S, K, 3); the result has shape (S, K, K).
+    """
+    lum = relative_luminance(rgb)
+    hi = np.maximum(lum[:, :, None], lum[:, None, :])
+    lo = np.minimum(lum[:, :, None], lum[:, None, :])
+    return (hi + 0.05) / (lo + 0.05)
+
+def apca_luminance(rgb):
+    """APCA screen luminance with the soft black clamp applied"""
+    y = (np.asarray(rgb, dtype=np.float64) / 255.0) ** 2.4 @ APCA_COEFFS
+    return np.where(y < APCA_BLACK_THRESHOLD,
+                    y + np.clip(APCA_BLACK_THRESHOLD - y, 0, None) ** APCA_BLACK_CLAMP,
+                    y)
+
+def apca_contrast(rgb):
+    """APCA lightness contrast Lc of text [.., i] on background [.., j]
+
+    rgb has shape (S, K, 3); the result has shape (S, K, K) with the text
+    color on the first K axis and the background on the second.
+    """
+    y = apca_luminance(rgb)
+    text = y[:, :, None]
+    bg = y[:, None, :]
+    normal = (bg ** 0.56 - text ** 0.57) * APCA_SCALE  # dark text on light bg
+    reverse = (bg ** 0.65 - text ** 0.62) * APCA_SCALE  # light text on dark bg
+    sapc = np.where(bg > text, normal, reverse)
+    lc = np.where(sapc > 0, sapc - APCA_OFFSET, sapc + APCA_OFFSET)
+    lc = np.where(np.abs(sapc) < APCA_LO_CLIP, 0.0, lc)
+    lc = np.where(np.abs(bg - text) < APCA_DELTA_Y_MIN, 0.0, lc)
+    return lc * 100.0
+
+def audit(schemes, threshold=4.5):
+    """Score a stack of (S, 23, 3) schemes, returning per-scheme metrics"""
+    rgb = schemes[:, AUDIT_ROWS]
+    ratios = contrast_ratios(rgb)
+    lc = apca_contrast(rgb)
+
+    bg = AUDIT_ROWS.index(BACKGROUND)
+    # Text colors that must be legible on the background: ANSI 1-15 and fg
+    text_rows = list(range(1, 16)) + [AUDIT_ROWS.index(FOREGROUND)]
+    on_bg = ratios[:, text_rows, bg]
+    lc_on_bg = np.abs(lc[:, text_rows, bg])
+    return {
+        'ratios': ratios,
+        'apca': lc,
+        'text_rows': text_rows,
+        'failures': (on_bg < threshold).sum(axis=1),
+        'min_ratio': on_bg.min(axis=1),
+        'mean_ratio': on_bg.mean(axis=1),
+        'mean_apca': lc_on_bg.mean(axis=1),
+    }
+
+def rank(names, result):
+    """Order scheme indices from most to least legible"""
+    return sorted(range(len(names)),
+                  key=lambda i: (result['failures'][i], -result['mean_apca'][i], names[i]))
+
+def print_scheme_report(name, result, index, threshold):
+    """Print the failing pairs of a single scheme"""
+    ratios = result['ratios'][index]
+    lc = result['apca'][index]
+    print(f"{name}: {result['failures'][index]} text colors below {threshold}:1 on background "
+          f"(min {result['min_ratio'][index]:.2f}:1, mean APCA Lc {result['mean_apca'][index]:.1f})")
+    bg = AUDIT_LABELS.index('bg')
+    for row in result['text_rows']:
+        ratio = ratios[row, bg]
+        marker = '!' if ratio < threshold else ' '
+        print(f"  {marker} {AUDIT_LABELS[row]:>9} on bg  {ratio:5.2f}:1  Lc {lc[row, bg]:6.1f}")
+
+def print_ranking(names, result):
+    """Print schemes ranked by legibility"""
+    print(f"{'rank':>4}  {'fail':>4}  {'min':>6}  {'mean':>6}  {'APCA':>5}  scheme")
+    for position, i in enumerate(rank(names, result), 1):
+        print(f"{position:>4}  {result['failures'][i]:>4}  {result['min_ratio'][i]:6.2f}  "
+              f"{result['mean_ratio'][i]:6.2f}  {result['mean_apca'][i]:5.1f}  {names[i]}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('paths', nargs='+', help=".xrdb/.itermcolors files or directories")
+    parser.add_argument('--threshold', type=float, default=4.5,
+                        help="minimum WCAG contrast ratio (default: 4.5, AA body text)")
+    parser.add_argument('--json', action='store_true', help="emit machine-readable results")
+    args = parser.parse_args()
+
+    files = unique_schemes(find_schemes(args.paths))
+    names, palettes = [], []
+    for path in files:
+        try:
+            palettes.append(load_palette(path))
+            names.append(scheme_name(path))
+        except Exception as e:
+            print(f"! {path}: {e}", file=sys.stderr)
+    if not palettes:
+        print("No schemes found", file=sys.stderr)
+        sys.exit(1)
+
+    result = audit(stack_schemes(palettes), args.threshold)
+
+    if args.json:
+        report = []
+        for i in rank(names, result):
+            report.append({
+                'scheme': names[i],
+                'failures': int(result['failures'][i]),
+                'min_ratio': round(float(result['min_ratio'][i]), 3),
+                'mean_ratio': round(float(result['mean_ratio'][i]), 3),
+                'mean_apca': round(float(result['mean_apca'][i]), 2),
+            })
+        print(json.dumps(report, indent=4))
+    elif len(names) == 1:
+        print_scheme_report(names[0], result, 0, args.threshold)
+    else:
+        print_ranking(names, result)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Convert color schemes to any registered output format
+
+Every scheme is read once into a Scheme record, then rendered by each
+requested writer, so converting N schemes to M formats parses N files
+and compiles no templates beyond those built at import.
+"""
+
+import argparse
+import os
+import sys
+
+from palette import WRITERS, convert_schemes, find_schemes, load_scheme, unique_schemes, writer
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='+', help=".xrdb/.itermcolors/.pal files or directories")
+    parser.add_argument('-f', '--format', action='append', dest='formats',
+                        choices=sorted(WRITERS), metavar='FORMAT',
+                        help=f"output format, may be repeated (default: all of "
+                             f"{', '.join(sorted(WRITERS))})")
+    parser.add_argument('-o', '--output-dir',
+                        help="write <name><suffix> files here instead of stdout")
+    args = parser.parse_args()
+
+    schemes = []
+    for path in unique_schemes(find_schemes(args.paths)):
+        try:
+            schemes.append(load_scheme(path))
+        except Exception as e:
+            print(f"! {path}: {e}", file=sys.stderr)
+    if not schemes:
+        print("No schemes found", file=sys.stderr)
+        sys.exit(1)
+    formats = args.formats or sorted(WRITERS)
+
+    if not args.output_dir:
+        for scheme, fmt, text in convert_schemes(schemes, formats):
+            if len(schemes) > 1 or len(formats) > 1:
+                print(f"# {scheme.name}{writer(fmt)[0]}")
+            print(text, end="")
+        return
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for scheme, fmt, text in convert_schemes(schemes, formats):
+        output_file = os.path.join(args.output_dir, f"{scheme.name}{writer(fmt)[0]}")
+        with open(output_file, 'w') as f:
+            f.write(text)
+    print(f"Wrote {len(schemes)} schemes in {len(formats)} formats to {args.output_dir}",
+          file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
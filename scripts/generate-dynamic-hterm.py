@@ -5,6 +5,10 @@ import re
 import os
 import sys
 
+from palette import to_dynamic_hterm
+from instrument import timed
+
+@timed
 def extract_colors(content):
     """Extract color values from hterm.js content"""
     colors = {}
@@ -47,60 +51,7 @@ def main():
         light_colors = extract_colors(light_content)
         
         # Generate the dynamic theme file
-        dynamic_content = f"""// ManfredTouron Dynamic Theme for hterm/Blink Shell
-// Automatically switches between light and dark themes based on system preferences
-// Generated from ManfredTouron.hterm.js and ManfredTouron-Light.hterm.js
-
-// Dark theme configuration
-const darkScheme = {{
-  cursor: '{dark_colors['cursor']}',
-  foreground: '{dark_colors['foreground']}',
-  background: '{dark_colors['background']}',
-  colors: [{', '.join(f"'{c}'" for c in dark_colors['palette'])}]
-}};
-
-// Light theme configuration
-const lightScheme = {{
-  cursor: '{light_colors['cursor']}',
-  foreground: '{light_colors['foreground']}',
-  background: '{light_colors['background']}',
-  colors: [{', '.join(f"'{c}'" for c in light_colors['palette'])}]
-}};
-
-// Function to apply theme
-function applyTheme(theme) {{
-  t.prefs_.set('cursor-color', theme.cursor);
-  t.prefs_.set('foreground-color', theme.foreground);
-  t.prefs_.set('background-color', theme.background);
-  if (theme.colors) {{
-    t.prefs_.set('color-palette-overrides', theme.colors);
-  }}
-}}
-
-// Function to set theme based on system preference
-function setPreferredScheme() {{
-  const isDarkMode = window.matchMedia && window.matchMedia('(prefers-color-scheme: dark)').matches;
-  applyTheme(isDarkMode ? darkScheme : lightScheme);
-}}
-
-// Apply initial theme
-setPreferredScheme();
-
-// Listen for theme changes
-if (window.matchMedia) {{
-  window.matchMedia('(prefers-color-scheme: dark)').addEventListener('change', setPreferredScheme);
-}}
-
-// Optional: Add manual theme toggle function
-window.toggleManfredTouronTheme = function() {{
-  const currentBackground = t.prefs_.get('background-color');
-  if (currentBackground === darkScheme.background) {{
-    applyTheme(lightScheme);
-  }} else {{
-    applyTheme(darkScheme);
-  }}
-}};
-"""
+        dynamic_content = to_dynamic_hterm(dark_colors, light_colors)
 
         with open(output_file, 'w') as f:
             f.write(dynamic_content)
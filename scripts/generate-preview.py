@@ -3,134 +3,90 @@
 
 import os
 import sys
-from PIL import Image, ImageDraw, ImageFont
 
-def parse_xrdb(filename):
-    """Parse colors from xrdb file"""
-    colors = {}
-    with open(filename, 'r') as f:
-        for line in f:
-            if line.startswith('#define'):
-                parts = line.split()
-                if len(parts) >= 3:
-                    color_name = parts[1]
-                    color_value = parts[2]
-                    colors[color_name] = color_value
-    return colors
+from buildcache import BuildCache, content_key
+from colortables import generate_table
+from instrument import span, timed
+from palette import parse_xrdb
 
-def generate_preview(colors, output_file, title="ManfredTouron Color Scheme"):
-    """Generate a preview image of the color scheme"""
-    # Image settings
-    width = 800
-    height = 600
-    cell_size = 60
-    padding = 20
-    
-    # Create image with background color
-    bg_color = colors.get('Background_Color', '#000000')
-    fg_color = colors.get('Foreground_Color', '#ffffff')
-    
-    img = Image.new('RGB', (width, height), bg_color)
-    draw = ImageDraw.Draw(img)
+try:
+    from preview import ansi_to_image, generate_preview, runs_to_image
+except ImportError:
+    print("Error: Pillow library not found. Install with: pip install Pillow")
+    sys.exit(1)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Changes to this script or to any script it imports, directly or through
+# preview, invalidate every cached preview
+GENERATORS = sorted({os.path.abspath(module.__file__) for module in list(sys.modules.values())
+                     if getattr(module, '__file__', None)
+                     and os.path.dirname(os.path.abspath(module.__file__)) == SCRIPT_DIR}
+                    | {os.path.abspath(__file__)})
+
+# Virtual terminal size for script output without a native generator;
+# wide enough that table rows are not wrapped
+CAPTURE_SCREEN = (160, 50)
+
+@timed
+def render_color_table(script_path, theme_path, theme_name, output_file, title):
+    """Run one contrib script under a theme and render its output to PNG"""
+    import subprocess
     
-    # Try to use a monospace font
+    script_name = os.path.basename(script_path)
     try:
-        font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf", 16)
-        title_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 24)
-    except:
-        font = ImageFont.load_default()
-        title_font = font
-    
-    # Draw title
-    draw.text((padding, padding), title, fill=fg_color, font=title_font)
-    
-    # Draw color grid
-    y_offset = padding + 50
-    
-    # Draw ANSI colors 0-7
-    draw.text((padding, y_offset), "Normal Colors:", fill=fg_color, font=font)
-    y_offset += 25
-    
-    for i in range(8):
-        x = padding + (i * (cell_size + 5))
-        y = y_offset
-        color = colors.get(f'Ansi_{i}_Color', '#000000')
+        # Load theme colors
+        theme_colors = parse_xrdb(theme_path)
         
-        # Draw color box
-        draw.rectangle([x, y, x + cell_size, y + cell_size], fill=color, outline=fg_color)
+        theme_title = f"{title} ({theme_name.title()} Theme)"
         
-        # Draw color number
-        text = str(i)
-        bbox = draw.textbbox((0, 0), text, font=font)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-        text_x = x + (cell_size - text_width) // 2
-        text_y = y + (cell_size - text_height) // 2
+        # Build the table in-process when a native generator exists
+        lines = generate_table(script_name, theme_colors)
+        if lines is not None:
+            runs_to_image(lines, output_file, theme_title, theme_colors)
+            return None
         
-        # Use contrasting color for text
-        text_color = '#000000' if i > 0 else '#ffffff'
-        draw.text((text_x, text_y), text, fill=text_color, font=font)
-    
-    # Draw ANSI colors 8-15
-    y_offset += cell_size + 20
-    draw.text((padding, y_offset), "Bright Colors:", fill=fg_color, font=font)
-    y_offset += 25
-    
-    for i in range(8, 16):
-        x = padding + ((i - 8) * (cell_size + 5))
-        y = y_offset
-        color = colors.get(f'Ansi_{i}_Color', '#000000')
+        # Set terminal colors using OSC escape sequences:
+        # 4;n for the palette, 11 for background, 10 for foreground
+        osc_targets = [(f'4;{i}', f'Ansi_{i}_Color') for i in range(16)]
+        osc_targets += [('11', 'Background_Color'), ('10', 'Foreground_Color')]
+        osc_targets = [(osc, theme_colors[key].lstrip('#').lower()) for osc, key in osc_targets
+                       if key in theme_colors and len(theme_colors[key].lstrip('#')) == 6]
+        color_setup = "".join(
+            f"\033]{osc};rgb:{digits[0:2]}/{digits[2:4]}/{digits[4:6]}\033\\"
+            for osc, digits in osc_targets
+        )
         
-        # Draw color box
-        draw.rectangle([x, y, x + cell_size, y + cell_size], fill=color, outline=fg_color)
+        # Run the script and capture output
+        script_cmd = f"printf '{color_setup}'; bash {script_path}"
+        result = subprocess.run(script_cmd, 
+                              capture_output=True, 
+                              text=True, 
+                              shell=True,
+                              timeout=30)
         
-        # Draw color number
-        text = str(i)
-        bbox = draw.textbbox((0, 0), text, font=font)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-        text_x = x + (cell_size - text_width) // 2
-        text_y = y + (cell_size - text_height) // 2
+        if result.returncode != 0:
+            return f"Error running {script_name} with {theme_name}: {result.stderr}"
         
-        # Use contrasting color for text
-        text_color = '#000000'
-        draw.text((text_x, text_y), text, fill=text_color, font=font)
-    
-    # Draw sample text
-    y_offset += cell_size + 40
-    draw.text((padding, y_offset), "Sample Text:", fill=fg_color, font=font)
-    y_offset += 25
-    
-    sample_texts = [
-        ("Normal text in foreground color", fg_color),
-        ("Red text sample", colors.get('Ansi_1_Color', '#ff0000')),
-        ("Green text sample", colors.get('Ansi_2_Color', '#00ff00')),
-        ("Yellow text sample", colors.get('Ansi_3_Color', '#ffff00')),
-        ("Blue text sample", colors.get('Ansi_4_Color', '#0000ff')),
-        ("Magenta text sample", colors.get('Ansi_5_Color', '#ff00ff')),
-        ("Cyan text sample", colors.get('Ansi_6_Color', '#00ffff')),
-    ]
-    
-    for text, color in sample_texts:
-        draw.text((padding + 20, y_offset), text, fill=color, font=font)
-        y_offset += 25
-    
-    # Save image
-    img.save(output_file)
-    print(f"Generated {output_file}")
+        # Execute the output on a virtual terminal and render what it shows
+        ansi_to_image(result.stdout, output_file, theme_title, theme_colors,
+                      screen_size=CAPTURE_SCREEN)
+    except subprocess.TimeoutExpired:
+        return f"Timeout running {script_name} with {theme_name}"
+    except Exception as e:
+        return f"Error generating preview for {script_name} with {theme_name}: {e}"
+    return None
 
-def generate_color_table_previews(root_dir):
-    """Generate previews from the contrib color table scripts"""
-    import subprocess
-    import tempfile
-    
-    # Check if PIL is available
+def render_theme_preview(xrdb_file, output_file, title):
+    """Render the swatch preview of one theme"""
     try:
-        from PIL import Image, ImageFont, ImageDraw
-    except ImportError:
-        print("Skipping color table previews - Pillow not available")
-        return
-    
+        generate_preview(parse_xrdb(xrdb_file), output_file, title)
+    except Exception as e:
+        return f"Error generating {output_file}: {e}"
+    return None
+
+def color_table_jobs(root_dir, cache=None):
+    """List the (output, key, function, args) jobs for stale color table previews"""
     assets_dir = os.path.join(root_dir, 'assets')
     os.makedirs(assets_dir, exist_ok=True)
     
@@ -146,6 +102,7 @@ def generate_color_table_previews(root_dir):
         ('ManfredTouron-Light.xrdb', 'light')
     ]
     
+    jobs = []
     for script_name, output_base, title in scripts:
         script_path = os.path.join(root_dir, 'contrib', script_name)
         if not os.path.exists(script_path):
@@ -157,313 +114,87 @@ def generate_color_table_previews(root_dir):
             if not os.path.exists(theme_path):
                 print(f"Theme {theme_path} not found, skipping")
                 continue
-                
-            try:
-                # Apply theme colors to terminal before running script
-                env = os.environ.copy()
-                
-                # Load theme colors
-                theme_colors = parse_xrdb(theme_path)
-                
-                # Set terminal colors using ANSI escape sequences
-                color_setup = ""
-                for i in range(16):
-                    color_key = f'Ansi_{i}_Color'
-                    if color_key in theme_colors:
-                        color = theme_colors[color_key]
-                        # Convert hex to RGB
-                        hex_color = color.lstrip('#')
-                        if len(hex_color) == 6:
-                            r = int(hex_color[0:2], 16)
-                            g = int(hex_color[2:4], 16)
-                            b = int(hex_color[4:6], 16)
-                            # OSC 4 sequence to set palette color
-                            color_setup += f"\033]4;{i};rgb:{r:02x}/{g:02x}/{b:02x}\033\\"
-                
-                # Set background and foreground colors
-                if 'Background_Color' in theme_colors:
-                    bg = theme_colors['Background_Color'].lstrip('#')
-                    if len(bg) == 6:
-                        r = int(bg[0:2], 16)
-                        g = int(bg[2:4], 16) 
-                        b = int(bg[4:6], 16)
-                        color_setup += f"\033]11;rgb:{r:02x}/{g:02x}/{b:02x}\033\\"
-                
-                if 'Foreground_Color' in theme_colors:
-                    fg = theme_colors['Foreground_Color'].lstrip('#')
-                    if len(fg) == 6:
-                        r = int(fg[0:2], 16)
-                        g = int(fg[2:4], 16)
-                        b = int(fg[4:6], 16)
-                        color_setup += f"\033]10;rgb:{r:02x}/{g:02x}/{b:02x}\033\\"
-                
-                # Run the script and capture output
-                script_cmd = f"printf '{color_setup}'; bash {script_path}"
-                result = subprocess.run(script_cmd, 
-                                      capture_output=True, 
-                                      text=True, 
-                                      shell=True,
-                                      timeout=30)
-                
-                if result.returncode == 0:
-                    # Convert ANSI output to image
-                    output_name = f"{output_base}-{theme_name}.png"
-                    output_file = os.path.join(assets_dir, output_name)
-                    theme_title = f"{title} ({theme_name.title()} Theme)"
-                    ansi_to_image(result.stdout, output_file, theme_title, theme_colors)
-                    print(f"Generated {output_file}")
-                else:
-                    print(f"Error running {script_name} with {theme_name}: {result.stderr}")
-                    
-            except subprocess.TimeoutExpired:
-                print(f"Timeout running {script_name} with {theme_name}")
-            except Exception as e:
-                print(f"Error generating preview for {script_name} with {theme_name}: {e}")
-
-def ansi_to_image(ansi_text, output_file, title, theme_colors=None):
-    """Convert ANSI colored text to image"""
-    from PIL import Image, ImageDraw, ImageFont
-    import re
-    
-    # Parse ANSI codes and create image
-    lines = ansi_text.split('\n')
-    
-    # Image settings
-    font_size = 14
-    line_height = font_size + 2  # Much tighter line spacing like terminal
-    char_width = 8  # Will be calculated from actual font
-    padding = 20
-    
-    # Use theme colors if provided
-    bg_color = '#000000'
-    fg_color = '#ffffff'
-    
-    if theme_colors:
-        bg_color = theme_colors.get('Background_Color', '#000000')
-        fg_color = theme_colors.get('Foreground_Color', '#ffffff')
-    
-    # Default ANSI color palette - will be overridden by theme if available
-    ansi_colors = {
-        0: '#000000',   # black
-        1: '#ff0000',   # red
-        2: '#00ff00',   # green
-        3: '#ffff00',   # yellow
-        4: '#0000ff',   # blue
-        5: '#ff00ff',   # magenta
-        6: '#00ffff',   # cyan
-        7: '#ffffff',   # white
-        8: '#808080',   # bright black
-        9: '#ff8080',   # bright red
-        10: '#80ff80',  # bright green
-        11: '#ffff80',  # bright yellow
-        12: '#8080ff',  # bright blue
-        13: '#ff80ff',  # bright magenta
-        14: '#80ffff',  # bright cyan
-        15: '#ffffff'   # bright white
-    }
-    
-    # Override with theme colors if available
-    if theme_colors:
-        for i in range(16):
-            color_key = f'Ansi_{i}_Color'
-            if color_key in theme_colors:
-                ansi_colors[i] = theme_colors[color_key]
-    
-    # Calculate dimensions more carefully
-    # Count actual printable lines (non-empty after stripping ANSI)
-    printable_lines = [line for line in lines if strip_ansi_codes(line).strip()]
-    line_count = len(printable_lines) if printable_lines else len(lines)
-    
-    # Calculate max width by checking each line
-    max_line_length = 0
-    for line in lines:
-        clean_line = strip_ansi_codes(line)
-        if len(clean_line) > max_line_length:
-            max_line_length = len(clean_line)
-    
-    if max_line_length == 0:
-        max_line_length = 80
-        
-    width = min(max_line_length * char_width + padding * 2, 1400)
-    height = max(line_count * line_height + padding * 2 + 40, 200)  # Tighter overall height
-    
-    # Create image
-    img = Image.new('RGB', (width, height), bg_color)
-    draw = ImageDraw.Draw(img)
-    
-    # Try to use a monospace font
-    try:
-        font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf", font_size)
-        title_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 18)
-        # Calculate actual character width
-        char_bbox = font.getbbox('X')
-        char_width = char_bbox[2] - char_bbox[0]
-    except:
-        font = ImageFont.load_default()
-        title_font = font
-        char_width = 8
-    
-    # Draw title
-    draw.text((padding, padding), title, fill=fg_color, font=title_font)
-    
-    # Parse and render ANSI colored text
-    y_offset = padding + 30  # Less space after title
-    for line in lines:
-        # Skip completely empty lines, but process lines with only ANSI codes
-        clean_line = strip_ansi_codes(line)
-        if not clean_line and not line.strip():
-            y_offset += line_height
-            continue
             
-        x_offset = padding
-        current_fg = fg_color
-        current_bg = bg_color
-        bold = False
-        
-        # Enhanced ANSI parser - split more carefully
-        # Handle CSI sequences (\033[...) and OSC sequences (\033]...)
-        parts = re.split(r'(\033(?:\][^\033]*(?:\033\\|\007)|\[[0-9;]*[a-zA-Z]))', line)
-        
-        for part in parts:
-            if part.startswith('\033]'):
-                # OSC (Operating System Command) sequence - ignore for rendering
+            output_name = f"{output_base}-{theme_name}.png"
+            output_file = os.path.join(assets_dir, output_name)
+            key = content_key([theme_path, script_path], GENERATORS)
+            if cache and cache.fresh(output_file, key, [output_file]):
                 continue
-            elif part.startswith('\033['):
-                # Parse ANSI CSI (Control Sequence Introducer) escape sequence
-                if part.endswith('m'):
-                    codes_str = part[2:-1]  # Remove \033[ and m
-                    if codes_str == '':
-                        codes = ['0']
-                    else:
-                        codes = codes_str.split(';')
-                    
-                    i = 0
-                    while i < len(codes):
-                        code = codes[i]
-                        if code == '' or code == '0':
-                            # Reset all
-                            current_fg = fg_color
-                            current_bg = bg_color
-                            bold = False
-                        elif code == '1':
-                            bold = True
-                        elif code.isdigit():
-                            code_int = int(code)
-                            if code_int == 38 and i + 2 < len(codes) and codes[i + 1] == '5':
-                                # 256-color foreground: 38;5;n
-                                color_idx = int(codes[i + 2])
-                                if color_idx < 16:
-                                    current_fg = ansi_colors.get(color_idx, fg_color)
-                                else:
-                                    # Use a default color for 256-color palette beyond 16
-                                    current_fg = fg_color
-                                i += 2  # Skip the 5 and color index
-                            elif code_int == 48 and i + 2 < len(codes) and codes[i + 1] == '5':
-                                # 256-color background: 48;5;n
-                                color_idx = int(codes[i + 2])
-                                if color_idx < 16:
-                                    current_bg = ansi_colors.get(color_idx, bg_color)
-                                else:
-                                    # Generate colors for 256-color palette beyond 16
-                                    if color_idx < 232:
-                                        # 6x6x6 color cube (216 colors)
-                                        color_idx -= 16
-                                        r = (color_idx // 36) * 51
-                                        g = ((color_idx % 36) // 6) * 51  
-                                        b = (color_idx % 6) * 51
-                                        current_bg = f'#{r:02x}{g:02x}{b:02x}'
-                                    else:
-                                        # Grayscale (24 colors)
-                                        gray = min(255, 8 + (color_idx - 232) * 10)
-                                        current_bg = f'#{gray:02x}{gray:02x}{gray:02x}'
-                                i += 2  # Skip the 5 and color index
-                            elif code_int == 48 and i + 4 < len(codes) and codes[i + 1] == '2':
-                                # 24-bit RGB background: 48;2;r;g;b
-                                r = int(codes[i + 2])
-                                g = int(codes[i + 3]) 
-                                b = int(codes[i + 4])
-                                current_bg = f'#{r:02x}{g:02x}{b:02x}'
-                                i += 4  # Skip the 2, r, g, b
-                            elif code_int == 38 and i + 4 < len(codes) and codes[i + 1] == '2':
-                                # 24-bit RGB foreground: 38;2;r;g;b
-                                r = int(codes[i + 2])
-                                g = int(codes[i + 3])
-                                b = int(codes[i + 4])
-                                current_fg = f'#{r:02x}{g:02x}{b:02x}'
-                                i += 4  # Skip the 2, r, g, b
-                            elif 30 <= code_int <= 37:  # foreground colors
-                                color_idx = code_int - 30
-                                if bold:
-                                    color_idx += 8  # Use bright version
-                                current_fg = ansi_colors.get(color_idx, fg_color)
-                            elif 40 <= code_int <= 47:  # background colors
-                                color_idx = code_int - 40
-                                current_bg = ansi_colors.get(color_idx, bg_color)
-                            elif 90 <= code_int <= 97:  # bright foreground colors
-                                current_fg = ansi_colors.get(code_int - 90 + 8, fg_color)
-                            elif 100 <= code_int <= 107:  # bright background colors
-                                current_bg = ansi_colors.get(code_int - 100 + 8, bg_color)
-                        i += 1
-                # Ignore other escape sequences (cursor movement, etc.)
-            else:
-                # Draw text with current colors
-                if part:
-                    # Calculate text width for background - use actual font metrics
-                    text_bbox = font.getbbox(part)
-                    text_width = text_bbox[2] - text_bbox[0]
-                    
-                    # For spaces and color blocks, make sure we draw the background
-                    # Use full line height for background, not just text height
-                    if current_bg != bg_color:
-                        # Draw background rectangle for the entire line height
-                        draw.rectangle([x_offset, y_offset, x_offset + text_width, y_offset + line_height], fill=current_bg)
-                    
-                    # Only draw text if it's not just spaces (or draw it for contrast)
-                    if part.strip() or current_bg != bg_color:
-                        draw.text((x_offset, y_offset), part, fill=current_fg, font=font)
-                    
-                    # Move x offset by the actual text width
-                    x_offset += text_width
-        
-        y_offset += line_height
+            jobs.append((output_file, key, render_color_table,
+                         (script_path, theme_path, theme_name, output_file, title)))
+    return jobs
+
+def run_jobs(jobs, cache=None, workers=None):
+    """Render jobs on a process pool, recording successes in the cache
+
+    Each worker captures its script and rasterizes the result, so shell
+    capture of one job overlaps with image rendering of another.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
     
-    img.save(output_file)
+    if not jobs:
+        return
+    workers = min(len(jobs), workers or os.cpu_count() or 1)
+    if workers == 1:
+        for output_file, key, func, args in jobs:
+            report_job(output_file, key, func(*args), cache)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(func, *args): (output_file, key)
+                   for output_file, key, func, args in jobs}
+        for future in as_completed(futures):
+            output_file, key = futures[future]
+            report_job(output_file, key, future.result(), cache)
 
-def strip_ansi_codes(text):
-    """Remove ANSI escape codes from text"""
-    import re
-    # Remove both CSI sequences (\033[...) and OSC sequences (\033]...)
-    ansi_escape = re.compile(r'\x1B(?:\][^\x1B]*(?:\x1B\\|\x07)|\[[0-?]*[ -/]*[@-~])')
-    return ansi_escape.sub('', text)
+def report_job(output_file, key, error, cache):
+    """Print a job's outcome and remember successful outputs"""
+    if error:
+        print(error)
+        return
+    if cache:
+        cache.record(output_file, key)
+    print(f"Generated {output_file}")
+
+def generate_color_table_previews(root_dir, cache=None, workers=None):
+    """Generate previews from the contrib color table scripts"""
+    run_jobs(color_table_jobs(root_dir, cache), cache, workers)
 
 def main():
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    root_dir = os.path.dirname(script_dir)
-    
-    # Check if PIL is available
-    try:
-        from PIL import Image, ImageDraw, ImageFont
-    except ImportError:
-        print("Error: Pillow library not found. Install with: pip install Pillow")
+    # Concurrency: -j N on the command line or PREVIEW_JOBS, default one per core
+    workers = int(os.environ.get('PREVIEW_JOBS', 0)) or None
+    if len(sys.argv) == 3 and sys.argv[1] == '-j':
+        workers = int(sys.argv[2])
+    elif len(sys.argv) > 1:
+        print("Usage: generate-preview.py [-j jobs]", file=sys.stderr)
         sys.exit(1)
     
-    # Generate dark theme preview
-    dark_xrdb = os.path.join(root_dir, 'ManfredTouron.xrdb')
-    if os.path.exists(dark_xrdb):
-        colors = parse_xrdb(dark_xrdb)
-        output_file = os.path.join(root_dir, 'assets', 'preview-dark.png')
-        os.makedirs(os.path.dirname(output_file), exist_ok=True)
-        generate_preview(colors, output_file, "ManfredTouron Dark Theme")
+    root_dir = os.path.dirname(SCRIPT_DIR)
+    
+    cache = BuildCache()
+    previews = [
+        ('ManfredTouron.xrdb', 'preview-dark.png', "ManfredTouron Dark Theme"),
+        ('ManfredTouron-Light.xrdb', 'preview-light.png', "ManfredTouron Light Theme"),
+    ]
+    
+    # Collect dark and light theme previews, skipping unchanged schemes
+    jobs = []
+    os.makedirs(os.path.join(root_dir, 'assets'), exist_ok=True)
+    for xrdb_name, output_name, title in previews:
+        xrdb_file = os.path.join(root_dir, xrdb_name)
+        if not os.path.exists(xrdb_file):
+            continue
+        output_file = os.path.join(root_dir, 'assets', output_name)
+        key = content_key([xrdb_file], GENERATORS)
+        if cache.fresh(output_file, key, [output_file]):
+            continue
+        jobs.append((output_file, key, render_theme_preview, (xrdb_file, output_file, title)))
     
-    # Generate light theme preview
-    light_xrdb = os.path.join(root_dir, 'ManfredTouron-Light.xrdb')
-    if os.path.exists(light_xrdb):
-        colors = parse_xrdb(light_xrdb)
-        output_file = os.path.join(root_dir, 'assets', 'preview-light.png')
-        generate_preview(colors, output_file, "ManfredTouron Light Theme")
+    # Add color table previews using the contrib scripts
+    jobs += color_table_jobs(root_dir, cache)
     
-    # Generate color table previews using the contrib scripts
-    generate_color_table_previews(root_dir)
+    with span('render previews'):
+        run_jobs(jobs, cache, workers)
+    cache.save()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -24,7 +24,23 @@ generate_with_termshot() {
     fi
 }
 
-# Method 2: Using ANSI color blocks
+# Method 2: Render the color table through the built-in virtual terminal
+generate_with_vt() {
+    theme="${1:-dark}"
+    
+    if [ "$theme" == "light" ]; then
+        xrdb_file="$ROOT_DIR/ManfredTouron-Light.xrdb"
+    else
+        xrdb_file="$ROOT_DIR/ManfredTouron.xrdb"
+    fi
+    
+    echo "Generating screenshot with the virtual terminal renderer..."
+    bash "$SCRIPT_DIR/../contrib/256-color-table.sh" | \
+        "$SCRIPT_DIR/run-with-nix.sh" python3 "$SCRIPT_DIR/vt-screenshot.py" \
+            --theme "$xrdb_file" --size 120x50 -o "$ROOT_DIR/assets/term.png"
+}
+
+# Method 3: Using ANSI color blocks
 generate_color_blocks() {
     theme="${1:-dark}"
     output_file="$ROOT_DIR/assets/color-blocks-$theme.txt"
@@ -62,7 +78,7 @@ EOF
     done
 }
 
-# Method 3: Using asciinema + svg-term
+# Method 4: Using asciinema + svg-term
 generate_with_asciinema() {
     if command -v asciinema &> /dev/null && command -v svg-term &> /dev/null; then
         echo "Generating screenshot with asciinema + svg-term..."
@@ -86,92 +102,43 @@ generate_with_asciinema() {
     fi
 }
 
-# Method 4: Using terminal HTML renderer
-generate_html_preview() {
-    theme="${1:-dark}"
-    output_file="$ROOT_DIR/assets/preview-$theme.html"
+# Render the ANSI preview capture with the streaming ansi2html.py renderer
+render_ansi_preview() {
+    theme="$1"
+    format="$2"
+    input_file="$ROOT_DIR/assets/preview-$theme.ansi"
+    output_file="$ROOT_DIR/assets/preview-$theme.$format"
     
-    echo "Generating HTML preview for $theme theme..."
-    
-    # Load colors from xrdb file
     if [ "$theme" == "light" ]; then
         xrdb_file="$ROOT_DIR/ManfredTouron-Light.xrdb"
     else
         xrdb_file="$ROOT_DIR/ManfredTouron.xrdb"
     fi
     
-    # Extract colors
-    declare -A colors
-    while IFS= read -r line; do
-        if [[ $line =~ ^#define[[:space:]]+([A-Za-z_0-9]+)[[:space:]]+(#[0-9a-fA-F]{6}) ]]; then
-            colors["${BASH_REMATCH[1]}"]="${BASH_REMATCH[2]}"
-        fi
-    done < "$xrdb_file"
-    
-    cat > "$output_file" << EOF
-<!DOCTYPE html>
-<html>
-<head>
-    <title>ManfredTouron $theme Theme</title>
-    <style>
-        body {
-            background: ${colors[Background_Color]};
-            color: ${colors[Foreground_Color]};
-            font-family: 'Fira Code', 'Monaco', monospace;
-            padding: 20px;
-        }
-        .color-grid {
-            display: grid;
-            grid-template-columns: repeat(8, 1fr);
-            gap: 10px;
-            margin: 20px 0;
-        }
-        .color-box {
-            height: 60px;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            border: 1px solid ${colors[Foreground_Color]};
-        }
-        pre {
-            background: rgba(128,128,128,0.1);
-            padding: 20px;
-            border-radius: 5px;
-        }
-    </style>
-</head>
-<body>
-    <h1>ManfredTouron $theme Theme</h1>
-    <div class="color-grid">
-EOF
+    if [ ! -f "$input_file" ]; then
+        echo "$input_file not found. Run scripts/generate-ansi-preview.sh first."
+        return 1
+    fi
     
-    # Generate color boxes
-    for i in {0..15}; do
-        color_key="Ansi_${i}_Color"
-        if [ "${colors[$color_key]}" ]; then
-            echo "        <div class='color-box' style='background: ${colors[$color_key]}'>${i}</div>" >> "$output_file"
-        fi
-    done
+    format_args=()
+    if [ "$format" == "svg" ]; then
+        format_args=(--svg)
+    fi
     
-    cat >> "$output_file" << 'EOF'
-    </div>
-    <pre>
-# Sample code
-def hello_world():
-    """A simple function"""
-    colors = ["red", "green", "blue"]
-    for color in colors:
-        print(f"Hello, {color} world!")
-    return True
+    echo "Generating ${format^^} preview for $theme theme..."
+    python3 "$SCRIPT_DIR/ansi2html.py" ${format_args[@]+"${format_args[@]}"} --theme "$xrdb_file" \
+        --title "ManfredTouron $theme Theme" "$input_file" -o "$output_file"
+    echo "${format^^} preview generated at $output_file"
+}
 
-if __name__ == "__main__":
-    hello_world()
-    </pre>
-</body>
-</html>
-EOF
-    
-    echo "HTML preview generated at $output_file"
+# Method 5: Render the ANSI preview capture to HTML
+generate_html_preview() {
+    render_ansi_preview "${1:-dark}" html
+}
+
+# Method 6: Render the ANSI preview capture to SVG
+generate_svg_preview() {
+    render_ansi_preview "${1:-dark}" svg
 }
 
 # Main function
@@ -183,6 +150,9 @@ main() {
         termshot)
             generate_with_termshot "$theme"
             ;;
+        vt)
+            generate_with_vt "$theme"
+            ;;
         blocks)
             generate_color_blocks "$theme"
             ;;
@@ -192,16 +162,20 @@ main() {
         html)
             generate_html_preview "$theme"
             ;;
+        svg)
+            generate_svg_preview "$theme"
+            ;;
         auto)
             # Try methods in order of preference
             generate_with_asciinema || \
             generate_with_termshot "$theme" || \
+            generate_with_vt "$theme" || \
             generate_html_preview "$theme" || \
             generate_color_blocks "$theme"
             ;;
         *)
             echo "Usage: $0 [method] [theme]"
-            echo "Methods: termshot, blocks, asciinema, html, auto (default)"
+            echo "Methods: termshot, vt, blocks, asciinema, html, svg, auto (default)"
             echo "Themes: dark (default), light"
             exit 1
             ;;
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Opt-in timing instrumentation emitting a Chrome trace
+
+Set COLORSCHEME_TRACE=<file.json> to record a span for every build stage
+and instrumented function: wall time, CPU time and the net number of
+memory blocks allocated. Each span is appended to the file as one write,
+so every process of a build (make recipes, pool workers) can share the
+same trace. The file uses the Chrome trace JSON array format and loads
+directly in chrome://tracing or Perfetto; 'instrument.py summary' prints
+a per-name table.
+
+Without the variable, timed() returns functions unchanged and span() does
+nothing, so instrumentation costs nothing in normal builds.
+"""
+
+import contextlib
+import functools
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+TRACE_FILE = os.environ.get('COLORSCHEME_TRACE') or None
+
+# Process that last wrote its name: forked pool workers must name themselves
+_named_pid = None
+
+def _append(events):
+    """Append events to the trace file with a single O_APPEND write"""
+    global _named_pid
+    if _named_pid != os.getpid():
+        _named_pid = os.getpid()
+        events = [{
+            'name': 'process_name', 'ph': 'M', 'pid': os.getpid(),
+            'args': {'name': os.path.basename(sys.argv[0]) or 'python'},
+        }] + events
+    try:
+        # The first writer opens the JSON array; Chrome accepts it unterminated
+        fd = os.open(TRACE_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        os.write(fd, b'[\n')
+        os.close(fd)
+    except FileExistsError:
+        pass
+    data = ''.join(json.dumps(event, separators=(',', ':')) + ',\n' for event in events)
+    fd = os.open(TRACE_FILE, os.O_WRONLY | os.O_APPEND)
+    try:
+        os.write(fd, data.encode())
+    finally:
+        os.close(fd)
+
+def record(name, category, start, wall, cpu, blocks):
+    """Append one complete span to the trace"""
+    _append([{
+        'name': name,
+        'cat': category,
+        'ph': 'X',
+        'ts': round(start * 1e6),
+        'dur': round(wall * 1e6),
+        'pid': os.getpid(),
+        'tid': threading.get_native_id(),
+        'args': {'cpu_ms': round(cpu * 1e3, 3), 'alloc_blocks': blocks},
+    }])
+
+@contextlib.contextmanager
+def span(name, category='stage'):
+    """Record the enclosed block as a span when tracing is enabled"""
+    if TRACE_FILE is None:
+        yield
+        return
+    start = time.time()
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    blocks = sys.getallocatedblocks()
+    try:
+        yield
+    finally:
+        record(name, category, start, time.perf_counter() - wall,
+               time.process_time() - cpu, sys.getallocatedblocks() - blocks)
+
+def timed(func):
+    """Decorator recording each call of func as a span when tracing is enabled"""
+    if TRACE_FILE is None:
+        return func
+    module = func.__module__
+    if module == '__main__':
+        module = os.path.splitext(os.path.basename(sys.argv[0]))[0]
+    name = f"{module}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with span(name, 'function'):
+            return func(*args, **kwargs)
+    return wrapper
+
+def run_stage(name, command):
+    """Run a shell stage as a subprocess, recording its wall and child CPU time"""
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start = time.time()
+    wall = time.perf_counter()
+    returncode = subprocess.call(command)
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    if TRACE_FILE is not None:
+        record(name, 'stage', start, time.perf_counter() - wall, cpu, 0)
+    return returncode
+
+def load_trace(path):
+    """Read a (possibly unterminated) Chrome trace array"""
+    with open(path) as f:
+        text = f.read().strip()
+    if not text.endswith(']'):
+        text = text.rstrip(',') + ']'
+    return json.loads(text)
+
+def summarize(events):
+    """Aggregate complete spans by name into {name: totals}"""
+    totals = {}
+    for event in events:
+        if event.get('ph') != 'X':
+            continue
+        entry = totals.setdefault(event['name'], {
+            'category': event.get('cat', ''), 'calls': 0, 'wall_ms': 0.0,
+            'cpu_ms': 0.0, 'alloc_blocks': 0,
+        })
+        entry['calls'] += 1
+        entry['wall_ms'] += event['dur'] / 1e3
+        entry['cpu_ms'] += event['args'].get('cpu_ms', 0.0)
+        entry['alloc_blocks'] += event['args'].get('alloc_blocks', 0)
+    return totals
+
+def print_summary(totals):
+    """Print spans sorted by total wall time"""
+    print(f"{'wall ms':>10}  {'cpu ms':>10}  {'calls':>6}  {'mean ms':>9}  {'blocks':>9}  name")
+    for name, entry in sorted(totals.items(), key=lambda item: -item[1]['wall_ms']):
+        mean = entry['wall_ms'] / entry['calls']
+        print(f"{entry['wall_ms']:10.1f}  {entry['cpu_ms']:10.1f}  {entry['calls']:>6}  "
+              f"{mean:9.2f}  {entry['alloc_blocks']:>9}  {name}")
+
+def usage():
+    """Print usage and exit"""
+    print("Usage: instrument.py run <stage> -- <command> [args ...]", file=sys.stderr)
+    print("       instrument.py summary [trace.json]", file=sys.stderr)
+    sys.exit(1)
+
+def main():
+    args = sys.argv[1:]
+    if len(args) >= 3 and args[0] == 'run' and args[2] == '--' and len(args) > 3:
+        sys.exit(run_stage(args[1], args[3:]))
+    if args and args[0] == 'summary' and len(args) <= 2:
+        path = args[1] if len(args) == 2 else TRACE_FILE
+        if not path:
+            usage()
+        print_summary(summarize(load_trace(path)))
+        return
+    usage()
+
+if __name__ == '__main__':
+    main()
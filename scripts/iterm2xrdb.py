@@ -1,10 +1,16 @@
 #!/usr/bin/env python3
 """Convert iTerm2 color scheme to Xresources format"""
 
+import os
 import sys
+import glob
 import plistlib
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from buildcache import BuildCache, content_key
+from instrument import timed
+
 def rgb_to_hex(r, g, b):
     """Convert RGB values (0-1) to hex color"""
     return "#{:02x}{:02x}{:02x}".format(
@@ -13,6 +19,50 @@ def rgb_to_hex(r, g, b):
         int(b * 255)
     )
 
+# iTerm2 plist keys and their xrdb names
+COLOR_MAP = {
+    'Ansi 0 Color': 'Ansi_0_Color',
+    'Ansi 1 Color': 'Ansi_1_Color',
+    'Ansi 2 Color': 'Ansi_2_Color',
+    'Ansi 3 Color': 'Ansi_3_Color',
+    'Ansi 4 Color': 'Ansi_4_Color',
+    'Ansi 5 Color': 'Ansi_5_Color',
+    'Ansi 6 Color': 'Ansi_6_Color',
+    'Ansi 7 Color': 'Ansi_7_Color',
+    'Ansi 8 Color': 'Ansi_8_Color',
+    'Ansi 9 Color': 'Ansi_9_Color',
+    'Ansi 10 Color': 'Ansi_10_Color',
+    'Ansi 11 Color': 'Ansi_11_Color',
+    'Ansi 12 Color': 'Ansi_12_Color',
+    'Ansi 13 Color': 'Ansi_13_Color',
+    'Ansi 14 Color': 'Ansi_14_Color',
+    'Ansi 15 Color': 'Ansi_15_Color',
+    'Background Color': 'Background_Color',
+    'Foreground Color': 'Foreground_Color',
+    'Cursor Color': 'Cursor_Color',
+    'Cursor Text Color': 'Cursor_Text_Color',
+    'Bold Color': 'Bold_Color',
+    'Selection Color': 'Selection_Color',
+    'Selected Text Color': 'Selected_Text_Color',
+}
+
+def iterm_colors(plist):
+    """Extract the colors of a parsed iTerm2 plist as an ordered palette"""
+    colors = {}
+    for iterm_key, xrdb_key in COLOR_MAP.items():
+        color_dict = plist.get(iterm_key)
+        if color_dict and 'Red Component' in color_dict:
+            colors[xrdb_key] = rgb_to_hex(
+                color_dict['Red Component'],
+                color_dict['Green Component'],
+                color_dict['Blue Component']
+            )
+    return colors
+
+def iterm_to_xrdb(plist):
+    """Render a parsed iTerm2 plist as xrdb #define lines"""
+    return "".join(f"#define {name} {value}\n" for name, value in iterm_colors(plist).items())
+
 def convert_iterm_to_xrdb(iterm_file):
     """Convert iTerm2 colorscheme to xrdb format"""
     
@@ -20,48 +70,84 @@ def convert_iterm_to_xrdb(iterm_file):
     with open(iterm_file, 'rb') as f:
         plist = plistlib.load(f)
     
-    # Define color mappings
-    color_map = {
-        'Ansi 0 Color': 'Ansi_0_Color',
-        'Ansi 1 Color': 'Ansi_1_Color',
-        'Ansi 2 Color': 'Ansi_2_Color',
-        'Ansi 3 Color': 'Ansi_3_Color',
-        'Ansi 4 Color': 'Ansi_4_Color',
-        'Ansi 5 Color': 'Ansi_5_Color',
-        'Ansi 6 Color': 'Ansi_6_Color',
-        'Ansi 7 Color': 'Ansi_7_Color',
-        'Ansi 8 Color': 'Ansi_8_Color',
-        'Ansi 9 Color': 'Ansi_9_Color',
-        'Ansi 10 Color': 'Ansi_10_Color',
-        'Ansi 11 Color': 'Ansi_11_Color',
-        'Ansi 12 Color': 'Ansi_12_Color',
-        'Ansi 13 Color': 'Ansi_13_Color',
-        'Ansi 14 Color': 'Ansi_14_Color',
-        'Ansi 15 Color': 'Ansi_15_Color',
-        'Background Color': 'Background_Color',
-        'Foreground Color': 'Foreground_Color',
-        'Cursor Color': 'Cursor_Color',
-        'Cursor Text Color': 'Cursor_Text_Color',
-        'Bold Color': 'Bold_Color',
-        'Selection Color': 'Selection_Color',
-        'Selected Text Color': 'Selected_Text_Color',
-    }
-    
     # Output xrdb format
-    for iterm_key, xrdb_key in color_map.items():
-        if iterm_key in plist:
-            color_dict = plist[iterm_key]
-            if 'Red Component' in color_dict:
-                hex_color = rgb_to_hex(
-                    color_dict['Red Component'],
-                    color_dict['Green Component'],
-                    color_dict['Blue Component']
-                )
-                print(f"#define {xrdb_key} {hex_color}")
+    print(iterm_to_xrdb(plist), end="")
+
+@timed
+def convert_file(iterm_file, output_dir):
+    """Convert one iTerm2 file into output_dir, returning an error or None"""
+    try:
+        with open(iterm_file, 'rb') as f:
+            plist = plistlib.load(f)
+        xrdb = iterm_to_xrdb(plist)
+        if not xrdb:
+            return "no colors found"
+        output_file = Path(output_dir) / f"{Path(iterm_file).stem}.xrdb"
+        with open(output_file, 'w') as f:
+            f.write(xrdb)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+def find_iterm_files(source):
+    """Expand a directory or glob pattern into a sorted list of .itermcolors files"""
+    if os.path.isdir(source):
+        return sorted(str(p) for p in Path(source).glob('*.itermcolors'))
+    return sorted(glob.glob(source))
+
+def convert_batch(source, output_dir, jobs=None, cache=None):
+    """Convert every changed iTerm2 file in source in parallel, returning {file: error}"""
+    cache = cache or BuildCache()
+    iterm_files = find_iterm_files(source)
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # Skip schemes whose content and converter are unchanged since the last run
+    keys = {}
+    for iterm_file in iterm_files:
+        output_file = Path(output_dir) / f"{Path(iterm_file).stem}.xrdb"
+        key = content_key([iterm_file], [os.path.abspath(__file__)])
+        if not cache.fresh(str(output_file.resolve()), key, [output_file]):
+            keys[iterm_file] = (str(output_file.resolve()), key)
+    stale_files = list(keys)
+    
+    errors = {}
+    if stale_files:
+        jobs = jobs or os.cpu_count() or 1
+        # Batch several small files per task to amortize inter-process overhead
+        chunksize = max(1, len(stale_files) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = executor.map(convert_file, stale_files,
+                                   [output_dir] * len(stale_files),
+                                   chunksize=chunksize)
+            for iterm_file, error in zip(stale_files, results):
+                if error:
+                    errors[iterm_file] = error
+                else:
+                    cache.record(*keys[iterm_file])
+        cache.save()
+    
+    print(f"Converted {len(stale_files) - len(errors)}/{len(iterm_files)} schemes into {output_dir}"
+          f" ({len(iterm_files) - len(stale_files)} up to date)",
+          file=sys.stderr)
+    for iterm_file, error in errors.items():
+        print(f"! {iterm_file}: {error}", file=sys.stderr)
+    return errors
+
+def usage():
+    """Print usage and exit"""
+    print("Usage: iterm2xrdb.py <iTerm colorscheme file>", file=sys.stderr)
+    print("       iterm2xrdb.py --batch <directory|glob> <output directory> [jobs]", file=sys.stderr)
+    sys.exit(1)
 
 if __name__ == '__main__':
+    if len(sys.argv) >= 2 and sys.argv[1] == '--batch':
+        if len(sys.argv) not in (4, 5):
+            usage()
+        jobs = int(sys.argv[4]) if len(sys.argv) == 5 else None
+        errors = convert_batch(sys.argv[2], sys.argv[3], jobs)
+        sys.exit(1 if errors else 0)
+    
     if len(sys.argv) != 2:
-        print("Usage: iterm2xrdb.py <iTerm colorscheme file>", file=sys.stderr)
-        sys.exit(1)
+        usage()
     
-    convert_iterm_to_xrdb(sys.argv[1])
\ No newline at end of file
+    convert_iterm_to_xrdb(sys.argv[1])
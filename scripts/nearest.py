@@ -0,0 +1,97 @@
+"""Nearest-color lookup into 16- and 256-color palettes in OKLab space"""
+
+import numpy as np
+
+from ansi import xterm_palette
+from colorspace import hex_to_rgb, rgb_to_oklab
+
+# Rows per distance block, bounding temporary memory to ~CHUNK * K floats
+CHUNK = 1 << 16
+
+def xterm_256_rgb(ansi_colors):
+    """Return the (256, 3) uint8 xterm palette with the theme's 16 colors first"""
+    return hex_to_rgb(xterm_palette(ansi_colors))
+
+def pack_rgb(rgb):
+    """Pack (..., 3) uint8 RGB into 24-bit integers"""
+    rgb = np.asarray(rgb, dtype=np.uint32)
+    return (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+
+def unpack_rgb(packed):
+    """Unpack 24-bit integers into (..., 3) uint8 RGB"""
+    packed = np.asarray(packed, dtype=np.uint32)
+    return np.stack([(packed >> 16) & 0xff, (packed >> 8) & 0xff, packed & 0xff],
+                    axis=-1).astype(np.uint8)
+
+class PaletteIndex:
+    """Map arbitrary 24-bit colors to the perceptually closest palette entry
+
+    Queries are deduplicated, converted to OKLab and resolved with blocked
+    squared-distance matrix products. With lut_bits set, a quantized
+    lookup table over the RGB cube answers queries with a single gather.
+    """
+
+    def __init__(self, palette_rgb, lut_bits=None):
+        self.rgb = np.asarray(palette_rgb, dtype=np.uint8)
+        self.lab = rgb_to_oklab(self.rgb)
+        self.lab_norms = (self.lab ** 2).sum(axis=1)
+        self.lut_bits = lut_bits
+        self.lut = self._build_lut(lut_bits) if lut_bits else None
+        self.memo = {}
+
+    def _nearest_lab(self, lab):
+        """Exact nearest palette index for each OKLab row"""
+        out = np.empty(len(lab), dtype=np.intp)
+        for i in range(0, len(lab), CHUNK):
+            block = lab[i:i + CHUNK]
+            # |x - p|^2 = |x|^2 - 2 x.p + |p|^2; |x|^2 is constant per row
+            dist = self.lab_norms[None, :] - 2.0 * block @ self.lab.T
+            out[i:i + CHUNK] = dist.argmin(axis=1)
+        return out
+
+    def _build_lut(self, bits):
+        """Precompute the nearest entry for the center of every RGB cell"""
+        size = 1 << bits
+        step = 256 // size
+        centers = (np.arange(size) * step + step // 2).astype(np.uint8)
+        r, g, b = np.meshgrid(centers, centers, centers, indexing='ij')
+        grid = np.stack([r.ravel(), g.ravel(), b.ravel()], axis=1)
+        return self._nearest_lab(rgb_to_oklab(grid)).astype(np.uint16)
+
+    def nearest(self, rgb):
+        """Return the nearest palette index for each (..., 3) uint8 color"""
+        rgb = np.asarray(rgb, dtype=np.uint8)
+        shape = rgb.shape[:-1]
+        flat = rgb.reshape(-1, 3)
+        if self.lut is not None:
+            shift = 8 - self.lut_bits
+            q = (flat >> shift).astype(np.intp)
+            cells = (q[:, 0] << (2 * self.lut_bits)) | (q[:, 1] << self.lut_bits) | q[:, 2]
+            return self.lut[cells].astype(np.intp).reshape(shape)
+        # Most captures and images reuse few distinct colors
+        packed, inverse = np.unique(pack_rgb(flat), return_inverse=True)
+        indices = self._nearest_lab(rgb_to_oklab(unpack_rgb(packed)))
+        return indices[inverse.ravel()].reshape(shape)
+
+    def nearest_rgb(self, rgb):
+        """Replace each (..., 3) uint8 color with its nearest palette color"""
+        return self.rgb[self.nearest(rgb)]
+
+    def nearest_hex(self, hex_color):
+        """Memoized nearest index for a single '#rrggbb' color"""
+        index = self.memo.get(hex_color)
+        if index is None:
+            index = int(self.nearest(hex_to_rgb(hex_color)))
+            self.memo[hex_color] = index
+        return index
+
+def theme_index(ansi_colors, colors=256, lut_bits=None):
+    """Build an index over the theme's 16 colors or its full 256-color palette"""
+    palette = xterm_256_rgb(ansi_colors)
+    return PaletteIndex(palette[:colors], lut_bits=lut_bits)
+
+def quantize_image(img, index):
+    """Remap every pixel of a PIL RGB image to its nearest palette color"""
+    from PIL import Image
+    pixels = np.asarray(img.convert('RGB'))
+    return Image.fromarray(index.nearest_rgb(pixels), 'RGB')
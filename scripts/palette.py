@@ -0,0 +1,473 @@
+"""Scheme records, format readers and the registry of table-driven writers
+
+A scheme is parsed once into a Scheme record (its name and 23 colors in
+COLOR_NAMES order) and rendered by writers registered under a format name.
+Most writers are declarative: a list of line templates whose fields are
+color names, compiled once when the format is registered. A line is only
+written when every color it names is set, so adding a terminal is a new
+table rather than a new converter.
+"""
+
+import json
+import string
+from pathlib import Path
+
+# Every named color of a scheme, in iTerm2/xrdb order
+COLOR_NAMES = [f'Ansi_{i}_Color' for i in range(16)] + [
+    'Background_Color',
+    'Foreground_Color',
+    'Cursor_Color',
+    'Cursor_Text_Color',
+    'Bold_Color',
+    'Selection_Color',
+    'Selected_Text_Color',
+]
+
+# Template fields: a color name, or 'name' for the scheme name
+FIELDS = {name: i for i, name in enumerate(COLOR_NAMES)}
+FIELDS['name'] = len(COLOR_NAMES)
+
+class Scheme:
+    """A named scheme as a tuple of colors in COLOR_NAMES order (None when unset)"""
+
+    __slots__ = ('name', 'colors')
+
+    def __init__(self, name, colors):
+        self.name = name
+        self.colors = tuple(colors)
+
+    @classmethod
+    def from_palette(cls, colors, name=None):
+        """Build a record from an {color name: '#rrggbb'} palette"""
+        return cls(name, [colors.get(color_name) for color_name in COLOR_NAMES])
+
+    def palette(self):
+        """The set colors as an ordered {color name: '#rrggbb'} palette"""
+        return {color_name: value for color_name, value in zip(COLOR_NAMES, self.colors)
+                if value is not None}
+
+    def get(self, color_name, default=None):
+        value = self.colors[FIELDS[color_name]]
+        return default if value is None else value
+
+    def __getitem__(self, color_name):
+        value = self.colors[FIELDS[color_name]]
+        if value is None:
+            raise KeyError(color_name)
+        return value
+
+    def __repr__(self):
+        return f"Scheme({self.name!r}, {len(self.palette())} colors)"
+
+def parse_xrdb_text(text):
+    """Parse xrdb content into an ordered {name: value} palette"""
+    colors = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('#define'):
+            parts = line.split(None, 2)
+            if len(parts) >= 3:
+                colors[parts[1]] = parts[2]
+    return colors
+
+def parse_xrdb(filename):
+    """Parse colors from xrdb file"""
+    with open(filename, 'r') as f:
+        return parse_xrdb_text(f.read())
+
+def read_itermcolors(path):
+    """Read an iTerm2 .itermcolors plist into an ordered palette"""
+    import plistlib
+    from iterm2xrdb import iterm_colors
+    with open(path, 'rb') as f:
+        return iterm_colors(plistlib.load(f))
+
+def read_pal(path):
+    """Read a binary .pal record into an ordered palette"""
+    from schemelib import read_palette
+    return read_palette(path)
+
+# Scheme readers by file suffix: suffix -> read(path) returning a palette
+READERS = {
+    '.xrdb': parse_xrdb,
+    '.itermcolors': read_itermcolors,
+    '.pal': read_pal,
+}
+
+def register_reader(suffix, read):
+    """Register read(path) -> palette for files ending in suffix"""
+    READERS[suffix] = read
+
+def load_palette(path):
+    """Load any registered scheme file into an ordered palette (xrdb by default)"""
+    path = str(path)
+    for suffix, read in READERS.items():
+        if path.endswith(suffix):
+            return read(path)
+    return parse_xrdb(path)
+
+def load_scheme(path):
+    """Load a scheme file into a Scheme record named after the file"""
+    return Scheme.from_palette(load_palette(path), scheme_name(path))
+
+def find_schemes(paths):
+    """Expand files and directories into a sorted list of scheme files"""
+    found = []
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            found += sorted(str(p) for p in path.iterdir() if p.suffix in READERS)
+        else:
+            found.append(str(path))
+    return found
+
+def scheme_name(path):
+    """Return a scheme's name from its file path"""
+    return Path(path).name.rsplit('.', 1)[0]
+
+def unique_schemes(paths, seen=None):
+    """Drop scheme files whose name came earlier, e.g. X.itermcolors after X.xrdb
+
+    The first file of each name is kept. seen is the set of names taken
+    so far; it is updated, so several calls can share it.
+    """
+    seen = set() if seen is None else seen
+    unique = []
+    for path in paths:
+        name = scheme_name(path)
+        if name not in seen:
+            seen.add(name)
+            unique.append(path)
+    return unique
+
+def compile_template(template):
+    """Split a template into a positional format string and its field indices"""
+    parts, fields = [], []
+    for literal, field, spec, conversion in string.Formatter().parse(template):
+        parts.append(literal.replace('{', '{{').replace('}', '}}'))
+        if field is None:
+            continue
+        if field not in FIELDS or spec or conversion:
+            raise ValueError(f"bad template field {{{field}}} in {template!r}")
+        parts.append('{}')
+        fields.append(FIELDS[field])
+    return ''.join(parts), tuple(fields)
+
+def template_values(scheme, bare):
+    """The values template fields index into, optionally without '#'"""
+    colors = scheme.colors
+    if bare:
+        colors = [None if value is None else value.lstrip('#') for value in colors]
+    return (*colors, scheme.name)
+
+class LineFormat:
+    """A text format rendered line by line from templates
+
+    Lines without fields are written as is; the others only when all the
+    colors they name are set. bare writes colors as rrggbb.
+    """
+
+    __slots__ = ('lines', 'end', 'bare')
+
+    def __init__(self, templates, end="\n", bare=False):
+        self.lines = [compile_template(template) for template in templates]
+        self.end = end
+        self.bare = bare
+
+    def __call__(self, scheme):
+        values = template_values(scheme, self.bare)
+        out = []
+        for text, fields in self.lines:
+            args = [values[i] for i in fields]
+            if None not in args:
+                out.append(text.format(*args) + self.end)
+        return "".join(out)
+
+class JsonFormat:
+    """A JSON object format rendered from {key: template}, optionally nested under key"""
+
+    __slots__ = ('fields', 'key')
+
+    def __init__(self, fields, key=None):
+        self.fields = [(name, compile_template(template)) for name, template in fields.items()]
+        self.key = key
+
+    def __call__(self, scheme):
+        values = template_values(scheme, False)
+        output = {}
+        for name, (text, fields) in self.fields:
+            args = [values[i] for i in fields]
+            if None not in args:
+                output[name] = text.format(*args)
+        if self.key:
+            output = {self.key: output}
+        return json.dumps(output, indent=4) + "\n"
+
+def hterm_cursor(hex_color):
+    """Convert a hex cursor color to hterm's translucent rgba() form"""
+    hex_color = hex_color.lstrip('#')
+    r = int(hex_color[0:2], 16)
+    g = int(hex_color[2:4], 16)
+    b = int(hex_color[4:6], 16)
+    return f"rgba({r},{g},{b}, 0.5)"
+
+def hterm_colors(colors):
+    """Extract the hterm color set (cursor, foreground, background, palette)"""
+    return {
+        'cursor': hterm_cursor(colors.get('Cursor_Color', '#ffffff')),
+        'foreground': colors.get('Foreground_Color', '#ffffff'),
+        'background': colors.get('Background_Color', '#000000'),
+        'palette': [colors[f'Ansi_{i}_Color'] for i in range(16) if f'Ansi_{i}_Color' in colors],
+    }
+
+def to_hterm(colors):
+    """Render a palette as an hterm preferences script"""
+    hterm = hterm_colors(colors)
+    palette = ", ".join(f'"{c}"' for c in hterm['palette'])
+    return (
+        f't.prefs_.set("background-color", "{hterm["background"]}");\n'
+        f't.prefs_.set("foreground-color", "{hterm["foreground"]}");\n'
+        f't.prefs_.set("cursor-color", "{hterm["cursor"]}"); /* {colors.get("Cursor_Color", "#ffffff")} */\n'
+        f't.prefs_.set("color-palette-overrides", [{palette}]);\n'
+    )
+
+def to_dynamic_hterm(dark_colors, light_colors):
+    """Render the dynamic hterm script from dark and light hterm color sets"""
+    return f"""// ManfredTouron Dynamic Theme for hterm/Blink Shell
+// Automatically switches between light and dark themes based on system preferences
+// Generated from ManfredTouron.hterm.js and ManfredTouron-Light.hterm.js
+
+// Dark theme configuration
+const darkScheme = {{
+  cursor: '{dark_colors['cursor']}',
+  foreground: '{dark_colors['foreground']}',
+  background: '{dark_colors['background']}',
+  colors: [{', '.join(f"'{c}'" for c in dark_colors['palette'])}]
+}};
+
+// Light theme configuration
+const lightScheme = {{
+  cursor: '{light_colors['cursor']}',
+  foreground: '{light_colors['foreground']}',
+  background: '{light_colors['background']}',
+  colors: [{', '.join(f"'{c}'" for c in light_colors['palette'])}]
+}};
+
+// Function to apply theme
+function applyTheme(theme) {{
+  t.prefs_.set('cursor-color', theme.cursor);
+  t.prefs_.set('foreground-color', theme.foreground);
+  t.prefs_.set('background-color', theme.background);
+  if (theme.colors) {{
+    t.prefs_.set('color-palette-overrides', theme.colors);
+  }}
+}}
+
+// Function to set theme based on system preference
+function setPreferredScheme() {{
+  const isDarkMode = window.matchMedia && window.matchMedia('(prefers-color-scheme: dark)').matches;
+  applyTheme(isDarkMode ? darkScheme : lightScheme);
+}}
+
+// Apply initial theme
+setPreferredScheme();
+
+// Listen for theme changes
+if (window.matchMedia) {{
+  window.matchMedia('(prefers-color-scheme: dark)').addEventListener('change', setPreferredScheme);
+}}
+
+// Optional: Add manual theme toggle function
+window.toggleManfredTouronTheme = function() {{
+  const currentBackground = t.prefs_.get('background-color');
+  if (currentBackground === darkScheme.background) {{
+    applyTheme(lightScheme);
+  }} else {{
+    applyTheme(darkScheme);
+  }}
+}};
+"""
+
+
+ANSI_NAMES = ['black', 'red', 'green', 'yellow', 'blue', 'magenta', 'cyan', 'white']
+
+def ansi_fields(template, first=0):
+    """Expand a template over eight ANSI colors: {i}, {name} and {color}"""
+    return [template.format(i=i, name=name, color=f'{{Ansi_{first + i}_Color}}')
+            for i, name in enumerate(ANSI_NAMES)]
+
+def ansi_list(first):
+    """A bracketed list of eight quoted ANSI colors starting at first"""
+    return "[" + ", ".join(f'"{{Ansi_{i}_Color}}"' for i in range(first, first + 8)) + "]"
+
+XRDB = LineFormat([f"#define {color_name} {{{color_name}}}" for color_name in COLOR_NAMES])
+
+XRESOURCES = LineFormat([
+    "!",
+    "! Generated with :",
+    "! XRDB2Xreources.py",
+    "!",
+    *[f"*.color{i}:      {{Ansi_{i}_Color}}" for i in range(16)],
+    "*.background:  {Background_Color}",
+    "*.foreground:  {Foreground_Color}",
+    "*.cursorColor: {Cursor_Color}",
+    "!",
+    "! Bold, Italic, Underline",
+    "*.colorBD:     {Bold_Color}",
+    "!*.colorIT:",
+    "!*.colorUL:",
+])
+
+KITTY = LineFormat([
+    *[f"color{i} {{Ansi_{i}_Color}}" for i in range(16)],
+    "background {Background_Color}",
+    "foreground {Foreground_Color}",
+    "cursor {Cursor_Color}",
+    "cursor_text_color {Cursor_Text_Color}",
+    "selection_background {Selection_Color}",
+    "selection_foreground {Selected_Text_Color}",
+])
+
+VSCODE = JsonFormat({
+    **{f'terminal.ansi{name.capitalize()}': f'{{Ansi_{i}_Color}}'
+       for i, name in enumerate(ANSI_NAMES)},
+    **{f'terminal.ansiBright{name.capitalize()}': f'{{Ansi_{i + 8}_Color}}'
+       for i, name in enumerate(ANSI_NAMES)},
+    'terminal.background': '{Background_Color}',
+    'terminal.foreground': '{Foreground_Color}',
+    'terminalCursor.foreground': '{Cursor_Color}',
+    'terminal.selectionBackground': '{Selection_Color}',
+}, key='workbench.colorCustomizations')
+
+# OSC escape sequences, in the order apply-theme.sh sends them
+OSC = LineFormat([
+    "\033]11;{Background_Color}\007",
+    "\033]10;{Foreground_Color}\007",
+    "\033]12;{Cursor_Color}\007",
+    *[f"\033]4;{i};{{Ansi_{i}_Color}}\007" for i in range(16)],
+    "\033]17;{Selection_Color}\007",
+    "\033]19;{Selected_Text_Color}\007",
+], end="")
+
+ALACRITTY = LineFormat([
+    "[colors.primary]",
+    'background = "{Background_Color}"',
+    'foreground = "{Foreground_Color}"',
+    "",
+    "[colors.cursor]",
+    'text = "{Cursor_Text_Color}"',
+    'cursor = "{Cursor_Color}"',
+    "",
+    "[colors.selection]",
+    'text = "{Selected_Text_Color}"',
+    'background = "{Selection_Color}"',
+    "",
+    "[colors.normal]",
+    *ansi_fields('{name} = "{color}"'),
+    "",
+    "[colors.bright]",
+    *ansi_fields('{name} = "{color}"', 8),
+])
+
+WEZTERM = LineFormat([
+    "[colors]",
+    'foreground = "{Foreground_Color}"',
+    'background = "{Background_Color}"',
+    'cursor_bg = "{Cursor_Color}"',
+    'cursor_border = "{Cursor_Color}"',
+    'cursor_fg = "{Cursor_Text_Color}"',
+    'selection_bg = "{Selection_Color}"',
+    'selection_fg = "{Selected_Text_Color}"',
+    "ansi = " + ansi_list(0),
+    "brights = " + ansi_list(8),
+    "",
+    "[metadata]",
+    'name = "{name}"',
+])
+
+# Windows Terminal calls magenta purple
+WINDOWS_TERMINAL = JsonFormat({
+    'name': '{name}',
+    'background': '{Background_Color}',
+    'foreground': '{Foreground_Color}',
+    'cursorColor': '{Cursor_Color}',
+    'selectionBackground': '{Selection_Color}',
+    **{name.replace('magenta', 'purple'): f'{{Ansi_{i}_Color}}'
+       for i, name in enumerate(ANSI_NAMES)},
+    **{'bright' + name.replace('magenta', 'purple').capitalize(): f'{{Ansi_{i + 8}_Color}}'
+       for i, name in enumerate(ANSI_NAMES)},
+})
+
+FOOT = LineFormat([
+    "[colors]",
+    "foreground={Foreground_Color}",
+    "background={Background_Color}",
+    *ansi_fields("regular{i}={color}"),
+    *ansi_fields("bright{i}={color}", 8),
+    "cursor={Cursor_Text_Color} {Cursor_Color}",
+    "selection-foreground={Selected_Text_Color}",
+    "selection-background={Selection_Color}",
+], bare=True)
+
+# Output formats by name: name -> (file suffix, write(Scheme) -> str)
+WRITERS = {}
+
+def register_writer(name, suffix, write):
+    """Register write(scheme) -> str as format name, written to <scheme><suffix>"""
+    WRITERS[name] = (suffix, write)
+
+register_writer('xrdb', '.xrdb', XRDB)
+register_writer('xresources', '.Xresources', XRESOURCES)
+register_writer('kitty', '.kitty', KITTY)
+register_writer('vscode', '.vscode', VSCODE)
+register_writer('hterm', '.hterm.js', lambda scheme: to_hterm(scheme.palette()))
+register_writer('osc', '.osc', OSC)
+register_writer('alacritty', '.alacritty.toml', ALACRITTY)
+register_writer('wezterm', '.wezterm.toml', WEZTERM)
+register_writer('windows-terminal', '.windows-terminal.json', WINDOWS_TERMINAL)
+register_writer('foot', '.foot.ini', FOOT)
+
+# Formats compiled for every scheme in the repository
+TARGETS = ['xresources', 'kitty', 'vscode', 'hterm', 'osc']
+
+def writer(fmt):
+    """Return (suffix, write) of a registered format"""
+    try:
+        return WRITERS[fmt]
+    except KeyError:
+        raise ValueError(f"unknown format {fmt!r}; expected one of {sorted(WRITERS)}") from None
+
+def convert_schemes(schemes, formats):
+    """Render every Scheme in every format, yielding (scheme, format, text)
+
+    Writers are looked up once, so N schemes and M formats cost one
+    lookup per format plus one render per output.
+    """
+    writers = [(fmt, writer(fmt)[1]) for fmt in formats]
+    for scheme in schemes:
+        for fmt, write in writers:
+            yield scheme, fmt, write(scheme)
+
+def render(fmt, colors, name=None):
+    """Render a {color name: value} palette in one registered format"""
+    return writer(fmt)[1](Scheme.from_palette(colors, name))
+
+def to_xrdb(colors):
+    """Render a palette as xrdb #define lines"""
+    return render('xrdb', colors)
+
+def to_xresources(colors):
+    """Render a palette in Xresources format"""
+    return render('xresources', colors)
+
+def to_kitty(colors):
+    """Render a palette in Kitty format"""
+    return render('kitty', colors)
+
+def to_vscode(colors):
+    """Render a palette as VS Code terminal color customizations"""
+    return render('vscode', colors)
+
+def to_osc(colors):
+    """Render a palette as the OSC escape sequences that apply it to a terminal"""
+    return render('osc', colors)
@@ -0,0 +1,239 @@
+"""Render scheme swatches and ANSI captures to PNG images
+
+output_file may be a path or a binary file object such as io.BytesIO.
+"""
+
+from PIL import Image, ImageDraw
+
+from ansi import AnsiParser, theme_ansi_colors
+from instrument import timed
+from raster import MONO_FONT, MONO_BOLD_FONT, GlyphAtlas, load_font, text_size
+from vt import Screen
+
+# Scrolled-off lines kept when a capture is replayed on a fixed-size screen
+SCREEN_HISTORY = 10000
+
+@timed
+def generate_preview(colors, output_file, title="ManfredTouron Color Scheme"):
+    """Generate a preview image of the color scheme"""
+    # Image settings
+    width = 800
+    height = 600
+    cell_size = 60
+    padding = 20
+    
+    # Create image with background color
+    bg_color = colors.get('Background_Color', '#000000')
+    fg_color = colors.get('Foreground_Color', '#ffffff')
+    
+    img = Image.new('RGB', (width, height), bg_color)
+    draw = ImageDraw.Draw(img)
+    
+    # Use a monospace font, loaded once per process
+    font = load_font(MONO_FONT, 16)
+    title_font = load_font("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 24)
+    
+    # Draw title
+    draw.text((padding, padding), title, fill=fg_color, font=title_font)
+    
+    # Draw color grid
+    y_offset = padding + 50
+    
+    # Draw ANSI colors 0-7
+    draw.text((padding, y_offset), "Normal Colors:", fill=fg_color, font=font)
+    y_offset += 25
+    
+    for i in range(8):
+        x = padding + (i * (cell_size + 5))
+        y = y_offset
+        color = colors.get(f'Ansi_{i}_Color', '#000000')
+        
+        # Draw color box
+        draw.rectangle([x, y, x + cell_size, y + cell_size], fill=color, outline=fg_color)
+        
+        # Draw color number
+        text = str(i)
+        text_width, text_height = text_size(font, text)
+        text_x = x + (cell_size - text_width) // 2
+        text_y = y + (cell_size - text_height) // 2
+        
+        # Use contrasting color for text
+        text_color = '#000000' if i > 0 else '#ffffff'
+        draw.text((text_x, text_y), text, fill=text_color, font=font)
+    
+    # Draw ANSI colors 8-15
+    y_offset += cell_size + 20
+    draw.text((padding, y_offset), "Bright Colors:", fill=fg_color, font=font)
+    y_offset += 25
+    
+    for i in range(8, 16):
+        x = padding + ((i - 8) * (cell_size + 5))
+        y = y_offset
+        color = colors.get(f'Ansi_{i}_Color', '#000000')
+        
+        # Draw color box
+        draw.rectangle([x, y, x + cell_size, y + cell_size], fill=color, outline=fg_color)
+        
+        # Draw color number
+        text = str(i)
+        text_width, text_height = text_size(font, text)
+        text_x = x + (cell_size - text_width) // 2
+        text_y = y + (cell_size - text_height) // 2
+        
+        # Use contrasting color for text
+        text_color = '#000000'
+        draw.text((text_x, text_y), text, fill=text_color, font=font)
+    
+    # Draw sample text
+    y_offset += cell_size + 40
+    draw.text((padding, y_offset), "Sample Text:", fill=fg_color, font=font)
+    y_offset += 25
+    
+    sample_texts = [
+        ("Normal text in foreground color", fg_color),
+        ("Red text sample", colors.get('Ansi_1_Color', '#ff0000')),
+        ("Green text sample", colors.get('Ansi_2_Color', '#00ff00')),
+        ("Yellow text sample", colors.get('Ansi_3_Color', '#ffff00')),
+        ("Blue text sample", colors.get('Ansi_4_Color', '#0000ff')),
+        ("Magenta text sample", colors.get('Ansi_5_Color', '#ff00ff')),
+        ("Cyan text sample", colors.get('Ansi_6_Color', '#00ffff')),
+    ]
+    
+    for text, color in sample_texts:
+        draw.text((padding + 20, y_offset), text, fill=color, font=font)
+        y_offset += 25
+    
+    # Save image
+    img.save(output_file, format='PNG')
+
+@timed
+def ansi_to_image(ansi_text, output_file, title, theme_colors=None, screen_size=None):
+    """Convert ANSI colored text to image
+
+    With screen_size=(cols, rows) the capture is executed on a vt.Screen,
+    so cursor movement, erase and carriage returns take effect; otherwise
+    only SGR colors are interpreted.
+    """
+    if screen_size:
+        cols, rows = screen_size
+        screen = Screen(cols, rows, theme_colors, history=SCREEN_HISTORY)
+        screen.feed(ansi_text)
+        runs_to_image(screen.lines(), output_file, title, theme_colors)
+        return
+
+    fg_color, bg_color = theme_fg_bg(theme_colors)
+    
+    # Parse the whole capture once into styled runs
+    parser = AnsiParser(fg_color, bg_color, theme_ansi_colors(theme_colors))
+    runs_to_image(parser.parse_lines(ansi_text), output_file, title, theme_colors)
+
+def theme_fg_bg(theme_colors=None):
+    """Return the (foreground, background) of a theme, with terminal defaults"""
+    if theme_colors:
+        return (theme_colors.get('Foreground_Color', '#ffffff'),
+                theme_colors.get('Background_Color', '#000000'))
+    return '#ffffff', '#000000'
+
+# Capture image settings
+CAPTURE_PADDING = 20
+TITLE_FONT = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+
+def capture_layout(lines):
+    """Return the glyph atlas, image size and grid origin for lines of runs
+
+    The layout only depends on the text, so it is the same in every theme.
+    """
+    # Image settings
+    font_size = 14
+    line_height = font_size + 2  # Much tighter line spacing like terminal
+    padding = CAPTURE_PADDING
+    
+    line_lengths = [sum(len(run[0]) for run in line) for line in lines]
+    
+    # Monospace cell grid backed by a glyph atlas
+    atlas = GlyphAtlas(load_font(MONO_FONT, font_size),
+                       load_font(MONO_BOLD_FONT, font_size),
+                       line_height)
+    
+    # Calculate dimensions more carefully
+    # Count actual printable lines (non-empty after stripping ANSI)
+    line_count = sum(1 for line in lines if any(run[0].strip() for run in line))
+    if not line_count:
+        line_count = len(lines)
+    
+    max_line_length = max(line_lengths) if line_lengths else 0
+    if max_line_length == 0:
+        max_line_length = 80
+        
+    width = min(max_line_length * atlas.cell_width + padding * 2, 1400)
+    height = max(line_count * line_height + padding * 2 + 40, 200)  # Tighter overall height
+    
+    return atlas, (width, height), (padding, padding + 30)  # Less space after title
+
+def draw_title(img, title, color):
+    """Draw a capture image's title above its grid"""
+    title_font = load_font(TITLE_FONT, 18)
+    ImageDraw.Draw(img).text((CAPTURE_PADDING, CAPTURE_PADDING), title, fill=color,
+                             font=title_font)
+
+@timed
+def runs_to_image(lines, output_file, title, theme_colors=None):
+    """Render lines of (text, fg, bg, bold) runs to an image"""
+    # Use theme colors if provided
+    fg_color, bg_color = theme_fg_bg(theme_colors)
+    
+    atlas, size, origin = capture_layout(lines)
+    
+    # Create image
+    img = Image.new('RGB', size, bg_color)
+    draw_title(img, title, fg_color)
+    
+    # Render the styled runs on the cell grid
+    atlas.draw_lines(img, lines, origin, bg_color)
+    
+    img.save(output_file, format='PNG')
+
+class ScreenImage:
+    """The pixels of a vt.Screen, redrawn only where rows were damaged"""
+
+    def __init__(self, screen, font_size=14, padding=20):
+        self.screen = screen
+        self.atlas = GlyphAtlas(load_font(MONO_FONT, font_size),
+                                load_font(MONO_BOLD_FONT, font_size),
+                                font_size + 2)
+        self.padding = padding
+        self.width = screen.cols * self.atlas.cell_width
+        self.image = Image.new('RGB', (self.width + padding * 2,
+                                       screen.rows * self.atlas.cell_height + padding * 2),
+                               screen.default_bg)
+
+    def update(self):
+        """Redraw the damaged rows, returning their pixel bounding box or None"""
+        scrolled = self.screen.take_scroll()
+        rows = self.screen.take_damage()
+        ch = self.atlas.cell_height
+        x0 = self.padding
+        if scrolled:
+            # Move the rows that survived the scroll instead of redrawing them
+            top, bottom = self.padding, self.padding + self.screen.rows * ch
+            shift = scrolled * ch
+            if abs(scrolled) < self.screen.rows:
+                kept = self.image.crop((x0, max(top, top + shift), x0 + self.width,
+                                        min(bottom, bottom + shift)))
+                self.image.paste(kept, (x0, max(top, top - shift)))
+        if not rows:
+            return None
+        draw = ImageDraw.Draw(self.image)
+        for row in rows:
+            y = self.padding + row * ch
+            draw.rectangle([x0, y, x0 + self.width - 1, y + ch - 1], fill=self.screen.default_bg)
+            self.atlas.draw_lines(self.image, [self.screen.row_runs(row)], (x0, y),
+                                  self.screen.default_bg)
+        if scrolled:
+            return (x0, self.padding, x0 + self.width, self.padding + self.screen.rows * ch)
+        return (x0, self.padding + min(rows) * ch,
+                x0 + self.width, self.padding + (max(rows) + 1) * ch)
+
+    def save(self, output_file):
+        self.update()
+        self.image.save(output_file, format='PNG')
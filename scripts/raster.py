@@ -0,0 +1,97 @@
+"""Terminal cell-grid rasterizer with a cached glyph atlas"""
+
+from functools import lru_cache
+
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+from instrument import timed
+
+MONO_FONT = "/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf"
+MONO_BOLD_FONT = "/usr/share/fonts/truetype/dejavu/DejaVuSansMono-Bold.ttf"
+
+@lru_cache(maxsize=None)
+def load_font(path, size):
+    """Load a TrueType font once per (path, size), falling back to the default font"""
+    try:
+        return ImageFont.truetype(path, size)
+    except OSError:
+        return ImageFont.load_default()
+
+@lru_cache(maxsize=4096)
+def rgb(color):
+    """Convert a color string to an RGB tuple"""
+    return ImageColor.getrgb(color)
+
+@lru_cache(maxsize=4096)
+def text_size(font, text):
+    """Return the (width, height) of text's bounding box in font"""
+    bbox = font.getbbox(text)
+    return bbox[2] - bbox[0], bbox[3] - bbox[1]
+
+class GlyphAtlas:
+    """Rasterize each glyph once and blit it into cells afterwards
+
+    Entries are keyed by (char, fg, bold). Coverage masks are shared
+    between colors, so a new color only costs a cheap tinted paste.
+    """
+
+    def __init__(self, font, bold_font=None, line_height=None):
+        self.font = font
+        self.bold_font = bold_font or font
+        self.cell_width = max(1, round(font.getlength('X')))
+        self.cell_height = line_height or sum(font.getmetrics())
+        self.masks = {}
+        self.glyphs = {}
+
+    def mask(self, char, bold):
+        """Return the coverage mask for char, rendering it on first use"""
+        key = (char, bold)
+        mask = self.masks.get(key)
+        if mask is None:
+            font = self.bold_font if bold else self.font
+            width = max(self.cell_width, int(font.getlength(char) + 0.5))
+            mask = Image.new('L', (width, self.cell_height), 0)
+            ImageDraw.Draw(mask).text((0, 0), char, fill=255, font=font)
+            self.masks[key] = mask
+        return mask
+
+    def glyph(self, char, fg, bold):
+        """Return the (mask, rgb) pair to blit for char in color fg"""
+        key = (char, fg, bold)
+        glyph = self.glyphs.get(key)
+        if glyph is None:
+            glyph = (self.mask(char, bold), rgb(fg))
+            self.glyphs[key] = glyph
+        return glyph
+
+    @timed
+    def draw_lines(self, img, lines, origin, default_bg):
+        """Render lines of (text, fg, bg, bold) runs onto a fixed cell grid"""
+        draw = ImageDraw.Draw(img)
+        x0, y0 = origin
+        cw = self.cell_width
+        ch = self.cell_height
+        max_x = img.width
+        for row, line in enumerate(lines):
+            y = y0 + row * ch
+            if y >= img.height:
+                break
+
+            # Backgrounds first, one rectangle per run
+            x = x0
+            for text, fg, bg, bold in line:
+                run_width = len(text) * cw
+                if bg != default_bg and x < max_x:
+                    draw.rectangle([x, y, x + run_width - 1, y + ch - 1], fill=bg)
+                x += run_width
+
+            # Then glyphs, so wide glyphs may overhang into the next cell
+            x = x0
+            for text, fg, bg, bold in line:
+                for char in text:
+                    if x >= max_x:
+                        break
+                    if not char.isspace():
+                        mask, color = self.glyph(char, fg, bold)
+                        img.paste(color, (x, y), mask)
+                    x += cw
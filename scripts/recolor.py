@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""Re-theme 256-color and truecolor ANSI output as a stdin-to-stdout filter
+
+SGR sequences selecting an extended color (38;5;n, 48;5;n, 38;2;r;g;b,
+48;2;r;g;b and their colon forms) are rewritten to the nearest color of
+the scheme in OKLab: by default as a plain 16-color code (30-37, 90-97,
+...), which the terminal then draws in its own theme. Everything else
+passes through byte for byte.
+
+Rewrites are memoized per distinct SGR parameter string and per color,
+so the filter only does real work the first time it meets a sequence,
+and new colors in a chunk are matched in one vectorized query. Known
+sequences are substituted without a Python call per match, and chunks
+without an escape byte are written out untouched.
+"""
+
+import argparse
+import os
+import re
+import sys
+
+from ansi import MAX_PENDING, PARTIAL_RE, theme_ansi_colors
+from nearest import theme_index, xterm_256_rgb
+from palette import load_palette
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_THEME = os.path.join(os.path.dirname(SCRIPT_DIR), 'ManfredTouron.xrdb')
+
+# Read size; os.read returns early with whatever is available, so a slow
+# producer is forwarded line by line rather than buffered
+CHUNK_SIZE = 1 << 18
+
+# SGR sequences that may select an extended color; rewrite() sorts out the rest
+SGR_RE = re.compile(rb'\x1b\[([0-9;:]*?[34]8[;:][0-9;:]*)m')
+PARTIAL_BYTES_RE = re.compile(PARTIAL_RE.pattern.encode())
+
+# Distinct SGR strings remembered before the cache is reset (checked per chunk)
+MAX_CACHE = 1 << 16
+
+class Recolorer:
+    """Rewrite extended-color SGR sequences to a scheme's palette
+
+    colors is the candidate palette size (16 or 256). With truecolor, the
+    chosen palette color is written as 38;2;r;g;b instead of an index, for
+    terminals that are not themed themselves.
+    """
+
+    def __init__(self, theme_colors=None, colors=16, truecolor=False):
+        ansi_colors = theme_ansi_colors(theme_colors)
+        self.index = theme_index(ansi_colors, colors)
+        self.palette_rgb = self.index.rgb.tolist()
+        self.source_rgb = [tuple(rgb) for rgb in xterm_256_rgb(ansi_colors).tolist()]
+        self.colors = colors
+        self.truecolor = truecolor
+        # SGR parameters -> replacement sequence, and (r, g, b) -> palette index
+        self.cache = {}
+        self.nearest = {}
+
+    def color_code(self, background, n):
+        """SGR parameters selecting palette entry n"""
+        if self.truecolor:
+            r, g, b = self.palette_rgb[n]
+            return f"{48 if background else 38};2;{r};{g};{b}"
+        if n >= 16:
+            return f"{48 if background else 38};5;{n}"
+        if n >= 8:
+            return str((100 if background else 90) + n - 8)
+        return str((40 if background else 30) + n)
+
+    def extended_color(self, params):
+        """Parse ['5', n] or ['2', (colorspace,) r, g, b] into an RGB triple, or None"""
+        if len(params) >= 2 and params[0] == '5':
+            n = int(params[1])
+            return self.source_rgb[n] if n < 256 else None
+        if len(params) >= 4 and params[0] == '2':
+            rgb = tuple(int(p) for p in params[-3:])
+            return rgb if max(rgb) < 256 else None
+        return None
+
+    def parse(self, params):
+        """Split SGR parameters into kept strings and (background, rgb) colors to remap"""
+        parts = params.split(';')
+        items = []
+        i = 0
+        while i < len(parts):
+            part = parts[i]
+            code, colon, rest = part.partition(':')
+            if code not in ('38', '48'):
+                items.append(part)
+                i += 1
+                continue
+            if colon:
+                args, used = rest.split(':'), 1
+            else:
+                kind = parts[i + 1] if i + 1 < len(parts) else ''
+                used = 1 + {'5': 2, '2': 4}.get(kind, 0)
+                args = parts[i + 1:i + used]
+            rgb = self.extended_color(args) if used > 1 or colon else None
+            if rgb is None or (self.colors == 256 and not self.truecolor and args[0] == '5'):
+                items += parts[i:i + used]
+            else:
+                items.append((code == '48', rgb))
+            i += used
+        return items
+
+    def learn(self, new_params):
+        """Compute the replacements of new SGR parameter strings
+
+        The colors they use are resolved with one batched nearest-color
+        query rather than one query per color.
+        """
+        parsed = {}
+        for params in new_params:
+            try:
+                parsed[params] = self.parse(params.decode())
+            except (ValueError, IndexError):
+                # Leave malformed sequences alone
+                self.cache[params] = b'\x1b[' + params + b'm'
+        colors = list({item[1] for items in parsed.values() for item in items
+                       if isinstance(item, tuple) and item[1] not in self.nearest})
+        if colors:
+            self.nearest.update(zip(colors, self.index.nearest(colors).tolist()))
+        for params, items in parsed.items():
+            codes = [item if isinstance(item, str)
+                     else self.color_code(item[0], self.nearest[item[1]]) for item in items]
+            self.cache[params] = b'\x1b[' + ';'.join(codes).encode() + b'm'
+
+    def recolor(self, data):
+        """Rewrite every complete SGR sequence in a bytes chunk
+
+        The chunk is split around extended-color sequences and their
+        parameters are swapped for cached replacements in one map();
+        sequences seen for the first time are learned together first.
+        """
+        parts = SGR_RE.split(data)
+        if len(parts) == 1:
+            return data
+        if len(self.cache) >= MAX_CACHE:
+            self.cache.clear()
+            self.nearest.clear()
+        params = parts[1::2]
+        try:
+            parts[1::2] = map(self.cache.__getitem__, params)
+        except KeyError:
+            self.learn({p for p in params if p not in self.cache})
+            parts[1::2] = map(self.cache.__getitem__, params)
+        return b''.join(parts)
+
+    def stream(self, read, write, size=CHUNK_SIZE):
+        """Filter read(size) chunks to write(), holding back split escapes"""
+        pending = b''
+        while True:
+            chunk = read(size)
+            if not chunk:
+                break
+            if pending:
+                chunk = pending + chunk
+                pending = b''
+            tail = max(0, len(chunk) - MAX_PENDING)
+            if chunk.find(b'\x1b', tail) >= 0:
+                match = PARTIAL_BYTES_RE.search(chunk, tail)
+                if match:
+                    pending = chunk[match.start():]
+                    chunk = chunk[:match.start()]
+            if b'\x1b' in chunk:
+                chunk = self.recolor(chunk)
+            write(chunk)
+        if pending:
+            write(self.recolor(pending))
+
+def write_all(fd, data):
+    """os.write until all of data is written"""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-t', '--theme', default=DEFAULT_THEME,
+                        help=".xrdb/.itermcolors/.pal scheme (default: ManfredTouron.xrdb)")
+    parser.add_argument('--colors', type=int, choices=(16, 256), default=16,
+                        help="palette to map onto (default: the 16 scheme colors)")
+    parser.add_argument('--truecolor', action='store_true',
+                        help="write the scheme colors as 24-bit SGR instead of palette indices")
+    args = parser.parse_args()
+
+    recolorer = Recolorer(load_palette(args.theme), args.colors, args.truecolor)
+    stdin, stdout = sys.stdin.fileno(), sys.stdout.fileno()
+    try:
+        recolorer.stream(lambda size: os.read(stdin, size),
+                         lambda data: write_all(stdout, data))
+    except BrokenPipeError:
+        # Downstream closed (e.g. piped into head): stop quietly
+        pass
+    except KeyboardInterrupt:
+        sys.exit(130)
+
+if __name__ == '__main__':
+    main()
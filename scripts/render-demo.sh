@@ -1,6 +1,9 @@
 #!/bin/bash
 # Render a demo of the color scheme
 
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+ROOT_DIR="$(dirname "$SCRIPT_DIR")"
+
 # Function to show color palette
 show_palette() {
     echo -e "\n\033[1mManfredTouron Color Scheme\033[0m"
@@ -65,9 +68,26 @@ capture_as_image() {
     fi
 }
 
+# Function to record the demo and render it as an animation in the scheme
+capture_as_animation() {
+    output_file="${1:-$ROOT_DIR/assets/demo.gif}"
+    if command -v asciinema &> /dev/null; then
+        echo "Recording terminal session..."
+        asciinema rec --overwrite -c "bash $0" /tmp/colorscheme.cast
+        "$SCRIPT_DIR/run-with-nix.sh" python3 "$SCRIPT_DIR/asciicast.py" \
+            --theme "$ROOT_DIR/ManfredTouron.xrdb" /tmp/colorscheme.cast "$output_file"
+        rm -f /tmp/colorscheme.cast
+    else
+        echo "asciinema not found. Install with: pip install asciinema"
+        return 1
+    fi
+}
+
 # Main
 if [ "$1" == "capture" ]; then
     capture_as_image
+elif [ "$1" == "animate" ]; then
+    capture_as_animation "$2"
 else
     show_palette
 fi
\ No newline at end of file
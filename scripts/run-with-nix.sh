@@ -3,8 +3,8 @@
 
 set -euo pipefail
 
-# Check if Python with Pillow is available
-if python3 -c "import PIL" 2>/dev/null; then
+# Check if Python with Pillow and NumPy is available
+if python3 -c "import PIL, numpy" 2>/dev/null; then
     # Dependencies available, run directly
     exec "$@"
 elif command -v nix-shell >/dev/null 2>&1; then
@@ -15,6 +15,6 @@ else
     echo "Error: Dependencies not available and Nix not installed."
     echo "Either:"
     echo "  1. Install Nix: https://nixos.org/download.html"
-    echo "  2. Install dependencies manually: pip install Pillow"
+    echo "  2. Install dependencies manually: pip install Pillow numpy"
     exit 1
 fi
\ No newline at end of file
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""Compact binary palettes and a memory-mapped scheme library
+
+A palette record is the 23 named colors of palette.COLOR_NAMES packed
+as RGB bytes, followed by a 24-bit mask of the colors the scheme
+actually defines: 72 bytes per scheme, no text to parse.
+
+A library (.palib) holds thousands of records behind a fixed header, an
+open-addressing hash table over the scheme names and the UTF-8 names
+themselves. Opening it is a single mmap, and resolving a name is one
+hash probe plus a slice, so lookups cost microseconds at any size.
+
+Library layout (little-endian):
+    header   MAGIC, version, record size, count, slots, section offsets
+    records  count * RECORD_SIZE bytes, sorted by name
+    names    count * (offset, length) entries into the name blob
+    slots    slots * uint32, record index + 1 (0 = empty)
+    blob     concatenated UTF-8 names
+"""
+
+import mmap
+import os
+import struct
+import sys
+
+from palette import COLOR_NAMES, find_schemes, load_palette, scheme_name, unique_schemes
+
+# One palette record: 23 RGB triples plus a presence bitmask
+RGB_SIZE = 3 * len(COLOR_NAMES)
+MASK = struct.Struct('<I')
+RECORD_SIZE = RGB_SIZE + 3
+
+# Standalone .pal file: magic, version, record
+PALETTE_MAGIC = b'CSPL'
+LIBRARY_MAGIC = b'CSLB'
+FORMAT_VERSION = 1
+PALETTE_HEADER = struct.Struct('<4sHH')
+LIBRARY_HEADER = struct.Struct('<4sHHIIIIII')
+NAME_ENTRY = struct.Struct('<IHH')
+SLOT = struct.Struct('<I')
+
+class LibraryError(ValueError):
+    """Raised for malformed palette or library files"""
+
+def name_hash(name):
+    """FNV-1a 32-bit hash of an encoded name (stable across processes)"""
+    h = 0x811c9dc5
+    for byte in name:
+        h = ((h ^ byte) * 0x01000193) & 0xffffffff
+    return h
+
+def pack_palette(colors):
+    """Pack an xrdb {name: '#rrggbb'} palette into a RECORD_SIZE record"""
+    rgb = bytearray(RGB_SIZE)
+    mask = 0
+    for i, name in enumerate(COLOR_NAMES):
+        value = colors.get(name)
+        if value is None:
+            continue
+        digits = value.lstrip('#')
+        if len(digits) != 6:
+            raise LibraryError(f"{name}: expected #rrggbb, got {value!r}")
+        rgb[3 * i:3 * i + 3] = bytes.fromhex(digits)
+        mask |= 1 << i
+    return bytes(rgb) + MASK.pack(mask)[:3]
+
+def unpack_palette(record):
+    """Unpack a record into an ordered {name: '#rrggbb'} palette"""
+    record = bytes(record)
+    mask = MASK.unpack(record[RGB_SIZE:RECORD_SIZE] + b'\0')[0]
+    digits = record[:RGB_SIZE].hex()
+    return {name: '#' + digits[6 * i:6 * i + 6]
+            for i, name in enumerate(COLOR_NAMES) if mask >> i & 1}
+
+def write_palette(path, colors):
+    """Write a single-scheme .pal file"""
+    with open(path, 'wb') as f:
+        f.write(PALETTE_HEADER.pack(PALETTE_MAGIC, FORMAT_VERSION, RECORD_SIZE))
+        f.write(pack_palette(colors))
+
+def read_palette(path):
+    """Read a single-scheme .pal file"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) != PALETTE_HEADER.size + RECORD_SIZE:
+        raise LibraryError(f"{path}: not a palette file")
+    magic, version, size = PALETTE_HEADER.unpack_from(data)
+    if magic != PALETTE_MAGIC or version != FORMAT_VERSION or size != RECORD_SIZE:
+        raise LibraryError(f"{path}: unsupported palette file")
+    return unpack_palette(data[PALETTE_HEADER.size:])
+
+def build_library(path, schemes):
+    """Write a library from (name, colors) pairs; the first pair of each name is kept"""
+    by_name = {}
+    for name, colors in schemes:
+        key = name.encode('utf-8')
+        if key not in by_name:
+            by_name[key] = pack_palette(colors)
+    names = sorted(by_name)
+    count = len(names)
+    # Power-of-two table at most half full keeps probes short
+    slots = 8
+    while slots < 2 * count:
+        slots *= 2
+
+    table = [0] * slots
+    for index, name in enumerate(names):
+        slot = name_hash(name) & (slots - 1)
+        while table[slot]:
+            slot = (slot + 1) & (slots - 1)
+        table[slot] = index + 1
+
+    records_off = LIBRARY_HEADER.size
+    names_off = records_off + count * RECORD_SIZE
+    slots_off = names_off + count * NAME_ENTRY.size
+    blob_off = slots_off + slots * SLOT.size
+
+    entries = bytearray()
+    offset = 0
+    for name in names:
+        entries += NAME_ENTRY.pack(offset, len(name), 0)
+        offset += len(name)
+
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(LIBRARY_HEADER.pack(LIBRARY_MAGIC, FORMAT_VERSION, RECORD_SIZE, count,
+                                    slots, records_off, names_off, slots_off, blob_off))
+        f.write(b''.join(by_name[name] for name in names))
+        f.write(entries)
+        f.write(struct.pack(f'<{slots}I', *table))
+        f.write(b''.join(names))
+    os.replace(tmp, path)
+    return count
+
+class SchemeLibrary:
+    """Read-only, memory-mapped view of a .palib library"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.map) < LIBRARY_HEADER.size:
+            raise LibraryError(f"{path}: not a scheme library")
+        (magic, version, record_size, self.count, self.slots, self.records_off,
+         self.names_off, self.slots_off, self.blob_off) = LIBRARY_HEADER.unpack_from(self.map)
+        if magic != LIBRARY_MAGIC or version != FORMAT_VERSION or record_size != RECORD_SIZE:
+            raise LibraryError(f"{path}: unsupported scheme library")
+
+    def close(self):
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def name(self, index):
+        """Name of the scheme at index"""
+        offset, length, _ = NAME_ENTRY.unpack_from(self.map, self.names_off + index * NAME_ENTRY.size)
+        start = self.blob_off + offset
+        return self.map[start:start + length].decode('utf-8')
+
+    def names(self):
+        """All scheme names, sorted"""
+        return [self.name(i) for i in range(self.count)]
+
+    def __iter__(self):
+        return iter(self.names())
+
+    def index(self, name):
+        """Record index of a scheme, or None"""
+        key = name.encode('utf-8')
+        mask = self.slots - 1
+        slot = name_hash(key) & mask
+        while True:
+            entry = SLOT.unpack_from(self.map, self.slots_off + slot * SLOT.size)[0]
+            if not entry:
+                return None
+            offset, length, _ = NAME_ENTRY.unpack_from(
+                self.map, self.names_off + (entry - 1) * NAME_ENTRY.size)
+            start = self.blob_off + offset
+            if length == len(key) and self.map[start:start + length] == key:
+                return entry - 1
+            slot = (slot + 1) & mask
+
+    def __contains__(self, name):
+        return self.index(name) is not None
+
+    def record(self, index):
+        """Raw RECORD_SIZE bytes of the scheme at index"""
+        start = self.records_off + index * RECORD_SIZE
+        return self.map[start:start + RECORD_SIZE]
+
+    def __getitem__(self, name):
+        index = self.index(name)
+        if index is None:
+            raise KeyError(name)
+        return unpack_palette(self.record(index))
+
+    def get(self, name, default=None):
+        index = self.index(name)
+        return default if index is None else unpack_palette(self.record(index))
+
+    def records(self):
+        """Zero-copy buffer over all records, e.g. for numpy.frombuffer"""
+        return memoryview(self.map)[self.records_off:self.names_off]
+
+def load_schemes(paths):
+    """Yield (name, colors) for every loadable scheme under paths, once per name"""
+    for path in unique_schemes(find_schemes(paths)):
+        try:
+            yield scheme_name(path), load_palette(path)
+        except Exception as e:
+            print(f"! {path}: {e}", file=sys.stderr)
+
+def main():
+    usage = ("Usage: schemelib.py build <library.palib> <scheme|dir> ...\n"
+             "       schemelib.py get <library.palib> <name>\n"
+             "       schemelib.py list <library.palib>")
+    args = sys.argv[1:]
+    if len(args) < 2 or args[0] not in ('build', 'get', 'list'):
+        print(usage, file=sys.stderr)
+        sys.exit(1)
+
+    command, library = args[0], args[1]
+    if command == 'build':
+        if len(args) < 3:
+            print(usage, file=sys.stderr)
+            sys.exit(1)
+        count = build_library(library, load_schemes(args[2:]))
+        print(f"Wrote {count} schemes to {library}")
+        return
+
+    with SchemeLibrary(library) as lib:
+        if command == 'list':
+            for name in lib:
+                print(name)
+        elif len(args) < 3:
+            print(usage, file=sys.stderr)
+            sys.exit(1)
+        else:
+            colors = lib.get(args[2])
+            if colors is None:
+                print(f"Error: no scheme named {args[2]!r} in {library}", file=sys.stderr)
+                sys.exit(1)
+            for name, value in colors.items():
+                print(f"#define {name} {value}")
+
+if __name__ == '__main__':
+    main()
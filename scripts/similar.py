@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""Find perceptually similar color schemes
+
+Each scheme is embedded as its 23 colors in OKLab, scaled by how much
+each color matters to the look of a terminal (background and foreground
+most, cursor and selection least), so squared Euclidean distance between
+embeddings is a weighted perceptual distance between schemes. Queries
+are answered with one matrix-vector product over the whole corpus.
+"""
+
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from colorspace import FALLBACKS, hex_to_rgb, rgb_to_oklab, stack_schemes
+from palette import COLOR_NAMES, find_schemes, load_palette, scheme_name, unique_schemes
+
+# Relative weight of each color in the distance
+COLOR_WEIGHTS = {
+    'Background_Color': 4.0,
+    'Foreground_Color': 3.0,
+    'Cursor_Color': 0.5,
+    'Cursor_Text_Color': 0.25,
+    'Bold_Color': 0.5,
+    'Selection_Color': 0.5,
+    'Selected_Text_Color': 0.25,
+}
+WEIGHTS = np.array([COLOR_WEIGHTS.get(name, 1.0) for name in COLOR_NAMES])
+
+# Short names accepted by --near, besides 0-15 and the full color names
+COLOR_ALIASES = {
+    'bg': 'Background_Color',
+    'fg': 'Foreground_Color',
+    'cursor': 'Cursor_Color',
+    'bold': 'Bold_Color',
+    'selection': 'Selection_Color',
+}
+for _i, _name in enumerate(['black', 'red', 'green', 'yellow', 'blue', 'magenta', 'cyan', 'white']):
+    COLOR_ALIASES[_name] = f'Ansi_{_i}_Color'
+    COLOR_ALIASES[f'bright{_name}'] = f'Ansi_{_i + 8}_Color'
+
+def color_row(name):
+    """Resolve a color name, alias or ANSI number to its COLOR_NAMES row"""
+    if name.isdigit() and int(name) < 16:
+        name = f'Ansi_{name}_Color'
+    name = COLOR_ALIASES.get(name.lower(), name)
+    if name not in COLOR_NAMES:
+        raise ValueError(f"unknown color {name!r}")
+    return COLOR_NAMES.index(name)
+
+def embed(schemes):
+    """Embed (S, 23, 3) uint8 schemes as (S, 23, 3) weighted OKLab vectors"""
+    return rgb_to_oklab(schemes) * np.sqrt(WEIGHTS)[:, None]
+
+def library_schemes(lib):
+    """Decode every record of a SchemeLibrary into an (S, 23, 3) array"""
+    from schemelib import RECORD_SIZE, RGB_SIZE
+    records = np.frombuffer(lib.records(), dtype=np.uint8).reshape(-1, RECORD_SIZE)
+    schemes = records[:, :RGB_SIZE].reshape(-1, len(COLOR_NAMES), 3).copy()
+    mask = records[:, RGB_SIZE:].astype(np.uint32)
+    mask = mask[:, 0] | mask[:, 1] << 8 | mask[:, 2] << 16
+    for name, fallback in FALLBACKS.items():
+        row, source = COLOR_NAMES.index(name), COLOR_NAMES.index(fallback)
+        missing = (mask >> row & 1) == 0
+        schemes[missing, row] = schemes[missing, source]
+    return schemes
+
+class SchemeIndex:
+    """Precomputed embeddings of a scheme corpus for k-nearest-neighbor queries"""
+
+    def __init__(self, names, schemes):
+        self.names = list(names)
+        self.positions = {name: i for i, name in enumerate(self.names)}
+        self.schemes = np.asarray(schemes, dtype=np.uint8)
+        self.vectors = embed(self.schemes).reshape(len(self.names), -1)
+        self.norms = (self.vectors ** 2).sum(axis=1)
+
+    @classmethod
+    def from_paths(cls, paths):
+        """Index scheme files, directories and .palib libraries
+
+        A name is indexed once, from the first file or library that has it.
+        """
+        names, palettes, arrays = [], [], []
+        seen = set()
+        for path in paths:
+            if str(path).endswith('.palib'):
+                from schemelib import SchemeLibrary
+                # Keep arrays in the same order as names
+                arrays.append(stack_schemes(palettes))
+                palettes = []
+                with SchemeLibrary(path) as lib:
+                    keep = []
+                    for i, name in enumerate(lib.names()):
+                        if name not in seen:
+                            seen.add(name)
+                            keep.append(i)
+                            names.append(name)
+                    arrays.append(library_schemes(lib)[keep])
+                continue
+            for scheme in unique_schemes(find_schemes([path]), seen):
+                try:
+                    palettes.append(load_palette(scheme))
+                except Exception as e:
+                    print(f"! {scheme}: {e}", file=sys.stderr)
+                    continue
+                names.append(scheme_name(scheme))
+        arrays.append(stack_schemes(palettes))
+        return cls(names, np.concatenate(arrays))
+
+    def query(self, vector, k=10, columns=None, exclude=None):
+        """Return [(index, distance)] of the k schemes nearest to vector
+
+        columns restricts the distance to a subset of the flattened
+        embedding, for queries that only constrain a few colors.
+        """
+        vectors, norms = self.vectors, self.norms
+        if columns is not None:
+            vectors = vectors[:, columns]
+            norms = (vectors ** 2).sum(axis=1)
+            vector = vector[columns]
+        dist = norms - 2.0 * (vectors @ vector) + vector @ vector
+        if exclude is not None:
+            dist[exclude] = np.inf
+        k = min(k, int(np.isfinite(dist).sum()))
+        if k <= 0:
+            return []
+        nearest = np.argpartition(dist, k - 1)[:k]
+        nearest = nearest[np.argsort(dist[nearest], kind='stable')]
+        return [(int(i), float(np.sqrt(max(dist[i], 0.0)))) for i in nearest]
+
+    def like(self, scheme, k=10):
+        """Schemes closest to a (23, 3) scheme array, or to a corpus scheme name"""
+        exclude = None
+        if isinstance(scheme, str):
+            vector = self.vectors[self.positions[scheme]]
+            exclude = [i for i, name in enumerate(self.names) if name == scheme]
+        else:
+            vector = embed(np.asarray(scheme, dtype=np.uint8)[None])[0].ravel()
+        return self.query(vector, k, exclude=exclude)
+
+    def near(self, constraints, k=10):
+        """Schemes whose given colors are closest to {color row: '#rrggbb'}"""
+        rows = sorted(constraints)
+        target = np.zeros((len(COLOR_NAMES), 3), dtype=np.uint8)
+        target[rows] = hex_to_rgb([constraints[row] for row in rows])
+        vector = embed(target[None])[0].ravel()
+        columns = np.concatenate([np.arange(3 * row, 3 * row + 3) for row in rows])
+        return self.query(vector, k, columns=columns)
+
+def parse_constraint(text):
+    """Parse a --near argument such as 'bg=#000000' or 'red=#ff0000'"""
+    name, _, value = text.partition('=')
+    if not value:
+        raise argparse.ArgumentTypeError(f"expected COLOR=#rrggbb, got {text!r}")
+    try:
+        hex_to_rgb(value)
+        return color_row(name), value
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='+',
+                        help=".xrdb/.itermcolors/.pal files, directories or .palib libraries")
+    parser.add_argument('--like', metavar='SCHEME',
+                        help="scheme name in the corpus, or a scheme file, to compare against")
+    parser.add_argument('--near', metavar='COLOR=#rrggbb', type=parse_constraint,
+                        action='append', default=[],
+                        help="color constraint (bg, fg, cursor, selection, red, 1, "
+                             "Ansi_1_Color, ...); may be repeated")
+    parser.add_argument('-k', type=int, default=10, help="number of results (default: 10)")
+    parser.add_argument('--json', action='store_true', help="emit machine-readable results")
+    args = parser.parse_args()
+
+    if not args.like and not args.near:
+        parser.error("one of --like or --near is required")
+
+    index = SchemeIndex.from_paths(args.paths)
+    if not index.names:
+        print("No schemes found", file=sys.stderr)
+        sys.exit(1)
+
+    if args.near:
+        results = index.near(dict(args.near), args.k)
+    elif args.like in index.positions:
+        results = index.like(args.like, args.k)
+    else:
+        try:
+            scheme = stack_schemes([load_palette(args.like)])[0]
+        except OSError as e:
+            print(f"Error: {args.like!r} is neither a scheme in the corpus nor a file: {e}",
+                  file=sys.stderr)
+            sys.exit(1)
+        results = index.like(scheme, args.k)
+
+    if args.json:
+        print(json.dumps([{'scheme': index.names[i], 'distance': round(d, 4)}
+                          for i, d in results], indent=4))
+    else:
+        print(f"{'rank':>4}  {'dist':>6}  scheme")
+        for position, (i, d) in enumerate(results, 1):
+            print(f"{position:>4}  {d:6.3f}  {index.names[i]}")
+
+if __name__ == '__main__':
+    main()
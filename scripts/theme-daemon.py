@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""Watch the system appearance and push the matching palette to terminals
+
+Replaces the 30-second polling loop of theme-watcher.sh with a single
+long-lived process. Appearance changes are picked up from the desktop's
+settings files via inotify (Linux), from the xdg-desktop-portal D-Bus
+signal when dbus-monitor is available, or from cheap mtime polling
+elsewhere. The new palette is written straight to every registered tty,
+or with --fade cross-faded in over a series of diffed OSC frames.
+"""
+
+import configparser
+import ctypes
+import os
+import plistlib
+import select
+import shutil
+import signal
+import stat
+import struct
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from palette import parse_xrdb, to_osc
+from transition import DEFAULT_DURATION, DEFAULT_FRAMES, play, transition
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SCRIPT_DIR)
+
+THEME_FILES = {
+    'dark': os.path.join(ROOT_DIR, 'ManfredTouron.xrdb'),
+    'light': os.path.join(ROOT_DIR, 'ManfredTouron-Light.xrdb'),
+}
+
+# Terminals register themselves by dropping a file here (see 'register')
+REGISTRY_DIR = os.path.join(os.environ.get('XDG_RUNTIME_DIR') or '/tmp',
+                            f'colorscheme-ttys-{os.getuid()}')
+
+HOME = Path.home()
+GNOME_DCONF = HOME / '.config' / 'dconf' / 'user'
+KDE_GLOBALS = HOME / '.config' / 'kdeglobals'
+MACOS_PREFS = HOME / 'Library' / 'Preferences' / '.GlobalPreferences.plist'
+
+# Fallback polling interval when no event source is available, in seconds
+POLL_INTERVAL = 1.0
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+INOTIFY_EVENT = struct.Struct('iIII')
+
+def log(message):
+    """Print a timestamped status line"""
+    print(f"[{time.strftime('%H:%M:%S')}] {message}", flush=True)
+
+def time_based_theme(now=None):
+    """Dark theme from 6 PM to 6 AM"""
+    hour = (now or time.localtime()).tm_hour
+    return 'dark' if hour >= 18 or hour < 6 else 'light'
+
+def seconds_until_time_switch(now=None):
+    """Seconds until the next 6 AM / 6 PM boundary"""
+    now = now or time.localtime()
+    elapsed = now.tm_hour * 3600 + now.tm_min * 60 + now.tm_sec
+    for boundary in (6 * 3600, 18 * 3600, 30 * 3600):
+        if boundary > elapsed:
+            return boundary - elapsed
+    return 60
+
+def detect_kde():
+    """Read the KDE color scheme straight from kdeglobals"""
+    config = configparser.ConfigParser(interpolation=None, strict=False)
+    try:
+        config.read(KDE_GLOBALS)
+    except configparser.Error:
+        return None
+    scheme = config.get('General', 'ColorScheme', fallback=None)
+    if scheme is None:
+        return None
+    return 'dark' if 'dark' in scheme.lower() else 'light'
+
+def detect_gnome():
+    """Ask GNOME for its color scheme (one fork, only when something changed)"""
+    for key in ('color-scheme', 'gtk-theme'):
+        try:
+            result = subprocess.run(['gsettings', 'get', 'org.gnome.desktop.interface', key],
+                                    capture_output=True, text=True, timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        value = result.stdout.strip().strip("'")
+        if result.returncode == 0 and value and value != 'default':
+            return 'dark' if 'dark' in value.lower() else 'light'
+    return None
+
+def detect_macos():
+    """Read AppleInterfaceStyle from the global preferences plist"""
+    try:
+        with open(MACOS_PREFS, 'rb') as f:
+            prefs = plistlib.load(f)
+    except (OSError, plistlib.InvalidFileException):
+        return None
+    return 'dark' if prefs.get('AppleInterfaceStyle') == 'Dark' else 'light'
+
+class AppearanceSource:
+    """The platform's appearance setting and the files that change with it"""
+
+    def __init__(self):
+        if sys.platform == 'darwin':
+            self.name, self.detect, self.paths = 'macOS', detect_macos, [MACOS_PREFS]
+        elif KDE_GLOBALS.exists() and os.environ.get('XDG_CURRENT_DESKTOP', '').upper() == 'KDE':
+            self.name, self.detect, self.paths = 'KDE', detect_kde, [KDE_GLOBALS]
+        elif shutil.which('gsettings'):
+            self.name, self.detect, self.paths = 'GNOME', detect_gnome, [GNOME_DCONF]
+        else:
+            self.name, self.detect, self.paths = 'time', None, []
+
+    def theme(self):
+        """Return 'dark' or 'light', falling back to the time of day"""
+        mode = self.detect() if self.detect else None
+        return mode or time_based_theme()
+
+class SignalWakeup:
+    """Wake the select() loop when a signal arrives, so handlers only set flags"""
+
+    def __init__(self):
+        self.fd, write_fd = os.pipe()
+        os.set_blocking(self.fd, False)
+        os.set_blocking(write_fd, False)
+        signal.set_wakeup_fd(write_fd)
+
+    def fileno(self):
+        return self.fd
+
+    def changed(self):
+        """Drain the pipe; a signal alone never means the appearance changed"""
+        try:
+            os.read(self.fd, 4096)
+        except BlockingIOError:
+            pass
+        return False
+
+class Inotify:
+    """Minimal ctypes binding to inotify for watching settings files"""
+
+    def __init__(self, paths):
+        libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # Watch parent directories: settings files are usually replaced atomically
+        self.names = {}
+        for path in paths:
+            path = Path(path)
+            if not path.parent.is_dir():
+                continue
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(path.parent),
+                                        IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE)
+            if wd >= 0:
+                self.names.setdefault(wd, set()).add(path.name)
+        if not self.names:
+            os.close(self.fd)
+            raise OSError("no watchable settings directory")
+
+    def fileno(self):
+        return self.fd
+
+    def changed(self):
+        """Drain pending events, returning True if a watched file changed"""
+        hit = False
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = INOTIFY_EVENT.unpack_from(data, offset)
+            name = data[offset + INOTIFY_EVENT.size:offset + INOTIFY_EVENT.size + length]
+            name = os.fsdecode(name.rstrip(b'\0'))
+            if name in self.names.get(wd, ()):
+                hit = True
+            offset += INOTIFY_EVENT.size + length
+        return hit
+
+class PortalMonitor:
+    """Follow xdg-desktop-portal SettingChanged signals through one dbus-monitor"""
+
+    def __init__(self):
+        self.proc = subprocess.Popen(
+            ['dbus-monitor', '--session',
+             "type='signal',interface='org.freedesktop.portal.Settings',member='SettingChanged'"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        os.set_blocking(self.proc.stdout.fileno(), False)
+        self.buffer = b''
+
+    def fileno(self):
+        return self.proc.stdout.fileno()
+
+    def changed(self):
+        """Consume monitor output, returning True on a color-scheme change"""
+        try:
+            chunk = os.read(self.fileno(), 64 * 1024)
+        except BlockingIOError:
+            return False
+        if not chunk:
+            raise EOFError("dbus-monitor exited")
+        self.buffer = (self.buffer + chunk)[-4096:]
+        if b'color-scheme' in self.buffer:
+            self.buffer = b''
+            return True
+        return False
+
+class MtimePoller:
+    """Fallback watcher that stats settings files without forking"""
+
+    def __init__(self, paths):
+        self.paths = paths
+        self.mtimes = self.snapshot()
+
+    def snapshot(self):
+        mtimes = []
+        for path in self.paths:
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return mtimes
+
+    def changed(self):
+        mtimes = self.snapshot()
+        if mtimes != self.mtimes:
+            self.mtimes = mtimes
+            return True
+        return False
+
+def load_palettes():
+    """Parse each theme's xrdb palette"""
+    return {theme: parse_xrdb(xrdb_file) for theme, xrdb_file in THEME_FILES.items()
+            if os.path.exists(xrdb_file)}
+
+def load_payloads():
+    """Load each theme's precompiled OSC payload, rendering it if missing"""
+    payloads = {}
+    for theme, xrdb_file in THEME_FILES.items():
+        osc_file = xrdb_file[:-len('.xrdb')] + '.osc'
+        if os.path.exists(osc_file):
+            with open(osc_file, 'rb') as f:
+                payloads[theme] = f.read()
+        elif os.path.exists(xrdb_file):
+            payloads[theme] = to_osc(parse_xrdb(xrdb_file)).encode()
+    return payloads
+
+def check_registry():
+    """Raise PermissionError unless REGISTRY_DIR is a private directory of this user
+
+    Under /tmp its name is predictable: a directory someone else created
+    first would let them plant entries for the daemon to write to.
+    """
+    st = os.lstat(REGISTRY_DIR)
+    if (not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid()
+            or stat.S_IMODE(st.st_mode) != 0o700):
+        raise PermissionError(f"{REGISTRY_DIR} is not a mode 0700 directory owned by this user")
+
+def registered_ttys():
+    """Return the ttys registered with the daemon"""
+    try:
+        check_registry()
+        entries = os.listdir(REGISTRY_DIR)
+    except FileNotFoundError:
+        return []
+    except PermissionError as e:
+        log(f"Ignoring registered terminals: {e}")
+        return []
+    return ['/dev/' + entry.replace('%', '/') for entry in entries]
+
+def register(tty=None):
+    """Register a tty (default: the current one) to receive theme changes"""
+    tty = tty or os.ttyname(sys.stdin.fileno())
+    try:
+        os.mkdir(REGISTRY_DIR, 0o700)
+    except FileExistsError:
+        pass
+    try:
+        check_registry()
+    except PermissionError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    entry = os.path.relpath(tty, '/dev').replace('/', '%')
+    Path(REGISTRY_DIR, entry).touch()
+    print(f"Registered {tty}")
+
+def unregister(tty):
+    """Drop a tty's registration"""
+    entry = os.path.relpath(tty, '/dev').replace('/', '%')
+    try:
+        os.unlink(os.path.join(REGISTRY_DIR, entry))
+    except OSError:
+        pass
+
+def open_tty(tty):
+    """Open a registered tty for writing, dropping its registration if it is gone"""
+    try:
+        return os.open(tty, os.O_WRONLY | os.O_NOCTTY | os.O_NONBLOCK)
+    except OSError:
+        # Terminal is gone: drop its registration
+        unregister(tty)
+        return None
+
+def push(payloads, ttys, duration=0.0):
+    """Write each payload frame to every tty, opening each tty once
+
+    The ttys are non-blocking, so the daemon is never stuck behind one
+    terminal: play() waits out a full tty for a moment and then gives up
+    on it. A tty whose write fails outright (hung up) is unregistered.
+    """
+    opened = {}
+    for tty in ttys:
+        fd = open_tty(tty)
+        if fd is not None:
+            opened[fd] = tty
+    try:
+        failed = play(payloads, list(opened), duration)
+    finally:
+        for fd in opened:
+            os.close(fd)
+    for fd, error in failed.items():
+        # A terminal that is only slow to read keeps its registration
+        if not isinstance(error, TimeoutError):
+            unregister(opened[fd])
+
+def run(extra_ttys, fade_frames=0):
+    """Apply the current theme, then follow appearance changes forever"""
+    payloads = load_payloads()
+    palettes = load_palettes() if fade_frames else {}
+    # Fade frames by (from, to) theme, computed on first use
+    fades = {}
+    if not payloads:
+        print("Error: no theme .xrdb files found. Run 'make' first.", file=sys.stderr)
+        sys.exit(1)
+
+    source = AppearanceSource()
+    watchers = []
+    if source.name == 'GNOME' and shutil.which('dbus-monitor'):
+        watchers.append(PortalMonitor())
+    if source.paths and sys.platform.startswith('linux'):
+        try:
+            watchers.append(Inotify(source.paths))
+        except OSError:
+            pass
+    poller = None
+    if source.paths and not watchers:
+        poller = MtimePoller(source.paths)
+
+    def ttys():
+        found = registered_ttys() + list(extra_ttys)
+        if not found and sys.stdout.isatty():
+            found = [os.ttyname(sys.stdout.fileno())]
+        return found
+
+    def frames(theme, previous):
+        if previous is None or previous == theme or not {theme, previous} <= palettes.keys():
+            return [payloads[theme]], 0.0
+        if (previous, theme) not in fades:
+            fades[previous, theme] = transition(palettes[previous], palettes[theme], fade_frames)
+        return fades[previous, theme], DEFAULT_DURATION
+
+    def apply(theme, reason, previous=None):
+        if theme not in payloads:
+            return
+        targets = ttys()
+        frame_payloads, duration = frames(theme, previous)
+        push(frame_payloads, targets, duration)
+        log(f"{reason}: applied {theme} theme to {len(targets)} terminal(s)")
+
+    def reload():
+        payloads.update(load_payloads())
+        if fade_frames:
+            palettes.update(load_palettes())
+            fades.clear()
+        apply(current, "Reloaded")
+
+    # SIGHUP only sets a flag: reloading from the handler could interrupt a push
+    reload_requested = False
+
+    def request_reload(signum, frame):
+        nonlocal reload_requested
+        reload_requested = True
+
+    current = source.theme()
+    apply(current, f"Initial theme ({source.name})")
+    watchers.append(SignalWakeup())
+    signal.signal(signal.SIGHUP, request_reload)
+
+    switch_at = time.monotonic() + seconds_until_time_switch()
+    while True:
+        timeout = max(0.0, switch_at - time.monotonic())
+        if poller:
+            timeout = min(timeout, POLL_INTERVAL)
+        try:
+            ready, _, _ = select.select(watchers, [], [], timeout)
+        except InterruptedError:
+            continue
+        changed = False
+        for watcher in ready:
+            try:
+                changed = watcher.changed() or changed
+            except EOFError:
+                watchers.remove(watcher)
+                poller = poller or MtimePoller(source.paths)
+        if poller and poller.changed():
+            changed = True
+        if time.monotonic() >= switch_at:
+            # Re-check at 6 AM / 6 PM in case detection falls back to the clock
+            switch_at = time.monotonic() + seconds_until_time_switch()
+            changed = True
+        if reload_requested:
+            reload_requested = False
+            reload()
+        if not changed:
+            continue
+        theme = source.theme()
+        if theme != current:
+            previous, current = current, theme
+            apply(theme, "Theme changed", previous)
+
+def main():
+    args = sys.argv[1:]
+    fade_frames = 0
+    if args and args[0] == '--fade':
+        fade_frames = DEFAULT_FRAMES
+        args = args[1:]
+        if args and args[0].isdigit():
+            fade_frames = max(1, int(args.pop(0)))
+    if args and args[0] == 'register':
+        register(args[1] if len(args) > 1 else None)
+        return
+    if args and args[0] in ('-h', '--help'):
+        print("Usage: theme-daemon.py [--fade [frames]] [tty ...]", file=sys.stderr)
+        print("       theme-daemon.py register [tty]", file=sys.stderr)
+        sys.exit(1)
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        run(args, fade_frames)
+    except KeyboardInterrupt:
+        pass
+    log("Theme daemon stopped.")
+
+if __name__ == '__main__':
+    main()
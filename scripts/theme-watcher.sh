@@ -77,6 +77,11 @@ watch_gnome_theme() {
 
 # Main execution
 main() {
+    # Prefer the event-driven Python daemon when available
+    if [ "${THEME_WATCHER_POLL:-0}" != "1" ] && command -v python3 &> /dev/null; then
+        exec python3 "$SCRIPT_DIR/theme-daemon.py" "$@"
+    fi
+    
     # Initial theme application
     initial_theme=$(check_theme)
     if [ -n "$initial_theme" ]; then
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""Cross-fade a terminal between two palettes with diffed OSC frames
+
+The palettes are interpolated in OKLab, so the fade passes through
+perceptually even steps instead of the muddy midpoints of sRGB blending.
+All frames are computed once up front, and each frame only carries the
+OSC entries whose color differs from the previous frame: colors that are
+identical in both themes are never resent, and colors that have already
+converged drop out of the remaining frames.
+
+Standard library only, so the theme daemon and apply-theme.sh can use it
+without NumPy.
+"""
+
+import argparse
+import errno
+import os
+import select
+import sys
+import time
+
+from palette import load_palette, to_osc
+
+# Default fade: 15 frames over half a second (30 fps)
+DEFAULT_FRAMES = 15
+DEFAULT_DURATION = 0.5
+
+# Seconds to wait for a terminal that stopped reading (paused with ^S, or
+# a non-blocking tty whose buffer is full) before giving up on it
+WRITE_TIMEOUT = 1.0
+
+# Linear sRGB <-> OKLab (Björn Ottosson, 2020); see colorspace.py for the NumPy version
+RGB_TO_LMS = (
+    (0.4122214708, 0.5363325363, 0.0514459929),
+    (0.2119034982, 0.6806995451, 0.1073969566),
+    (0.0883024619, 0.2817188376, 0.6299787005),
+)
+LMS_TO_OKLAB = (
+    (0.2104542553, 0.7936177850, -0.0040720468),
+    (1.9779984951, -2.4285922050, 0.4505937099),
+    (0.0259040371, 0.7827717662, -0.8086757660),
+)
+OKLAB_TO_LMS = (
+    (1.0, 0.3963377774, 0.2158037573),
+    (1.0, -0.1055613458, -0.0638541728),
+    (1.0, -0.0894841775, -1.2914855480),
+)
+LMS_TO_RGB = (
+    (4.0767416621, -3.3077115913, 0.2309699292),
+    (-1.2684380046, 2.6097574011, -0.3413193965),
+    (-0.0041960863, -0.7034186147, 1.7076147010),
+)
+
+def mat_vec(matrix, vector):
+    return tuple(sum(m * v for m, v in zip(row, vector)) for row in matrix)
+
+def hex_to_oklab(value):
+    """Convert '#rrggbb' to an OKLab (L, a, b) tuple"""
+    rgb = bytes.fromhex(value.lstrip('#'))
+    linear = [c / 255 / 12.92 if c <= 10 else ((c / 255 + 0.055) / 1.055) ** 2.4 for c in rgb]
+    lms = mat_vec(RGB_TO_LMS, linear)
+    return mat_vec(LMS_TO_OKLAB, [c ** (1 / 3) for c in lms])
+
+def oklab_to_hex(lab):
+    """Convert OKLab to '#rrggbb', clipping to the sRGB cube"""
+    lms = [c ** 3 for c in mat_vec(OKLAB_TO_LMS, lab)]
+    out = []
+    for c in mat_vec(LMS_TO_RGB, lms):
+        c = min(max(c, 0.0), 1.0)
+        c = c * 12.92 if c <= 0.0031308 else 1.055 * c ** (1 / 2.4) - 0.055
+        out.append(round(c * 255))
+    return '#{:02x}{:02x}{:02x}'.format(*out)
+
+def ease(t):
+    """Smoothstep easing: slow start and end, no overshoot"""
+    return t * t * (3 - 2 * t)
+
+def fade_palettes(start, end, frames=DEFAULT_FRAMES):
+    """Return the palettes of frames 1..frames fading start into end
+
+    Colors missing from either palette snap to end on the first frame.
+    The last frame is end itself, so the fade lands exactly on the theme.
+    """
+    pairs = {name: (hex_to_oklab(start[name]), hex_to_oklab(value))
+             for name, value in end.items() if name in start and start[name] != value}
+    palettes = []
+    for frame in range(1, frames):
+        t = ease(frame / frames)
+        palette = dict(end)
+        for name, (a, b) in pairs.items():
+            palette[name] = oklab_to_hex([x + (y - x) * t for x, y in zip(a, b)])
+        palettes.append(palette)
+    palettes.append(dict(end))
+    return palettes
+
+def frame_payloads(start, palettes):
+    """OSC payloads sending only the colors that changed since the previous frame
+
+    Frames where nothing changed are dropped.
+    """
+    payloads = []
+    previous = start
+    for palette in palettes:
+        changed = {name: value for name, value in palette.items() if previous.get(name) != value}
+        if changed:
+            payloads.append(to_osc(changed).encode())
+        previous = palette
+    return payloads
+
+def transition(start, end, frames=DEFAULT_FRAMES):
+    """Precompute the diffed OSC frames of a fade from start to end"""
+    return frame_payloads(start, fade_palettes(start, end, frames))
+
+def write_all(fd, data, timeout=WRITE_TIMEOUT):
+    """os.write until all of data is written, waiting while a non-blocking fd is full
+
+    Raises TimeoutError if fd does not become writable within timeout seconds.
+    """
+    view = memoryview(data)
+    while view:
+        try:
+            view = view[os.write(fd, view):]
+        except BlockingIOError:
+            if not select.select([], [fd], [], timeout)[1]:
+                raise TimeoutError(errno.ETIMEDOUT, "terminal is not reading") from None
+
+def play(payloads, fds, duration=DEFAULT_DURATION):
+    """Write frames to every fd, paced evenly over duration seconds
+
+    A frame is never skipped or cut short, since later frames only carry
+    the colors that changed; a slow terminal makes the fade longer, not
+    wrong. An fd whose write fails gets no further frames. Returns
+    {fd: OSError} for the fds dropped that way.
+    """
+    failed = {}
+    if not payloads:
+        return failed
+    fds = list(fds)
+    interval = duration / len(payloads)
+    deadline = time.monotonic()
+    for payload in payloads:
+        for fd in list(fds):
+            try:
+                write_all(fd, payload)
+            except OSError as e:
+                fds.remove(fd)
+                failed[fd] = e
+        deadline += interval
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+    return failed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('start', help="scheme currently applied (.xrdb/.itermcolors/.pal)")
+    parser.add_argument('end', help="scheme to fade to")
+    parser.add_argument('ttys', nargs='*', help="terminals to write to (default: stdout)")
+    parser.add_argument('-n', '--frames', type=int, default=DEFAULT_FRAMES,
+                        help=f"number of frames (default: {DEFAULT_FRAMES})")
+    parser.add_argument('-d', '--duration', type=float, default=DEFAULT_DURATION,
+                        help=f"length of the fade in seconds (default: {DEFAULT_DURATION})")
+    args = parser.parse_args()
+    if args.frames < 1:
+        parser.error("--frames must be at least 1")
+
+    payloads = transition(load_palette(args.start), load_palette(args.end), args.frames)
+    if not args.ttys:
+        play(payloads, [sys.stdout.fileno()], args.duration)
+        return
+    fds = []
+    for tty in args.ttys:
+        try:
+            fds.append(os.open(tty, os.O_WRONLY | os.O_NOCTTY))
+        except OSError as e:
+            print(f"Skipping {tty}: {e.strerror}", file=sys.stderr)
+    try:
+        play(payloads, fds, args.duration)
+    finally:
+        for fd in fds:
+            os.close(fd)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""Derive light or dark counterparts of color schemes
+
+Neutral colors (background, foreground, cursor, selection and the gray
+ANSI slots 0, 7, 8 and 15) have their OKLab lightness inverted. Chromatic
+ANSI colors keep their lightness, hue and chroma where possible and are
+only darkened (or lightened) as far as needed to reach the target WCAG
+contrast against the new background. Every step runs on the whole
+(S, 23, 3) stack at once, so a catalog converts in one pass.
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from colorspace import (BACKGROUND, BOLD, CURSOR, CURSOR_TEXT, FOREGROUND, SELECTED_TEXT,
+                        SELECTION, oklab_to_linear, oklab_to_oklch, oklab_to_rgb,
+                        oklch_to_oklab, relative_luminance, rgb_to_oklab, scheme_colors,
+                        stack_schemes)
+from palette import find_schemes, load_palette, scheme_name, to_xrdb, unique_schemes
+
+# Rows whose lightness flips with the background
+NEUTRAL_ROWS = [0, 7, 8, 15, BACKGROUND, FOREGROUND, CURSOR, CURSOR_TEXT, BOLD,
+                SELECTION, SELECTED_TEXT]
+# ANSI colors that keep their lightness unless contrast requires otherwise
+CHROMATIC_ROWS = [1, 2, 3, 4, 5, 6, 9, 10, 11, 12, 13, 14]
+# Rows used as body text, held to the stricter contrast target
+TEXT_ROWS = [FOREGROUND, BOLD, SELECTED_TEXT]
+
+# Bisection steps for lightness and gamut searches (2^-20 in OKLab L)
+STEPS = 20
+
+def gamut_map(lch):
+    """Reduce chroma at fixed lightness and hue until colors fit in sRGB"""
+    fits = in_gamut(oklch_to_oklab(lch))
+    if fits.all():
+        return lch
+    # Only search the out-of-gamut colors
+    outside = lch[~fits]
+    lo = np.zeros(len(outside))
+    hi = np.ones(len(outside))
+    for _ in range(STEPS):
+        mid = (lo + hi) / 2
+        ok = in_gamut(oklch_to_oklab(with_chroma(outside, outside[:, 1] * mid)))
+        lo = np.where(ok, mid, lo)
+        hi = np.where(ok, hi, mid)
+    lch = lch.copy()
+    lch[~fits] = with_chroma(outside, outside[:, 1] * lo)
+    return lch
+
+def in_gamut(lab, eps=1e-6):
+    """True where an OKLab color is inside the sRGB cube"""
+    linear = oklab_to_linear(lab)
+    return ((linear >= -eps) & (linear <= 1 + eps)).all(axis=-1)
+
+def with_chroma(lch, chroma):
+    return np.stack([lch[..., 0], chroma, lch[..., 2]], axis=-1)
+
+def with_lightness(lch, lightness):
+    return np.stack([lightness, lch[..., 1], lch[..., 2]], axis=-1)
+
+def lch_to_rgb(lch):
+    """Gamut-map OKLCh colors and convert them to uint8 sRGB"""
+    return oklab_to_rgb(oklch_to_oklab(gamut_map(lch)))
+
+def contrast(y1, y2):
+    """WCAG contrast ratio between two relative luminances"""
+    return (np.maximum(y1, y2) + 0.05) / (np.minimum(y1, y2) + 0.05)
+
+def fit_contrast(lch, bg_y, target, light_bg):
+    """Move lightness away from the background just enough to reach target
+
+    lch has shape (S, K, 3); bg_y (S,) and light_bg (S,) describe each
+    scheme's background. Colors already meeting target are unchanged.
+    """
+    bg_y = np.broadcast_to(bg_y[:, None], lch.shape[:-1])
+    light_bg = np.broadcast_to(light_bg[:, None], lch.shape[:-1])
+    y = relative_luminance(lch_to_rgb(lch))
+    failing = contrast(y, bg_y) < target
+    if not failing.any():
+        return lch
+    # Search the failing colors between their lightness and black or white
+    colors, bg_y = lch[failing], bg_y[failing]
+    lo = colors[:, 0]
+    hi = np.where(light_bg[failing], 0.0, 1.0)
+    for _ in range(STEPS):
+        mid = (lo + hi) / 2
+        y = relative_luminance(lch_to_rgb(with_lightness(colors, mid)))
+        passes = contrast(y, bg_y) >= target
+        hi = np.where(passes, mid, hi)
+        lo = np.where(passes, lo, mid)
+    lch = lch.copy()
+    lch[failing] = with_lightness(colors, hi)
+    return lch
+
+def derive(schemes, mode='auto', text_contrast=4.5, ansi_contrast=3.0):
+    """Derive counterparts of an (S, 23, 3) uint8 stack of schemes
+
+    mode is 'light', 'dark' or 'auto' (the opposite of each scheme's
+    background). Returns the derived (S, 23, 3) uint8 stack.
+    """
+    schemes = np.asarray(schemes, dtype=np.uint8)
+    lch = oklab_to_oklch(rgb_to_oklab(schemes))
+    dark_bg = lch[:, BACKGROUND, 0] < 0.5
+    if mode == 'auto':
+        light_bg = dark_bg
+    else:
+        light_bg = np.full(len(schemes), mode == 'light')
+    flip = light_bg == dark_bg
+
+    lightness = lch[..., 0].copy()
+    lightness[:, NEUTRAL_ROWS] = np.where(flip[:, None], 1.0 - lightness[:, NEUTRAL_ROWS],
+                                          lightness[:, NEUTRAL_ROWS])
+    lch = gamut_map(with_lightness(lch, np.clip(lightness, 0.0, 1.0)))
+
+    bg_y = relative_luminance(lch_to_rgb(lch[:, BACKGROUND]))
+    lch[:, TEXT_ROWS] = fit_contrast(lch[:, TEXT_ROWS], bg_y, text_contrast, light_bg)
+    lch[:, CHROMATIC_ROWS] = fit_contrast(lch[:, CHROMATIC_ROWS], bg_y, ansi_contrast, light_bg)
+    return lch_to_rgb(lch)
+
+def variant_name(name, light):
+    """ManfredTouron -> ManfredTouron-Light, ManfredTouron-Light -> ManfredTouron-Dark"""
+    for suffix in ('-Light', '-Dark'):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    return f"{name}-Light" if light else f"{name}-Dark"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='+', help=".xrdb/.itermcolors/.pal files or directories")
+    parser.add_argument('--mode', choices=('auto', 'light', 'dark'), default='auto',
+                        help="variant to derive (default: opposite of each scheme)")
+    parser.add_argument('--contrast', type=float, default=4.5,
+                        help="minimum WCAG ratio of foreground text (default: 4.5)")
+    parser.add_argument('--ansi-contrast', type=float, default=3.0,
+                        help="minimum WCAG ratio of ANSI colors (default: 3.0)")
+    parser.add_argument('-o', '--output-dir',
+                        help="write <name>-Light/-Dark.xrdb files here "
+                             "(default: stdout, each scheme after a '! <name>' comment line)")
+    args = parser.parse_args()
+
+    files = unique_schemes(find_schemes(args.paths))
+    names, palettes = [], []
+    for path in files:
+        try:
+            palettes.append(load_palette(path))
+            names.append(scheme_name(path))
+        except Exception as e:
+            print(f"! {path}: {e}", file=sys.stderr)
+    if not palettes:
+        print("No schemes found", file=sys.stderr)
+        sys.exit(1)
+
+    schemes = stack_schemes(palettes)
+    derived = derive(schemes, args.mode, args.contrast, args.ansi_contrast)
+    light = relative_luminance(derived[:, BACKGROUND]) > relative_luminance(derived[:, FOREGROUND])
+
+    if not args.output_dir:
+        for name, array, is_light in zip(names, derived, light):
+            if len(names) > 1:
+                # An xrdb comment line, skipped by parse_xrdb, separates the schemes
+                print(f"! {variant_name(name, is_light)}")
+            print(to_xrdb(scheme_colors(array)), end="")
+        return
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for name, array, is_light in zip(names, derived, light):
+        output_file = os.path.join(args.output_dir, f"{variant_name(name, is_light)}.xrdb")
+        with open(output_file, 'w') as f:
+            f.write(to_xrdb(scheme_colors(array)))
+    print(f"Derived {len(names)} schemes into {args.output_dir}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
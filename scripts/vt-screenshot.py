@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Screenshot terminal output by running it through a virtual terminal
+
+The capture is executed on a vt.Screen, so programs that move the
+cursor, erase, redraw lines with carriage returns or use the alternate
+screen (progress bars, htop, vim) are drawn as a terminal would show
+them, not as the raw byte stream. Input is read in chunks and only the
+rows that changed are redrawn, which also makes it cheap to sample
+intermediate frames of long captures with --every.
+"""
+
+import argparse
+import codecs
+import os
+import sys
+
+from palette import load_palette
+from preview import SCREEN_HISTORY, ScreenImage, runs_to_image
+from vt import Screen, parse_size
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_THEME = os.path.join(os.path.dirname(SCRIPT_DIR), 'ManfredTouron.xrdb')
+
+CHUNK_SIZE = 1 << 16
+
+def frame_path(output_file, n):
+    stem, ext = os.path.splitext(output_file)
+    return f"{stem}-{n:04d}{ext}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('input', nargs='?', default='-',
+                        help="captured terminal output (default: stdin)")
+    parser.add_argument('-o', '--output', default='screenshot.png', help="PNG to write")
+    parser.add_argument('-t', '--theme', default=DEFAULT_THEME,
+                        help=".xrdb/.itermcolors/.pal scheme (default: ManfredTouron.xrdb)")
+    parser.add_argument('-s', '--size', type=parse_size, default=(80, 24),
+                        help="screen size as COLSxROWS (default: 80x24)")
+    parser.add_argument('--title',
+                        help="render the whole session, scrollback included, under this title "
+                             "instead of the final screen")
+    parser.add_argument('--every', type=int, metavar='BYTES',
+                        help="also save a numbered frame each time BYTES of input were executed")
+    parser.add_argument('--raw', action='store_true',
+                        help="input is a raw tty recording: do not turn LF into CR LF")
+    args = parser.parse_args()
+
+    theme_colors = load_palette(args.theme)
+    cols, rows = args.size
+    screen = Screen(cols, rows, theme_colors, history=SCREEN_HISTORY if args.title else 0,
+                    onlcr=not args.raw)
+    image = ScreenImage(screen)
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    stream = sys.stdin.buffer if args.input == '-' else open(args.input, 'rb')
+    frames = 0
+    since_frame = 0
+    with stream:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            screen.feed(decoder.decode(chunk))
+            since_frame += len(chunk)
+            if args.every and since_frame >= args.every:
+                since_frame = 0
+                if image.update():
+                    frames += 1
+                    image.image.save(frame_path(args.output, frames), format='PNG')
+    screen.feed(decoder.decode(b'', final=True))
+
+    if args.title:
+        runs_to_image(screen.lines(), args.output, args.title, theme_colors)
+    else:
+        image.save(args.output)
+    print(f"Wrote {args.output}" + (f" and {frames} frames" if frames else ""), file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
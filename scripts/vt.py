@@ -0,0 +1,461 @@
+"""Headless VT100/xterm screen model for rendering captures of real TUIs
+
+A Screen is a fixed grid of cells (character plus (fg, bg, bold) style)
+driven by the escape sequences a terminal would execute: cursor
+addressing, erase, insert/delete, scroll regions, the alternate screen
+and SGR colors (through AnsiParser, so palettes and truecolor snapping
+behave exactly as in the plain renderer). Every change marks its row as
+damaged; take_damage() hands those rows to a renderer so only changed
+rows are redrawn between frames. Scrolling the whole screen is reported
+separately by take_scroll(), so scrolling output costs a pixel move plus
+the new rows rather than a redraw of every row.
+
+Lines scrolled off the top of the main screen can be kept as history,
+which lets plain scrolling output render in full like parse_lines does.
+Wide characters are drawn in a single cell.
+"""
+
+import argparse
+import itertools
+import re
+
+from ansi import MAX_PENDING, PARTIAL_RE, AnsiParser, theme_ansi_colors
+
+# OSC strings, CSI sequences, other escapes and C0 controls; text is in between
+VT_TOKEN_RE = re.compile(
+    r'\x1b(?:\][^\x1b\x07]*(?:\x1b\\|\x07)'
+    r'|\[([0-?]*)([ -/]*)([@-~])'
+    r'|([ -/]*)([0-~]))'
+    r'|[\x00-\x1a\x1c-\x1f\x7f]')
+
+TAB_WIDTH = 8
+
+def parse_size(value):
+    """Parse a COLSxROWS screen size (an argparse type)"""
+    try:
+        cols, rows = (int(n) for n in value.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected COLSxROWS, got {value!r}")
+    if cols < 1 or rows < 1:
+        raise argparse.ArgumentTypeError(f"empty screen size {value!r}")
+    return cols, rows
+
+class Screen:
+    """A cols x rows terminal screen with damage tracking
+
+    onlcr translates a bare line feed into CR+LF, as a tty does for
+    program output; replay raw recordings (asciicast) with onlcr=False.
+    history is the number of scrolled-off lines kept for lines().
+    """
+
+    def __init__(self, cols=80, rows=24, theme_colors=None, history=0, onlcr=True,
+                 color_index=None):
+        theme_colors = theme_colors or {}
+        self.cols = cols
+        self.rows = rows
+        self.onlcr = onlcr
+        self.max_history = history
+        self.history = []
+        self.default_fg = theme_colors.get('Foreground_Color', '#ffffff')
+        self.default_bg = theme_colors.get('Background_Color', '#000000')
+        self.sgr = AnsiParser(self.default_fg, self.default_bg,
+                              theme_ansi_colors(theme_colors), color_index)
+        self.default_style = (self.default_fg, self.default_bg, False)
+        self.pending = ''
+        self.reset()
+
+    def reset(self):
+        """Full reset (RIS): clear both screens, home the cursor, reset modes"""
+        self.sgr.reset()
+        self.chars, self.styles = self.blank_grid()
+        self.alternate = None
+        self.runs = [None] * self.rows
+        self.dirty = set(range(self.rows))
+        self.scrolled = 0
+        self.x = self.y = 0
+        self.wrap_pending = False
+        self.autowrap = True
+        self.cursor_visible = True
+        self.top, self.bottom = 0, self.rows - 1
+        self.saved = (0, 0, None)
+
+    def blank_grid(self):
+        style = self.default_style
+        return ([[' '] * self.cols for _ in range(self.rows)],
+                [[style] * self.cols for _ in range(self.rows)])
+
+    def erase_style(self):
+        """Style of erased cells: default foreground on the current background"""
+        bg = self.sgr.resolve(self.sgr.bg, self.default_bg)
+        return (self.default_fg, bg, False)
+
+    def damage(self, first, last=None):
+        """Mark rows first..last (inclusive) as changed"""
+        for row in range(first, (first if last is None else last) + 1):
+            self.dirty.add(row)
+            self.runs[row] = None
+
+    def take_damage(self):
+        """Return and clear the set of rows changed since the last call
+
+        Call take_scroll() first: the rows are relative to the screen
+        after that scroll has been applied.
+        """
+        dirty, self.dirty = self.dirty, set()
+        return dirty
+
+    def take_scroll(self):
+        """Return and clear the number of lines the whole screen scrolled up
+
+        (negative for down) since the last call. A renderer can move the
+        pixels it has by that much and redraw only the damaged rows; rows
+        moved by whole-screen scrolls are not marked as damaged.
+        """
+        scrolled, self.scrolled = self.scrolled, 0
+        return scrolled
+
+    def shift_damage(self, n):
+        """Record a whole-screen scroll by n lines (up if positive)"""
+        rows = self.rows
+        self.scrolled += n
+        self.dirty = {row - n for row in self.dirty if 0 <= row - n < rows}
+        if n > 0:
+            self.runs = self.runs[n:] + [None] * n
+            self.damage(rows - n, rows - 1)
+        else:
+            self.runs = [None] * -n + self.runs[:n]
+            self.damage(0, -n - 1)
+
+    # Text
+
+    def feed(self, text):
+        """Execute a chunk of terminal output
+
+        An escape sequence cut off at the end of the chunk is held back
+        and completed by the next call, as a terminal would.
+        """
+        if self.pending:
+            text = self.pending + text
+        match = PARTIAL_RE.search(text, max(0, len(text) - MAX_PENDING))
+        if match:
+            self.pending = text[match.start():]
+            text = text[:match.start()]
+        else:
+            self.pending = ''
+        pos = 0
+        for match in VT_TOKEN_RE.finditer(text):
+            start = match.start()
+            if start > pos:
+                self.draw(text[pos:start])
+            pos = match.end()
+            token = match.group(0)
+            if token[0] != '\x1b':
+                self.control(token)
+            elif match.group(3):
+                self.csi(match.group(1), match.group(2), match.group(3))
+            elif match.group(5):
+                self.escape(match.group(4), match.group(5))
+        if pos < len(text):
+            self.draw(text[pos:])
+
+    def draw(self, text):
+        """Write printable text at the cursor, wrapping at the right margin"""
+        style = self.sgr.current_style()
+        cols = self.cols
+        pos, end = 0, len(text)
+        while pos < end:
+            if self.wrap_pending:
+                self.wrap_pending = False
+                self.x = 0
+                self.index()
+            n = min(end - pos, cols - self.x)
+            row, x = self.y, self.x
+            self.chars[row][x:x + n] = text[pos:pos + n]
+            self.styles[row][x:x + n] = [style] * n
+            self.damage(row)
+            pos += n
+            if x + n < cols:
+                self.x = x + n
+            elif self.autowrap:
+                self.x = cols - 1
+                self.wrap_pending = True
+            else:
+                # Without autowrap the rest overwrites the last column
+                self.x = cols - 1
+                if pos < end:
+                    self.chars[row][-1] = text[end - 1]
+                pos = end
+
+    def control(self, char):
+        """Execute a C0 control character"""
+        if char in '\n\x0b\x0c':
+            if self.onlcr:
+                self.x = 0
+            self.index()
+        elif char == '\r':
+            self.x = 0
+        elif char == '\b':
+            self.x = max(0, min(self.x, self.cols - 1) - 1)
+        elif char == '\t':
+            self.x = min(self.cols - 1, (self.x // TAB_WIDTH + 1) * TAB_WIDTH)
+        else:
+            return
+        self.wrap_pending = False
+
+    def escape(self, intermediates, final):
+        """Execute a two-character escape sequence (ESC 7, ESC M, ...)"""
+        if intermediates:
+            return  # Character set designations
+        if final == '7':
+            self.save_cursor()
+        elif final == '8':
+            self.restore_cursor()
+        elif final == 'D':
+            self.index()
+        elif final == 'E':
+            self.x = 0
+            self.index()
+        elif final == 'M':
+            self.reverse_index()
+        elif final == 'c':
+            self.reset()
+
+    # Cursor and scrolling
+
+    def move(self, x, y):
+        self.x = min(max(x, 0), self.cols - 1)
+        self.y = min(max(y, 0), self.rows - 1)
+        self.wrap_pending = False
+
+    def index(self):
+        """Move down one line, scrolling at the bottom margin"""
+        if self.y == self.bottom:
+            self.scroll_up(1)
+        elif self.y < self.rows - 1:
+            self.y += 1
+
+    def reverse_index(self):
+        """Move up one line, scrolling down at the top margin"""
+        if self.y == self.top:
+            self.scroll_down(1)
+        elif self.y > 0:
+            self.y -= 1
+
+    def save_cursor(self):
+        self.saved = (self.x, self.y, (self.sgr.fg, self.sgr.bg, self.sgr.bold, self.sgr.reverse))
+
+    def restore_cursor(self):
+        x, y, attrs = self.saved
+        if attrs is not None:
+            self.sgr.fg, self.sgr.bg, self.sgr.bold, self.sgr.reverse = attrs
+            self.sgr.style = None
+        self.move(x, y)
+
+    def blank_rows(self, n):
+        style = self.erase_style()
+        return ([[' '] * self.cols for _ in range(n)],
+                [[style] * self.cols for _ in range(n)])
+
+    def scroll_up(self, n, top=None):
+        """Scroll rows top..bottom up by n, blanking the bottom rows"""
+        top = self.top if top is None else top
+        bottom = self.bottom
+        n = min(n, bottom - top + 1)
+        if top == 0 and self.alternate is None and self.max_history:
+            self.history += [self.row_runs(row) for row in range(n)]
+            del self.history[:-self.max_history]
+        chars, styles = self.blank_rows(n)
+        self.chars[top:bottom + 1] = self.chars[top + n:bottom + 1] + chars
+        self.styles[top:bottom + 1] = self.styles[top + n:bottom + 1] + styles
+        if top == 0 and bottom == self.rows - 1:
+            self.shift_damage(n)
+        else:
+            self.damage(top, bottom)
+
+    def scroll_down(self, n, top=None):
+        """Scroll rows top..bottom down by n, blanking the top rows"""
+        top = self.top if top is None else top
+        bottom = self.bottom
+        n = min(n, bottom - top + 1)
+        chars, styles = self.blank_rows(n)
+        self.chars[top:bottom + 1] = chars + self.chars[top:bottom + 1 - n]
+        self.styles[top:bottom + 1] = styles + self.styles[top:bottom + 1 - n]
+        if top == 0 and bottom == self.rows - 1:
+            self.shift_damage(-n)
+        else:
+            self.damage(top, bottom)
+
+    # Erase
+
+    def erase(self, row, start, end):
+        """Blank columns start..end-1 of a row"""
+        if start >= end:
+            return
+        self.chars[row][start:end] = [' '] * (end - start)
+        self.styles[row][start:end] = [self.erase_style()] * (end - start)
+        self.damage(row)
+
+    def erase_display(self, mode):
+        if mode == 0:
+            self.erase(self.y, self.x, self.cols)
+            for row in range(self.y + 1, self.rows):
+                self.erase(row, 0, self.cols)
+        elif mode == 1:
+            for row in range(self.y):
+                self.erase(row, 0, self.cols)
+            self.erase(self.y, 0, self.x + 1)
+        elif mode in (2, 3):
+            for row in range(self.rows):
+                self.erase(row, 0, self.cols)
+
+    def erase_line(self, mode):
+        if mode == 0:
+            self.erase(self.y, self.x, self.cols)
+        elif mode == 1:
+            self.erase(self.y, 0, self.x + 1)
+        elif mode == 2:
+            self.erase(self.y, 0, self.cols)
+
+    def shift_cells(self, n, insert):
+        """Insert (ICH) or delete (DCH) n cells at the cursor within its row"""
+        row, x = self.y, self.x
+        n = min(n, self.cols - x)
+        style = self.erase_style()
+        chars, styles = self.chars[row], self.styles[row]
+        if insert:
+            chars[x:] = [' '] * n + chars[x:self.cols - n]
+            styles[x:] = [style] * n + styles[x:self.cols - n]
+        else:
+            chars[x:] = chars[x + n:] + [' '] * n
+            styles[x:] = styles[x + n:] + [style] * n
+        self.damage(row)
+
+    def set_mode(self, params, private, enable):
+        for mode in params:
+            if not private:
+                continue
+            if mode == 7:
+                self.autowrap = enable
+            elif mode == 25:
+                self.cursor_visible = enable
+            elif mode in (47, 1047, 1049):
+                if mode == 1049 and enable:
+                    self.save_cursor()
+                self.switch_screen(enable)
+                if mode == 1049 and not enable:
+                    self.restore_cursor()
+
+    def switch_screen(self, alternate):
+        """Enter or leave the alternate screen, which starts out blank"""
+        if alternate == (self.alternate is not None):
+            return
+        if alternate:
+            self.alternate = (self.chars, self.styles)
+            self.chars, self.styles = self.blank_grid()
+        else:
+            self.chars, self.styles = self.alternate
+            self.alternate = None
+        self.damage(0, self.rows - 1)
+
+    def csi(self, params, intermediates, final):
+        """Execute a CSI sequence"""
+        if final == 'm':
+            if not intermediates and not params.startswith(('?', '>', '<', '=')):
+                self.sgr.apply_sgr(params)
+            return
+        private = params.startswith('?')
+        if intermediates or params[:1] in ('>', '<', '='):
+            return
+        try:
+            args = [int(p) if p else 0 for p in params.lstrip('?').split(';')]
+        except ValueError:
+            return
+        first = args[0] or 1
+        if final in 'hl':
+            self.set_mode(args, private, final == 'h')
+        elif final == 'H' or final == 'f':
+            row = args[0] or 1
+            col = (args[1] if len(args) > 1 else 0) or 1
+            self.move(col - 1, row - 1)
+        elif final == 'A':
+            self.move(self.x, max(self.y - first, self.top if self.y >= self.top else 0))
+        elif final == 'B':
+            self.move(self.x, min(self.y + first, self.bottom if self.y <= self.bottom else self.rows))
+        elif final == 'C':
+            self.move(self.x + first, self.y)
+        elif final == 'D':
+            self.move(min(self.x, self.cols - 1) - first, self.y)
+        elif final == 'E':
+            self.move(0, self.y + first)
+        elif final == 'F':
+            self.move(0, self.y - first)
+        elif final == 'G' or final == '`':
+            self.move(first - 1, self.y)
+        elif final == 'd':
+            self.move(self.x, first - 1)
+        elif final == 'J':
+            self.erase_display(args[0])
+        elif final == 'K':
+            self.erase_line(args[0])
+        elif final == 'X':
+            self.erase(self.y, self.x, min(self.cols, self.x + first))
+        elif final == '@':
+            self.shift_cells(first, insert=True)
+        elif final == 'P':
+            self.shift_cells(first, insert=False)
+        elif final == 'L':
+            if self.top <= self.y <= self.bottom:
+                self.scroll_down(first, top=self.y)
+                self.x = 0
+        elif final == 'M':
+            if self.top <= self.y <= self.bottom:
+                self.scroll_up(first, top=self.y)
+                self.x = 0
+        elif final == 'S':
+            self.scroll_up(first)
+        elif final == 'T' and len(args) == 1:
+            self.scroll_down(first)
+        elif final == 'r':
+            top = (args[0] or 1) - 1
+            bottom = ((args[1] if len(args) > 1 else 0) or self.rows) - 1
+            if top < bottom < self.rows:
+                self.top, self.bottom = top, bottom
+                self.move(0, 0)
+        elif final == 's' and not private:
+            self.save_cursor()
+        elif final == 'u' and not private:
+            self.restore_cursor()
+
+    # Output
+
+    def row_runs(self, row):
+        """The row as (text, fg, bg, bold) runs, without trailing blank cells"""
+        runs = self.runs[row]
+        if runs is None:
+            chars, styles = self.chars[row], self.styles[row]
+            end = self.cols
+            while end and chars[end - 1] == ' ' and styles[end - 1] == self.default_style:
+                end -= 1
+            runs = []
+            x = 0
+            for style, group in itertools.groupby(styles[:end]):
+                n = len(list(group))
+                runs.append((''.join(chars[x:x + n]),) + style)
+                x += n
+            self.runs[row] = runs
+        return runs
+
+    def lines(self, history=True, trim=True):
+        """Lines of runs for runs_to_image: history, then the screen rows
+
+        With trim, blank rows below the last written row are dropped.
+        """
+        rows = [self.row_runs(row) for row in range(self.rows)]
+        if trim:
+            while rows and not rows[-1]:
+                rows.pop()
+        return (self.history if history else []) + rows
+
+    def text(self):
+        """The screen contents as plain text, one line per row"""
+        return '\n'.join(''.join(chars).rstrip() for chars in self.chars)
@@ -2,9 +2,10 @@
 """Convert xrdb format to Kitty format"""
 
 import sys
-import os
 from pathlib import Path
 
+from palette import parse_xrdb, to_kitty
+
 def convert_xrdb_to_kitty(directory, theme_name="ManfredTouron"):
     """Convert xrdb files to Kitty format"""
     
@@ -15,30 +16,7 @@ def convert_xrdb_to_kitty(directory, theme_name="ManfredTouron"):
         print(f"# {xrdb_file} not found", file=sys.stderr)
         return
     
-    with open(xrdb_file, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if line.startswith("#define"):
-                parts = line.split(None, 2)
-                if len(parts) >= 3:
-                    color_name = parts[1]
-                    color_value = parts[2]
-                    
-                    # Convert to Kitty format
-                    if "Foreground_Color" in color_name:
-                        print(f"foreground {color_value}")
-                    elif "Background_Color" in color_name:
-                        print(f"background {color_value}")
-                    elif "Cursor_Color" in color_name:
-                        print(f"cursor {color_value}")
-                    elif "Selection_Color" in color_name:
-                        print(f"selection_background {color_value}")
-                    elif "Selected_Text_Color" in color_name:
-                        print(f"selection_foreground {color_value}")
-                    elif color_name.startswith("Ansi_"):
-                        # Extract color number
-                        num = color_name.split('_')[1]
-                        print(f"color{num} {color_value}")
+    print(to_kitty(parse_xrdb(xrdb_file)), end="")
 
 if __name__ == '__main__':
     if len(sys.argv) < 2:
@@ -10,9 +10,10 @@ pkgs.mkShell {
     bash
     coreutils
     
-    # Python with Pillow for image generation
+    # Python with Pillow and NumPy for image generation and color math
     (python3.withPackages (ps: with ps; [
       pillow
+      numpy
     ]))
     
     # Optional screenshot tools
@@ -45,5 +46,5 @@ pkgs.mkShell {
   '';
   
   # Set environment variables
-  PYTHONPATH = "${pkgs.python3.withPackages (ps: with ps; [ pillow ])}/lib/python*/site-packages";
+  PYTHONPATH = "${pkgs.python3.withPackages (ps: with ps; [ pillow numpy ])}/lib/python*/site-packages";
 }
\ No newline at end of file